@@ -2,5 +2,6 @@
 from .text_analysis import TextAnalyzer
 from .voice_analysis import VoiceAnalyzer
 from .facial_analysis import FacialAnalyzer
+from .vader_scorer import VaderScorer
 
-__all__ = ['TextAnalyzer', 'VoiceAnalyzer', 'FacialAnalyzer'] 
\ No newline at end of file
+__all__ = ['TextAnalyzer', 'VoiceAnalyzer', 'FacialAnalyzer', 'VaderScorer'] 
\ No newline at end of file
@@ -0,0 +1,166 @@
+import numpy as np
+from analysis.voice_analysis import VOICE_FEATURE_NAMES
+from analysis.facial_analysis import FACIAL_FEATURE_NAMES, FacialAnalyzer
+
+# Vectorized versions of the rule-based classifiers, for re-scoring feature
+# matrices (e.g. FeatureTable.matrix()) at array speed. Each rule mirrors the
+# scalar code in VoiceAnalyzer / FacialAnalyzer step for step, including the
+# order of additions, so results match row for row; test_batch_classifiers.py
+# holds them to that. Change both places together.
+
+# Score columns, in the scalar classifiers' dict order (ties go to the first)
+VOICE_EMOTIONS = ('calm', 'happy', 'sad', 'angry', 'fearful', 'surprised')
+FACIAL_EMOTIONS = ('neutral', 'happy', 'sad', 'angry', 'surprised', 'fearful')
+
+# Scalar defaults for absent features (NaN in a matrix)
+FACIAL_DEFAULTS = {'mean_brightness': 128}
+
+def _features(matrix, columns, names, defaults=None):
+    """Pick named columns as float64 arrays, filling NaN with the scalar code's .get() default"""
+    matrix = np.asarray(matrix, dtype=np.float64)
+    positions = {name: i for i, name in enumerate(columns)}
+    defaults = defaults or {}
+    picked = {}
+    for name in names:
+        default = defaults.get(name, 0)
+        if name in positions:
+            values = matrix[:, positions[name]]
+            picked[name] = np.where(np.isnan(values), default, values)
+        else:
+            picked[name] = np.full(len(matrix), default, dtype=np.float64)
+    return picked
+
+def _empty_rows(matrix):
+    # A row with every feature absent is what an empty feature dict looks like
+    matrix = np.asarray(matrix, dtype=np.float64)
+    if matrix.shape[1] == 0:
+        return np.ones(len(matrix), dtype=bool)
+    return np.isnan(matrix).all(axis=1)
+
+def _dominant(scores, labels, cap, boost):
+    best = np.argmax(scores, axis=1)
+    top = scores[np.arange(len(scores)), best]
+    return np.asarray(labels, dtype=object)[best], np.minimum(cap, top + boost)
+
+def classify_voice(matrix, columns=VOICE_FEATURE_NAMES):
+    """Vectorized VoiceAnalyzer.classify_emotion_simple plus the emotion_score of score_features.
+
+    Returns emotion (labels), confidence, emotion_scores (N x VOICE_EMOTIONS)
+    and emotion_score arrays. Rows with no features at all get 'neutral'
+    and 0.0 confidence, like an empty feature dict.
+    """
+    f = _features(matrix, columns, ('rms_mean', 'tempo', 'spectral_centroid_mean', 'zcr_mean', 'spectral_centroid_std'))
+    calm, happy, sad, angry, fearful, surprised = (np.zeros(len(f['rms_mean'])) for _ in VOICE_EMOTIONS)
+
+    # High energy and tempo suggest happiness or anger
+    energetic = (f['rms_mean'] > 0.02) & (f['tempo'] > 120)
+    bright = f['spectral_centroid_mean'] > 2000
+    happy = np.where(energetic & bright, happy + 0.4, happy)
+    angry = np.where(energetic & ~bright, angry + 0.3, angry)
+
+    # Low energy suggests sadness or calm
+    quiet = ~energetic & (f['rms_mean'] < 0.015)
+    smooth = f['zcr_mean'] < 0.1
+    sad = np.where(quiet & smooth, sad + 0.3, sad)
+    calm = np.where(quiet & ~smooth, calm + 0.4, calm)
+
+    # High variation in features suggests fear or surprise
+    varied = f['spectral_centroid_std'] > 500
+    fearful = np.where(varied, fearful + 0.2, fearful)
+    surprised = np.where(varied, surprised + 0.2, surprised)
+
+    scores = np.column_stack([calm, happy, sad, angry, fearful, surprised])
+
+    # Default to calm if no strong indicators
+    weak = scores.max(axis=1) < 0.1
+    scores[weak, 0] = 0.5
+
+    emotion, confidence = _dominant(scores, VOICE_EMOTIONS, 0.95, 0.3)
+
+    empty = _empty_rows(matrix)
+    emotion[empty] = 'neutral'
+    confidence[empty] = 0.0
+    scores[empty] = 0.0
+
+    return {
+        'emotion': emotion,
+        'confidence': confidence,
+        'emotion_scores': scores,
+        'emotion_score': voice_emotion_score(emotion, confidence)
+    }
+
+def voice_emotion_score(emotion, confidence):
+    """Vectorized emotion_score of VoiceAnalyzer.score_features from label and confidence arrays"""
+    positive = np.isin(emotion, ('happy', 'calm'))
+    negative = np.isin(emotion, ('sad', 'angry', 'fearful'))
+    return np.where(positive, confidence * 0.7, np.where(negative, -confidence * 0.7, 0.0))
+
+def voice_characteristics(matrix, columns=VOICE_FEATURE_NAMES):
+    """Vectorized VoiceAnalyzer.analyze_vocal_characteristics: one label array per characteristic.
+
+    Rows with no features at all get None, where the scalar version returns {}.
+    """
+    f = _features(matrix, columns, ('rms_mean', 'zcr_mean', 'spectral_centroid_std'))
+    rms, zcr, spread = f['rms_mean'], f['zcr_mean'], f['spectral_centroid_std']
+    characteristics = {
+        'energy_level': np.select([rms > 0.025, rms > 0.015], ['high', 'medium'], 'low').astype(object),
+        'speaking_rate': np.select([zcr > 0.15, zcr > 0.08], ['fast', 'normal'], 'slow').astype(object),
+        'pitch_variation': np.select([spread > 600, spread > 300], ['high', 'medium'], 'low').astype(object)
+    }
+    empty = _empty_rows(matrix)
+    for labels in characteristics.values():
+        labels[empty] = None
+    return characteristics
+
+def classify_facial(matrix, columns=FACIAL_FEATURE_NAMES, emotion_mapping=None):
+    """Vectorized FacialAnalyzer.classify_features plus the emotion_score of score_features.
+
+    Rows are per-video averaged features. Returns emotion (labels),
+    confidence, emotion_scores (N x FACIAL_EMOTIONS) and emotion_score arrays.
+    """
+    if emotion_mapping is None:
+        # Cascades load lazily, so this only builds the mapping
+        emotion_mapping = FacialAnalyzer().emotion_mapping
+    f = _features(matrix, columns, ('mean_brightness', 'brightness_std', 'eye_count', 'eye_symmetry',
+                                    'face_width', 'face_height'), FACIAL_DEFAULTS)
+    rows = len(f['mean_brightness'])
+    neutral = np.full(rows, 0.4)
+    happy, sad, angry, surprised, fearful = (np.zeros(rows) for _ in range(5))
+
+    # Brightness-based emotion indicators
+    bright = f['mean_brightness'] > 140
+    dark = ~bright & (f['mean_brightness'] < 100)
+    happy = np.where(bright, happy + 0.3, happy)
+    sad = np.where(dark, sad + 0.2, sad)
+
+    # Eye-based indicators
+    both_eyes = f['eye_count'] >= 2
+    symmetric = both_eyes & (f['eye_symmetry'] < 5)
+    no_eyes = ~both_eyes & (f['eye_count'] == 0)
+    happy = np.where(both_eyes, happy + 0.2, happy)
+    happy = np.where(symmetric, happy + 0.1, happy)
+    neutral = np.where(symmetric, neutral + 0.1, neutral)
+    sad = np.where(no_eyes, sad + 0.2, sad)
+
+    # Brightness variation might indicate expression changes
+    varied = f['brightness_std'] > 50
+    surprised = np.where(varied, surprised + 0.2, surprised)
+    fearful = np.where(varied, fearful + 0.1, fearful)
+
+    # Face size might indicate distance/engagement
+    face_size = f['face_width'] * f['face_height']
+    close = face_size > 10000
+    distant = ~close & (face_size < 3000)
+    happy = np.where(close, happy + 0.1, happy)
+    sad = np.where(distant, sad + 0.1, sad)
+
+    scores = np.column_stack([neutral, happy, sad, angry, surprised, fearful])
+    emotion, confidence = _dominant(scores, FACIAL_EMOTIONS, 0.85, 0.2)
+    mapping = np.array([emotion_mapping.get(label, 0.0) for label in FACIAL_EMOTIONS])
+
+    return {
+        'emotion': emotion,
+        'confidence': confidence,
+        'emotion_scores': scores,
+        'emotion_score': mapping[np.argmax(scores, axis=1)] * confidence
+    }
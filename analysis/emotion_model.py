@@ -0,0 +1,145 @@
+import os
+import time
+import numpy as np
+from analysis.voice_analysis import VOICE_FEATURE_NAMES
+from utils.feature_store import to_float
+from utils.file_watch import FileWatcher
+
+# Optional model-backed voice emotion classifier. Models are trained offline
+# (train_emotion_model.py) and written uncompressed with joblib, so loading
+# with mmap_mode='r' maps their arrays from the page cache instead of copying
+# them: every worker that loads the same file shares one copy, including
+# after a hot reload.
+
+DEFAULT_MODEL_PATH = os.path.join('models', 'voice_emotion.pkl')
+MODEL_FORMAT = 1
+
+def build_pipeline(C=1.0):
+    """Median imputation (absent features, lower quality levels), scaling and multinomial logistic regression"""
+    from sklearn.impute import SimpleImputer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    return make_pipeline(
+        SimpleImputer(strategy='median', keep_empty_features=True),
+        StandardScaler(),
+        LogisticRegression(C=C, max_iter=1000)
+    )
+
+def train_model(matrix, labels, columns=VOICE_FEATURE_NAMES, C=1.0):
+    """Fit the pipeline on a rows x columns feature matrix; returns the bundle save_model writes"""
+    pipeline = build_pipeline(C).fit(np.asarray(matrix, dtype=np.float64), np.asarray(labels))
+    return {
+        'format': MODEL_FORMAT,
+        'columns': list(columns),
+        'labels': [str(label) for label in pipeline.classes_],
+        'pipeline': pipeline,
+        'trained_at': time.time(),
+        'samples': len(labels)
+    }
+
+def save_model(bundle, path):
+    """Write a bundle atomically, so a reloading worker never sees a partial file"""
+    import joblib
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    staging = f"{path}.tmp-{os.getpid()}"
+    # Uncompressed: mmap_mode only applies to plain array files
+    joblib.dump(bundle, staging)
+    os.replace(staging, path)
+
+class EmotionModel:
+    def __init__(self, bundle, path=None, mtime=None):
+        """Wrap a loaded bundle for batch prediction over feature matrices"""
+        self.columns = list(bundle['columns'])
+        self.labels = list(bundle['labels'])
+        self.pipeline = bundle['pipeline']
+        self.trained_at = bundle.get('trained_at')
+        self.samples = bundle.get('samples')
+        self.path = path
+        self.version = f"{os.path.basename(path)}@{int(mtime)}" if path and mtime else 'in-memory'
+
+    @classmethod
+    def load(cls, path):
+        """Load a saved bundle with its arrays memory-mapped read-only"""
+        import joblib
+
+        mtime = os.stat(path).st_mtime
+        bundle = joblib.load(path, mmap_mode='r')
+        if not isinstance(bundle, dict) or bundle.get('format') != MODEL_FORMAT:
+            raise ValueError(f"{path} is not a voice emotion model (format {MODEL_FORMAT})")
+        return cls(bundle, path, mtime)
+
+    def matrix(self, features_list):
+        """Feature dicts -> rows x model columns array, absent features as NaN"""
+        matrix = np.full((len(features_list), len(self.columns)), np.nan)
+        for row, features in enumerate(features_list):
+            for column, name in enumerate(self.columns):
+                if name in features:
+                    matrix[row, column] = to_float(features[name])
+        return matrix
+
+    def classify_batch(self, matrix):
+        """Emotion labels, confidence and per-label probabilities (emotion_scores) for every row"""
+        probabilities = self.pipeline.predict_proba(np.asarray(matrix, dtype=np.float64))
+        best = np.argmax(probabilities, axis=1)
+        return {
+            'emotion': np.asarray(self.labels, dtype=object)[best],
+            'confidence': probabilities[np.arange(len(best)), best],
+            'emotion_scores': probabilities
+        }
+
+    def classify(self, features):
+        """Model counterpart of VoiceAnalyzer.classify_emotion_simple for one feature dict"""
+        result = self.classify_batch(self.matrix([features]))
+        return {
+            'emotion': str(result['emotion'][0]),
+            'confidence': float(result['confidence'][0]),
+            'emotion_scores': dict(zip(self.labels, result['emotion_scores'][0].tolist())),
+            'model': self.version
+        }
+
+class ModelHandle:
+    def __init__(self, path, check_interval=5.0):
+        """Hot-reloading reference to a model file, shared by request threads.
+
+        get() re-stats the file at most every check_interval seconds and loads
+        it again when it was replaced. A file that fails to load, or is
+        removed, keeps the previous model in service; its mapping stays valid.
+        """
+        self.path = path
+        self._watcher = FileWatcher(path, self._load, check_interval,
+                                    keep_when_missing=True, name='voice emotion model')
+
+    @staticmethod
+    def _load(path, stat):
+        model = EmotionModel.load(path)
+        print(f"Loaded voice emotion model {model.version}")
+        return model
+
+    @property
+    def reloads(self):
+        return self._watcher.reloads
+
+    @property
+    def last_error(self):
+        return self._watcher.last_error
+
+    def get(self):
+        """The current EmotionModel, or None while no model file has loaded"""
+        return self._watcher.get()
+
+    def info(self):
+        """Model status for /health"""
+        model = self._watcher.value
+        return {
+            'path': self.path,
+            'loaded': model is not None,
+            'version': model.version if model else None,
+            'labels': model.labels if model else None,
+            'reloads': self.reloads,
+            'last_error': self.last_error
+        }
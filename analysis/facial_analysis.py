@@ -1,21 +1,34 @@
-import cv2
 import numpy as np
 import os
 from collections import Counter
+import time
 import warnings
+from utils.metrics import STAGE_SECONDS, stage_timer
 warnings.filterwarnings('ignore')
 
+# Per quality level: analyze every Nth frame, run face detection on a frame
+# downscaled by this factor, and stop after this many frames
+FACIAL_QUALITY_SETTINGS = {
+    'full': {'frame_step': 10, 'detection_scale': 1.0, 'max_frames': 1000},
+    'reduced': {'frame_step': 15, 'detection_scale': 0.75, 'max_frames': 1000},
+    'minimal': {'frame_step': 30, 'detection_scale': 0.5, 'max_frames': 450}
+}
+
+# Per-frame features from extract_facial_features, averaged per video by
+# aggregate_features, in feature-store column order. The eye geometry
+# features only exist for frames where two eyes were found
+FACIAL_FEATURE_NAMES = [
+    'face_width', 'face_height', 'face_ratio', 'eye_count', 'eye_distance', 'eye_symmetry',
+    'mean_brightness', 'brightness_std', 'face_center_x', 'face_center_y'
+]
+
 class FacialAnalyzer:
     def __init__(self):
         """Initialize facial analyzer with OpenCV cascade classifiers"""
-        # Load pre-trained face detection classifier
-        try:
-            self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            self.eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
-        except Exception as e:
-            print(f"Warning: Could not load OpenCV classifiers: {e}")
-            self.face_cascade = None
-            self.eye_cascade = None
+        # Cascades (and OpenCV itself) load on first detection to keep startup fast
+        self._cascades_loaded = False
+        self._face_cascade = None
+        self._eye_cascade = None
         
         # Simple emotion mapping based on facial features
         self.emotion_mapping = {
@@ -28,23 +41,59 @@ class FacialAnalyzer:
             'disgusted': -0.5
         }
     
-    def detect_faces(self, frame):
-        """Detect faces in a frame"""
+    def load_cascades(self):
+        """Load pre-trained face and eye detection classifiers"""
+        if self._cascades_loaded:
+            return
+        
+        import cv2
+        try:
+            self._face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+            self._eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
+        except Exception as e:
+            print(f"Warning: Could not load OpenCV classifiers: {e}")
+            self._face_cascade = None
+            self._eye_cascade = None
+        self._cascades_loaded = True
+    
+    @property
+    def face_cascade(self):
+        self.load_cascades()
+        return self._face_cascade
+    
+    @property
+    def eye_cascade(self):
+        self.load_cascades()
+        return self._eye_cascade
+    
+    def detect_faces(self, frame, scale=1.0):
+        """Detect faces in a frame, optionally on a downscaled copy"""
+        import cv2
+        
         if self.face_cascade is None:
             return []
         
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        min_size = 30
+        if scale != 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            min_size = max(15, int(round(min_size * scale)))
         faces = self.face_cascade.detectMultiScale(
             gray,
             scaleFactor=1.1,
             minNeighbors=5,
-            minSize=(30, 30),
+            minSize=(min_size, min_size),
             flags=cv2.CASCADE_SCALE_IMAGE
         )
+        if scale != 1.0 and len(faces) > 0:
+            # Map boxes back to full-resolution coordinates for feature extraction
+            faces = (np.asarray(faces) / scale).astype(int)
         return faces
     
     def extract_facial_features(self, frame, face_coords):
         """Extract basic facial features for emotion analysis"""
+        import cv2
+        
         x, y, w, h = face_coords
         face_roi = frame[y:y+h, x:x+w]
         gray_face = cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY)
@@ -89,13 +138,21 @@ class FacialAnalyzer:
                 'emotion_scores': {'neutral': 1.0}
             }
         
-        # Aggregate features across all frames
+        return self.classify_features(self.aggregate_features(features_list))
+    
+    def aggregate_features(self, features_list):
+        """Average each feature of the first frame over the frames that have it"""
         avg_features = {}
+        if not features_list:
+            return avg_features
         for key in features_list[0].keys():
             values = [f.get(key, 0) for f in features_list if key in f]
             if values:
                 avg_features[key] = np.mean(values)
-        
+        return avg_features
+    
+    def classify_features(self, avg_features):
+        """Rule-based emotion from features averaged over a video's frames"""
         emotion_scores = {
             'neutral': 0.4,  # Default baseline
             'happy': 0.0,
@@ -176,8 +233,35 @@ class FacialAnalyzer:
         
         return recommendations
     
-    def analyze_video(self, video_path):
-        """Main method to analyze video file for facial emotions"""
+    def score_features(self, avg_features):
+        """Classify averaged features: emotion, recommendations and emotion score"""
+        emotion_result = self.classify_features(avg_features)
+        
+        # Recommendations only read eye_count, whose summary average is the same value
+        recommendations = self.generate_facial_recommendations(
+            emotion_result['emotion'],
+            {f'average_{key}': value for key, value in avg_features.items()}
+        )
+        
+        # Calculate emotion score for combination with other analyses
+        emotion_score = self.emotion_mapping.get(emotion_result['emotion'], 0.0)
+        emotion_score *= emotion_result['confidence']
+        
+        return {
+            "primary_emotion": emotion_result['emotion'],
+            "confidence": emotion_result['confidence'],
+            "emotion_scores": emotion_result['emotion_scores'],
+            "recommendations": recommendations,
+            "emotion_score": emotion_score
+        }
+    
+    def analyze_video(self, video_path, quality_level='full', include_features=False):
+        """Main method to analyze video file for facial emotions (include_features adds the averaged features for storage)"""
+        import cv2
+        
+        settings = FACIAL_QUALITY_SETTINGS[quality_level]
+        frame_step = settings['frame_step']
+        
         if not os.path.exists(video_path):
             return {
                 "error": "Video file not found",
@@ -199,21 +283,26 @@ class FacialAnalyzer:
             frames_analyzed = 0
             features_list = []
             face_detection_count = 0
+            decode_seconds = 0.0
             
             # Process video frames
             while True:
+                # Decode time is summed per video rather than observed per frame
+                read_started = time.perf_counter()
                 ret, frame = cap.read()
+                decode_seconds += time.perf_counter() - read_started
                 if not ret:
                     break
                 
                 frames_analyzed += 1
                 
-                # Skip frames for faster processing (analyze every 10th frame)
-                if frames_analyzed % 10 != 0:
+                # Skip frames for faster processing (every 10th frame at full quality)
+                if frames_analyzed % frame_step != 0:
                     continue
                 
                 # Detect faces
-                faces = self.detect_faces(frame)
+                with stage_timer('facial.detect'):
+                    faces = self.detect_faces(frame, settings['detection_scale'])
                 
                 if len(faces) > 0:
                     face_detection_count += 1
@@ -221,14 +310,16 @@ class FacialAnalyzer:
                     largest_face = max(faces, key=lambda face: face[2] * face[3])
                     
                     # Extract features
-                    features = self.extract_facial_features(frame, largest_face)
+                    with stage_timer('facial.features'):
+                        features = self.extract_facial_features(frame, largest_face)
                     features_list.append(features)
                 
-                # Limit analysis to first 100 processed frames for speed
-                if frames_analyzed >= 1000:
+                # Limit analysis to the first frames for speed
+                if frames_analyzed >= settings['max_frames']:
                     break
             
             cap.release()
+            STAGE_SECONDS.observe(decode_seconds, stage='facial.decode')
             
             if not features_list:
                 return {
@@ -236,42 +327,30 @@ class FacialAnalyzer:
                     "emotion": "unknown",
                     "confidence": 0.0,
                     "frames_analyzed": frames_analyzed,
-                    "faces_detected": 0
+                    "faces_detected": 0,
+                    "quality_level": quality_level
                 }
             
-            # Analyze emotions
-            emotion_result = self.analyze_emotion_simple(features_list)
-            
-            # Calculate features summary
-            features_summary = {}
-            if features_list:
-                for key in features_list[0].keys():
-                    values = [f.get(key, 0) for f in features_list if key in f]
-                    if values:
-                        features_summary[f'average_{key}'] = np.mean(values)
-                        features_summary[f'std_{key}'] = np.std(values)
-            
-            # Generate recommendations
-            recommendations = self.generate_facial_recommendations(
-                emotion_result['emotion'],
-                features_summary
-            )
-            
-            # Calculate emotion score for combination with other analyses
-            emotion_score = self.emotion_mapping.get(emotion_result['emotion'], 0.0)
-            emotion_score *= emotion_result['confidence']
+            with stage_timer('facial.classify'):
+                avg_features = self.aggregate_features(features_list)
+                result = self.score_features(avg_features)
+                
+                # Calculate features summary
+                features_summary = {}
+                for key, average in avg_features.items():
+                    features_summary[f'average_{key}'] = average
+                    features_summary[f'std_{key}'] = np.std([f[key] for f in features_list if key in f])
             
-            return {
-                "primary_emotion": emotion_result['emotion'],
-                "confidence": emotion_result['confidence'],
-                "emotion_scores": emotion_result['emotion_scores'],
+            result.update({
                 "features_summary": features_summary,
-                "recommendations": recommendations,
-                "emotion_score": emotion_score,
                 "frames_analyzed": frames_analyzed,
                 "faces_detected": face_detection_count,
-                "face_detection_rate": face_detection_count / max(1, frames_analyzed // 10)
-            }
+                "face_detection_rate": face_detection_count / max(1, frames_analyzed // frame_step),
+                "quality_level": quality_level
+            })
+            if include_features:
+                result["features"] = avg_features
+            return result
             
         except Exception as e:
             return {
@@ -282,6 +361,8 @@ class FacialAnalyzer:
     
     def analyze_image(self, image_path):
         """Analyze a single image for facial emotions"""
+        import cv2
+        
         if not os.path.exists(image_path):
             return {
                 "error": "Image file not found",
@@ -0,0 +1,278 @@
+import contextvars
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from utils.load_control import QUALITY_LEVELS
+from utils.metrics import ANALYSIS_FAILURES
+
+# Text outputs that feed the combined assessment
+COMBINED_TEXT_OUTPUTS = ('mood', 'sentiment', 'emotions')
+
+def mean_emotion_score(question_analyses):
+    """Average emotion_score of the answers that have one, 0.0 when none do"""
+    scores = [result['emotion_score'] for result in question_analyses.values() if result and 'emotion_score' in result]
+    return sum(scores) / len(scores) if scores else 0.0
+
+class AnalysisPipeline:
+    """Multi-question analysis and cross-modality combination shared by routes and jobs"""
+
+    def __init__(self, text_analyzer, voice_analyzer, facial_analyzer, max_workers=6, quality_controller=None):
+        self.text_analyzer = text_analyzer
+        self.voice_analyzer = voice_analyzer
+        self.facial_analyzer = facial_analyzer
+        # Optional LoadController choosing cheaper voice/facial settings under load
+        self.quality_controller = quality_controller
+        # Shared pool for running modalities of one session side by side;
+        # librosa and OpenCV release the GIL for most of their work
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='modality')
+
+    def analyze_text(self, responses):
+        """Analyze text responses for the combined assessment"""
+        return self.text_analyzer.analyze_responses(responses, outputs=COMBINED_TEXT_OUTPUTS)
+
+    def quality_level(self):
+        """Quality level for the next voice/facial analysis"""
+        return self.quality_controller.level() if self.quality_controller else QUALITY_LEVELS[0]
+
+    def _observe(self, started):
+        if self.quality_controller:
+            self.quality_controller.observe(time.perf_counter() - started)
+
+    def lowest_quality(self, question_analyses):
+        """Cheapest quality level any of the per-question results was produced at"""
+        levels = [result.get('quality_level') for result in question_analyses.values() if result]
+        levels = [QUALITY_LEVELS.index(level) for level in levels if level in QUALITY_LEVELS]
+        return QUALITY_LEVELS[max(levels)] if levels else QUALITY_LEVELS[0]
+
+    def analyze_voice_answer(self, audio_path, question_index=None):
+        """Analyze one saved voice recording, falling back to a neutral result on failure"""
+        quality_level = self.quality_level()
+        started = time.perf_counter()
+        try:
+            analysis_result = self.voice_analyzer.analyze_audio(audio_path, quality_level)
+        except Exception as e:
+            print(f"Error analyzing voice for question {question_index}: {e}")
+            ANALYSIS_FAILURES.inc(modality='voice')
+            # Provide fallback analysis result
+            analysis_result = {
+                'primary_emotion': 'neutral',
+                'confidence': 0.5,
+                'vocal_characteristics': {'energy_level': 'medium'},
+                'recommendations': ['Unable to analyze this recording']
+            }
+        self._observe(started)
+        analysis_result.setdefault('quality_level', quality_level)
+        return analysis_result
+
+    def analyze_voice_files(self, audio_paths):
+        """Analyze saved voice recordings keyed by question index"""
+        return self.aggregate_voice({
+            question_index: self.analyze_voice_answer(audio_path, question_index)
+            for question_index, audio_path in audio_paths.items()
+        })
+
+    def aggregate_voice(self, question_analyses):
+        """Combine per-question voice results into the /analyze_voice payload"""
+        overall_analysis = {
+            'emotions': [],
+            'confidence_scores': [],
+            'vocal_characteristics': {},
+            'recommendations': [],
+            'overall_mood': 'neutral',
+            'stress_level': 'low'
+        }
+
+        for analysis_result in question_analyses.values():
+            # Aggregate data for overall analysis
+            if analysis_result and 'primary_emotion' in analysis_result:
+                overall_analysis['emotions'].append(analysis_result['primary_emotion'])
+            if analysis_result and 'confidence' in analysis_result:
+                overall_analysis['confidence_scores'].append(analysis_result['confidence'])
+            if analysis_result and 'vocal_characteristics' in analysis_result:
+                # Merge vocal characteristics
+                for key, value in analysis_result['vocal_characteristics'].items():
+                    if key not in overall_analysis['vocal_characteristics']:
+                        overall_analysis['vocal_characteristics'][key] = []
+                    overall_analysis['vocal_characteristics'][key].append(value)
+            if analysis_result and 'recommendations' in analysis_result:
+                overall_analysis['recommendations'].extend(analysis_result['recommendations'])
+
+        # Calculate overall mood and stress level
+        if not overall_analysis['emotions']:
+            # Fallback if no emotions detected
+            overall_analysis['emotions'] = ['neutral']
+            overall_analysis['confidence_scores'] = [0.5]
+            overall_analysis['vocal_characteristics'] = {'energy_level': ['medium']}
+            overall_analysis['recommendations'] = ['Unable to analyze voice patterns']
+
+        overall_analysis = self.voice_analyzer.calculate_overall_analysis(overall_analysis)
+        # The voice mood score fed into combine_results, as facial reports one
+        overall_analysis['emotion_score'] = mean_emotion_score(question_analyses)
+
+        return {
+            "success": True,
+            "question_analyses": question_analyses,
+            "overall_analysis": overall_analysis,
+            "quality_level": self.lowest_quality(question_analyses)
+        }
+
+    def analyze_facial_answer(self, video_path, question_index=None):
+        """Analyze one saved facial video"""
+        quality_level = self.quality_level()
+        started = time.perf_counter()
+        analysis_result = self.facial_analyzer.analyze_video(video_path, quality_level)
+        self._observe(started)
+        if 'error' in analysis_result:
+            ANALYSIS_FAILURES.inc(modality='facial')
+        analysis_result.setdefault('quality_level', quality_level)
+        return analysis_result
+
+    def analyze_facial_files(self, video_paths):
+        """Analyze saved facial videos keyed by question index"""
+        return self.aggregate_facial({
+            question_index: self.analyze_facial_answer(video_path, question_index)
+            for question_index, video_path in video_paths.items()
+        })
+
+    def aggregate_facial(self, question_analyses):
+        """Combine per-question facial results into the /analyze_facial payload"""
+        overall_analysis = {
+            'emotions': [],
+            'confidence_scores': [],
+            'emotion_scores': [],
+            'facial_features': {},
+            'recommendations': [],
+            'overall_emotion': 'neutral',
+            'stress_level': 'low'
+        }
+
+        for question_index, analysis_result in question_analyses.items():
+            # Aggregate data
+            if 'primary_emotion' in analysis_result:
+                overall_analysis['emotions'].append(analysis_result['primary_emotion'])
+            if 'confidence' in analysis_result:
+                overall_analysis['confidence_scores'].append(analysis_result['confidence'])
+            if 'features_summary' in analysis_result:
+                overall_analysis['facial_features'][question_index] = analysis_result['features_summary']
+            if 'recommendations' in analysis_result:
+                overall_analysis['recommendations'].extend(analysis_result['recommendations'])
+            if 'emotion_score' in analysis_result:
+                overall_analysis['emotion_scores'].append(analysis_result['emotion_score'])
+
+        # Calculate overall emotion
+        if overall_analysis['emotions']:
+            counter = Counter(overall_analysis['emotions'])
+            overall_analysis['overall_emotion'] = counter.most_common(1)[0][0]
+
+        # Calculate average confidence
+        if overall_analysis['confidence_scores']:
+            overall_analysis['average_confidence'] = sum(overall_analysis['confidence_scores']) / len(overall_analysis['confidence_scores'])
+
+        if overall_analysis['emotion_scores']:
+            overall_analysis['emotion_score'] = sum(overall_analysis['emotion_scores']) / len(overall_analysis['emotion_scores'])
+        else:
+            overall_analysis['emotion_score'] = 0.0
+
+        return {
+            "success": True,
+            "question_analyses": question_analyses,
+            "overall_analysis": overall_analysis,
+            "quality_level": self.lowest_quality(question_analyses)
+        }
+
+    def submit(self, func, *args):
+        """Run func on the modality pool in a copy of the caller's context (keeps per-request memory tracking)"""
+        return self.executor.submit(contextvars.copy_context().run, func, *args)
+
+    def analyze_session(self, responses=None, audio_paths=None, video_paths=None):
+        """Run every supplied modality concurrently and combine them in one pass"""
+        tasks = {}
+        if responses:
+            tasks['text'] = self.submit(self.analyze_text, responses)
+        if audio_paths:
+            tasks['voice'] = self.submit(self.analyze_voice_files, audio_paths)
+        if video_paths:
+            tasks['facial'] = self.submit(self.analyze_facial_files, video_paths)
+
+        results = {'text': None, 'voice': None, 'facial': None}
+        errors = {}
+        for modality, future in tasks.items():
+            try:
+                results[modality] = future.result()
+            except Exception as e:
+                # One failing modality should not sink the others
+                print(f"Error in {modality} analysis: {e}")
+                errors[modality] = str(e)
+
+        combined_result = self.combine_session_results(results)
+
+        return {
+            "success": True,
+            "text": results['text'],
+            "voice": results['voice'],
+            "facial": results['facial'],
+            "errors": errors,
+            "analysis": combined_result
+        }
+
+    def combine_session_results(self, results):
+        """Combine stored endpoint payloads keyed by modality ('text', 'voice', 'facial')"""
+        voice_payload = results.get('voice')
+        voice_overall = None
+        if voice_payload:
+            # Scored from the answers, so payloads stored without an overall emotion_score still count
+            voice_overall = dict(voice_payload['overall_analysis'],
+                                 emotion_score=mean_emotion_score(voice_payload['question_analyses']))
+        return self.combine_results(results.get('text'), voice_overall, results.get('facial'))
+
+    def combine_results(self, text_result, voice_result, facial_result):
+        """Combine per-modality results into an overall mental state assessment"""
+        combined_result = {
+            "overall_mood": "Neutral",
+            "confidence": 0.0,
+            "recommendations": [],
+            "individual_analyses": {
+                "text": text_result,
+                "voice": voice_result,
+                "facial": facial_result
+            }
+        }
+
+        # Simple combination logic
+        mood_scores = []
+        if text_result:
+            mood_scores.append(text_result.get('overall_sentiment_score', 0))
+        if voice_result:
+            mood_scores.append(voice_result.get('emotion_score', 0))
+        if facial_result:
+            mood_scores.append(facial_result.get('overall_analysis', {}).get('emotion_score', 0))
+
+        if mood_scores:
+            avg_score = sum(mood_scores) / len(mood_scores)
+            if avg_score > 0.3:
+                combined_result["overall_mood"] = "Positive"
+            elif avg_score < -0.3:
+                combined_result["overall_mood"] = "Negative"
+            else:
+                combined_result["overall_mood"] = "Neutral"
+
+            combined_result["confidence"] = min(0.95, len(mood_scores) * 0.3)
+
+        # Generate combined recommendations
+        all_recommendations = []
+        if text_result and 'recommendations' in text_result:
+            all_recommendations.extend(text_result['recommendations'])
+        if voice_result and 'recommendations' in voice_result:
+            all_recommendations.extend(voice_result['recommendations'])
+        if facial_result and 'overall_analysis' in facial_result and 'recommendations' in facial_result['overall_analysis']:
+            all_recommendations.extend(facial_result['overall_analysis']['recommendations'])
+
+        # Remove duplicates and add general recommendations
+        combined_result["recommendations"] = list(set(all_recommendations))
+        if not combined_result["recommendations"]:
+            combined_result["recommendations"] = [
+                "Continue monitoring your mental health regularly",
+                "Consider speaking with a mental health professional if needed"
+            ]
+
+        return combined_result
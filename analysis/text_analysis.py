@@ -1,26 +1,28 @@
-import nltk
 import re
-from textblob import TextBlob
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import json
 import os
+import hashlib
+from utils.cache import LRUCache
+from utils.metrics import stage_timer
+from .vader_scorer import VaderScorer
+
+# Outputs a caller can request from analyze_responses
+TEXT_OUTPUTS = ('mood', 'sentiment', 'emotions', 'subjectivity', 'polarity')
+DEFAULT_TEXT_OUTPUTS = ('mood', 'sentiment', 'emotions', 'subjectivity')
+
+def score_key(scorer, text):
+    """Memo key for one scorer's result on text; a fixed-size digest, so long records do not bloat the cache"""
+    return scorer, hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
 
 class TextAnalyzer:
-    def __init__(self):
+    def __init__(self, score_cache=None):
         """Initialize text analyzer with sentiment analysis tools"""
-        # Download required NLTK data
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
-        
-        try:
-            nltk.data.find('corpora/stopwords')
-        except LookupError:
-            nltk.download('stopwords')
+        # Initialize sentiment analyzers (TextBlob's pattern analyzer loads on first use)
+        self.vader_analyzer = VaderScorer()
+        self._textblob_analyzer = None
         
-        # Initialize sentiment analyzers
-        self.vader_analyzer = SentimentIntensityAnalyzer()
+        # Memo of sentiment scores keyed on a digest of the normalized text, shared by all callers
+        self.score_cache = score_cache if score_cache is not None else LRUCache(capacity=4096)
         
         # Define emotion keywords for mood detection
         self.emotion_keywords = {
@@ -31,6 +33,9 @@ class TextAnalyzer:
             'calm': ['calm', 'peaceful', 'relaxed', 'serene', 'tranquil', 'content', 'at ease', 'comfortable'],
             'tired': ['tired', 'exhausted', 'fatigued', 'weary', 'drained', 'sleepy', 'lethargic', 'restless']
         }
+        
+        # Compile every keyword into one matcher so detection is a single pass
+        self.compile_emotion_matcher()
     
     def preprocess_text(self, text):
         """Clean and preprocess text for analysis"""
@@ -48,8 +53,27 @@ class TextAnalyzer:
         
         return text
     
+    def ensure_nltk_data(self):
+        """Make sure the NLTK resources used by TextBlob are available"""
+        # Imported here: nltk pulls in scipy and costs seconds at startup
+        import nltk
+        
+        try:
+            nltk.data.find('tokenizers/punkt')
+        except LookupError:
+            nltk.download('punkt')
+        
+        try:
+            nltk.data.find('corpora/stopwords')
+        except LookupError:
+            nltk.download('stopwords')
+    
     def analyze_sentiment_vader(self, text):
-        """Analyze sentiment using VADER"""
+        """Analyze sentiment using VADER, memoized on the text scored"""
+        return dict(self.score_cache.get_or_compute(score_key('vader', text), lambda: self._score_vader(text)))
+    
+    def _score_vader(self, text):
+        """Score text with VADER without consulting the memo"""
         scores = self.vader_analyzer.polarity_scores(text)
         return {
             'positive': scores['pos'],
@@ -59,22 +83,75 @@ class TextAnalyzer:
         }
     
     def analyze_sentiment_textblob(self, text):
-        """Analyze sentiment using TextBlob"""
-        blob = TextBlob(text)
+        """Analyze sentiment using TextBlob, memoized on the text scored"""
+        return dict(self.score_cache.get_or_compute(score_key('textblob', text), lambda: self._score_textblob(text)))
+    
+    def _score_textblob(self, text):
+        """Score text with TextBlob without consulting the memo"""
+        if self._textblob_analyzer is None:
+            # Same analyzer TextBlob(text).sentiment uses, without building a blob
+            self.ensure_nltk_data()
+            from textblob.en.sentiments import PatternAnalyzer
+            self._textblob_analyzer = PatternAnalyzer()
+        
+        sentiment = self._textblob_analyzer.analyze(text)
         return {
-            'polarity': blob.sentiment.polarity,
-            'subjectivity': blob.sentiment.subjectivity
+            'polarity': sentiment.polarity,
+            'subjectivity': sentiment.subjectivity
         }
     
+    def compile_emotion_matcher(self):
+        """Compile emotion keywords into a single word-bounded regex"""
+        # Map each normalized keyword back to the emotions that list it
+        self.keyword_emotions = {}
+        for emotion, keywords in self.emotion_keywords.items():
+            for keyword in keywords:
+                normalized = ' '.join(keyword.lower().split())
+                if normalized:
+                    self.keyword_emotions.setdefault(normalized, []).append(emotion)
+        
+        # Build a character trie so shared prefixes are matched only once;
+        # the resulting pattern stays linear in the text for large lexicons
+        trie = {}
+        for keyword in self.keyword_emotions:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        
+        pattern = self._trie_to_regex(trie) if trie else r'(?!)'
+        self.emotion_pattern = re.compile(r'\b(?:' + pattern + r')\b')
+    
+    def _trie_to_regex(self, node):
+        """Convert a keyword trie into an equivalent regex fragment"""
+        alternatives = []
+        for char in sorted(node):
+            if char == '':
+                continue
+            # Phrases like "at ease" tolerate any run of whitespace
+            prefix = r'\s+' if char == ' ' else re.escape(char)
+            alternatives.append(prefix + self._trie_to_regex(node[char]))
+        
+        if not alternatives:
+            return ''
+        
+        fragment = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+        if '' in node:
+            # A keyword ends here; the greedy optional still prefers longer matches
+            fragment = '(?:' + fragment + ')?'
+        return fragment
+    
     def detect_emotions(self, text):
         """Detect emotions based on keyword matching"""
-        text_lower = text.lower()
-        detected_emotions = {}
+        matched_keywords = set()
+        for match in self.emotion_pattern.finditer(text.lower()):
+            matched_keywords.add(' '.join(match.group().split()))
         
-        for emotion, keywords in self.emotion_keywords.items():
-            count = sum(1 for keyword in keywords if keyword in text_lower)
-            if count > 0:
-                detected_emotions[emotion] = count
+        # Each distinct keyword counts once towards every emotion listing it
+        detected_emotions = {}
+        for keyword in matched_keywords:
+            for emotion in self.keyword_emotions[keyword]:
+                detected_emotions[emotion] = detected_emotions.get(emotion, 0) + 1
         
         return detected_emotions
     
@@ -125,8 +202,8 @@ class TextAnalyzer:
         
         return recommendations
     
-    def analyze_responses(self, responses):
-        """Analyze a list of text responses"""
+    def analyze_responses(self, responses, outputs=DEFAULT_TEXT_OUTPUTS):
+        """Analyze a list of text responses, computing only the requested outputs"""
         if not responses:
             return {
                 "error": "No responses provided",
@@ -134,38 +211,55 @@ class TextAnalyzer:
                 "confidence": 0.0
             }
         
+        unknown = set(outputs) - set(TEXT_OUTPUTS)
+        if unknown:
+            raise ValueError(f"Unknown text outputs: {', '.join(sorted(unknown))}")
+        
         all_text = " ".join(responses)
         processed_text = self.preprocess_text(all_text)
+        word_count = len(processed_text.split())
         
-        # Perform sentiment analysis
-        vader_scores = self.analyze_sentiment_vader(processed_text)
-        textblob_scores = self.analyze_sentiment_textblob(processed_text)
-        
-        # Detect emotions
-        emotions = self.detect_emotions(processed_text)
+        result = {}
         
-        # Classify mood
-        mood = self.classify_mood(vader_scores, emotions)
+        # Mood classification depends on both VADER and the emotion keywords
+        vader_scores = None
+        if 'sentiment' in outputs or 'mood' in outputs:
+            with stage_timer('text.sentiment'):
+                vader_scores = self.analyze_sentiment_vader(processed_text)
         
-        # Generate recommendations
-        recommendations = self.generate_recommendations(mood, emotions)
+        emotions = None
+        if 'emotions' in outputs or 'mood' in outputs:
+            with stage_timer('text.emotions'):
+                emotions = self.detect_emotions(processed_text)
         
-        # Calculate confidence based on response length and sentiment strength
-        confidence = min(0.95, len(processed_text.split()) * 0.01 + abs(vader_scores['compound']) * 0.5)
+        if 'mood' in outputs:
+            mood = self.classify_mood(vader_scores, emotions)
+            result["overall_mood"] = mood
+            result["recommendations"] = self.generate_recommendations(mood, emotions)
+            # Confidence based on response length and sentiment strength
+            result["confidence"] = min(0.95, word_count * 0.01 + abs(vader_scores['compound']) * 0.5)
         
-        return {
-            "overall_mood": mood,
-            "overall_sentiment_score": vader_scores['compound'],
-            "sentiment_breakdown": {
+        if 'sentiment' in outputs:
+            result["overall_sentiment_score"] = vader_scores['compound']
+            result["sentiment_breakdown"] = {
                 "positive": vader_scores['positive'],
                 "negative": vader_scores['negative'],
                 "neutral": vader_scores['neutral']
-            },
-            "subjectivity": textblob_scores['subjectivity'],
-            "detected_emotions": emotions,
-            "primary_emotion": max(emotions.items(), key=lambda x: x[1])[0] if emotions else 'neutral',
-            "recommendations": recommendations,
-            "confidence": confidence,
-            "response_count": len(responses),
-            "total_words": len(processed_text.split())
-        } 
\ No newline at end of file
+            }
+        
+        # TextBlob is only paid for when a caller asks for its scores
+        if 'subjectivity' in outputs or 'polarity' in outputs:
+            with stage_timer('text.textblob'):
+                textblob_scores = self.analyze_sentiment_textblob(processed_text)
+            if 'subjectivity' in outputs:
+                result["subjectivity"] = textblob_scores['subjectivity']
+            if 'polarity' in outputs:
+                result["polarity"] = textblob_scores['polarity']
+        
+        if 'emotions' in outputs:
+            result["detected_emotions"] = emotions
+            result["primary_emotion"] = max(emotions.items(), key=lambda x: x[1])[0] if emotions else 'neutral'
+        
+        result["response_count"] = len(responses)
+        result["total_words"] = word_count
+        return result
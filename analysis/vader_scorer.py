@@ -0,0 +1,297 @@
+import heapq
+import math
+import string
+from collections import namedtuple
+from vaderSentiment.vaderSentiment import (
+    SentimentIntensityAnalyzer, BOOSTER_DICT, NEGATE, SPECIAL_CASES, C_INCR, N_SCALAR
+)
+
+# A text reduced to what the scoring rules need: tokens plus punctuation counts
+PreparedText = namedtuple('PreparedText', ['tokens', 'exclamations', 'questions'])
+
+class VaderScorer:
+    """VADER-compatible sentiment scorer with precompiled lookup tables.
+
+    Produces the same scores as vaderSentiment's SentimentIntensityAnalyzer,
+    but resolves every lowercase token once and walks each text in a single
+    pass instead of rebuilding lowercase word lists per lexicon hit. The
+    "but" rule is O(n log n) rather than the reference's O(n^2).
+    """
+
+    def __init__(self, reference=None):
+        """Compile lexicon, booster, negation and idiom tables"""
+        # Reuse the reference loader so lexicon parsing can never drift
+        reference = reference or SentimentIntensityAnalyzer()
+        self.lexicon = dict(reference.lexicon)
+        self.emojis = dict(reference.emojis)
+        self.boosters = dict(BOOSTER_DICT)
+        self.negations = frozenset(NEGATE)
+        self.special_cases = dict(SPECIAL_CASES)
+
+        # Multi-word boosters only ever matter inside the idiom window
+        self.booster_ngrams = {k: v for k, v in self.boosters.items() if ' ' in k}
+
+        # Any word that can take part in an idiom or booster n-gram; windows
+        # without one of these cannot match and skip the string building
+        self.idiom_words = frozenset(
+            word for phrase in list(self.special_cases) + list(self.booster_ngrams) for word in phrase.split()
+        )
+
+        # Emoji keys are all non-ASCII, so plain ASCII text needs no translation
+        self.ascii_emojis = any(key.isascii() for key in self.emojis)
+        self.punctuation = string.punctuation
+
+    def prepare(self, text):
+        """Tokenize text the way VADER does and count emphasis punctuation"""
+        if not text.isascii() or self.ascii_emojis:
+            text = self._replace_emojis(text)
+
+        punctuation = self.punctuation
+        tokens = []
+        for token in text.split():
+            # Strip surrounding punctuation unless that leaves an emoticon stub
+            stripped = token.strip(punctuation)
+            tokens.append(token if len(stripped) <= 2 else stripped)
+
+        return PreparedText(tokens, text.count('!'), text.count('?'))
+
+    def _replace_emojis(self, text):
+        """Swap emoji characters for their textual descriptions"""
+        emojis = self.emojis
+        parts = []
+        prev_space = True
+        for char in text:
+            description = emojis.get(char)
+            if description is not None:
+                if not prev_space:
+                    parts.append(' ')
+                parts.append(description)
+                prev_space = False
+            else:
+                parts.append(char)
+                prev_space = char == ' '
+        return ''.join(parts).strip()
+
+    def polarity_scores(self, text):
+        """Score raw text; drop-in replacement for the reference analyzer"""
+        return self.score_prepared(self.prepare(text))
+
+    def score_batch(self, prepared_texts):
+        """Score an iterable of PreparedText (or token-list) entries"""
+        return [self.score_prepared(item) for item in prepared_texts]
+
+    def score_prepared(self, prepared):
+        """Score a PreparedText, or a bare token list with no punctuation emphasis"""
+        if isinstance(prepared, PreparedText):
+            return self._score(prepared.tokens, prepared.exclamations, prepared.questions)
+        return self._score(prepared, 0, 0)
+
+    def _is_negated(self, word):
+        return word in self.negations or "n't" in word
+
+    def _score(self, tokens, exclamations, questions):
+        count = len(tokens)
+        if not count:
+            return {"neg": 0.0, "neu": 0.0, "pos": 0.0, "compound": 0.0}
+
+        lexicon = self.lexicon
+        boosters = self.boosters
+        lowers = [token.lower() for token in tokens]
+        uppers = [token.isupper() for token in tokens]
+        allcaps = sum(uppers)
+        is_cap_diff = 0 < count - allcaps < count
+
+        sentiments = [0] * count
+        for i in range(count):
+            word = lowers[i]
+
+            # Boosters and "kind of" only modify their neighbours
+            if word in boosters:
+                continue
+            if word == "kind" and i < count - 1 and lowers[i + 1] == "of":
+                continue
+
+            base = lexicon.get(word)
+            if base is None:
+                continue
+            valence = base
+
+            # "no" directly before a lexicon word negates it instead of scoring
+            if word == "no" and i != count - 1 and lowers[i + 1] in lexicon:
+                valence = 0.0
+            if (i > 0 and lowers[i - 1] == "no") \
+               or (i > 1 and lowers[i - 2] == "no") \
+               or (i > 2 and lowers[i - 3] == "no" and lowers[i - 1] in ("or", "nor")):
+                valence = base * N_SCALAR
+
+            # Emphasis from a word in ALL CAPS among mixed-case text
+            if uppers[i] and is_cap_diff:
+                if valence > 0:
+                    valence += C_INCR
+                else:
+                    valence -= C_INCR
+
+            # Up to three preceding non-lexicon words may boost or negate
+            for start_i in range(3):
+                j = i - start_i - 1
+                if j < 0 or lowers[j] in lexicon:
+                    continue
+
+                scalar = 0.0
+                boost = boosters.get(lowers[j])
+                if boost is not None:
+                    scalar = boost
+                    if valence < 0:
+                        scalar *= -1
+                    if uppers[j] and is_cap_diff:
+                        if valence > 0:
+                            scalar += C_INCR
+                        else:
+                            scalar -= C_INCR
+                if start_i == 1 and scalar != 0:
+                    scalar = scalar * 0.95
+                if start_i == 2 and scalar != 0:
+                    scalar = scalar * 0.9
+                valence = valence + scalar
+
+                valence = self._negation_check(valence, lowers, start_i, i)
+                if start_i == 2:
+                    valence = self._special_idioms_check(valence, lowers, i, count)
+
+            # "least" negates unless used as "at least" / "very least"
+            previous = lowers[i - 1] if i > 0 else None
+            if previous == "least" and previous not in lexicon:
+                if i > 1:
+                    if lowers[i - 2] != "at" and lowers[i - 2] != "very":
+                        valence = valence * N_SCALAR
+                else:
+                    valence = valence * N_SCALAR
+
+            sentiments[i] = valence
+
+        if "but" in lowers:
+            self._but_check(lowers.index("but"), sentiments)
+
+        return self._score_valence(sentiments, exclamations, questions)
+
+    def _negation_check(self, valence, lowers, start_i, i):
+        if start_i == 0:
+            if self._is_negated(lowers[i - 1]):
+                valence = valence * N_SCALAR
+        elif start_i == 1:
+            if lowers[i - 2] == "never" and lowers[i - 1] in ("so", "this"):
+                valence = valence * 1.25
+            elif lowers[i - 2] == "without" and lowers[i - 1] == "doubt":
+                pass
+            elif self._is_negated(lowers[i - 2]):
+                valence = valence * N_SCALAR
+        else:
+            if (lowers[i - 3] == "never" and lowers[i - 2] in ("so", "this")) or lowers[i - 1] in ("so", "this"):
+                valence = valence * 1.25
+            elif lowers[i - 3] == "without" and (lowers[i - 2] == "doubt" or lowers[i - 1] == "doubt"):
+                pass
+            elif self._is_negated(lowers[i - 3]):
+                valence = valence * N_SCALAR
+        return valence
+
+    def _special_idioms_check(self, valence, lowers, i, count):
+        window = lowers[i - 3:i + 3]
+        if not any(word in self.idiom_words for word in window):
+            return valence
+
+        special_cases = self.special_cases
+        onezero = f"{lowers[i - 1]} {lowers[i]}"
+        twoonezero = f"{lowers[i - 2]} {lowers[i - 1]} {lowers[i]}"
+        twoone = f"{lowers[i - 2]} {lowers[i - 1]}"
+        threetwoone = f"{lowers[i - 3]} {lowers[i - 2]} {lowers[i - 1]}"
+        threetwo = f"{lowers[i - 3]} {lowers[i - 2]}"
+
+        for sequence in (onezero, twoonezero, twoone, threetwoone, threetwo):
+            if sequence in special_cases:
+                valence = special_cases[sequence]
+                break
+
+        if count - 1 > i:
+            zeroone = f"{lowers[i]} {lowers[i + 1]}"
+            if zeroone in special_cases:
+                valence = special_cases[zeroone]
+        if count - 1 > i + 1:
+            zeroonetwo = f"{lowers[i]} {lowers[i + 1]} {lowers[i + 2]}"
+            if zeroonetwo in special_cases:
+                valence = special_cases[zeroonetwo]
+
+        # Booster bi-grams such as "sort of" or "kind of"
+        for n_gram in (threetwoone, threetwo, twoone):
+            if n_gram in self.booster_ngrams:
+                valence = valence + self.booster_ngrams[n_gram]
+        return valence
+
+    @staticmethod
+    def _but_check(but_index, sentiments):
+        # The reference rescales sentiments[sentiments.index(value)] for each
+        # word in turn: the first position currently holding an equal value,
+        # which differs from the word's own position when valences repeat.
+        # Positions are kept in a heap per value, so that lookup costs
+        # O(log n) instead of a scan of the list.
+        positions = {}
+        for i, sentiment in enumerate(sentiments):
+            if sentiment:
+                positions.setdefault(sentiment, []).append(i)
+        for k in range(len(sentiments)):
+            sentiment = sentiments[k]
+            if not sentiment:
+                continue  # zero stays zero wherever it is rescaled
+            held = positions[sentiment]
+            si = held[0]
+            if si < but_index:
+                rescaled = sentiment * 0.5
+            elif si > but_index:
+                rescaled = sentiment * 1.5
+            else:
+                continue
+            heapq.heappop(held)
+            if not held:
+                del positions[sentiment]
+            sentiments[si] = rescaled
+            heapq.heappush(positions.setdefault(rescaled, []), si)
+
+    @staticmethod
+    def _score_valence(sentiments, exclamations, questions):
+        sum_s = float(sum(sentiments))
+
+        # Emphasis from up to four exclamation points and two or more question marks
+        punct_emph_amplifier = min(exclamations, 4) * 0.292
+        if questions > 1:
+            punct_emph_amplifier += questions * 0.18 if questions <= 3 else 0.96
+
+        if sum_s > 0:
+            sum_s += punct_emph_amplifier
+        elif sum_s < 0:
+            sum_s -= punct_emph_amplifier
+
+        compound = sum_s / math.sqrt((sum_s * sum_s) + 15)
+        compound = max(-1.0, min(1.0, compound))
+
+        pos_sum = 0.0
+        neg_sum = 0.0
+        neu_count = 0
+        for sentiment in sentiments:
+            if sentiment > 0:
+                pos_sum += (float(sentiment) + 1)
+            if sentiment < 0:
+                neg_sum += (float(sentiment) - 1)
+            if sentiment == 0:
+                neu_count += 1
+
+        if pos_sum > math.fabs(neg_sum):
+            pos_sum += punct_emph_amplifier
+        elif pos_sum < math.fabs(neg_sum):
+            neg_sum -= punct_emph_amplifier
+
+        total = pos_sum + math.fabs(neg_sum) + neu_count
+        return {
+            "neg": round(math.fabs(neg_sum / total), 3),
+            "neu": round(math.fabs(neu_count / total), 3),
+            "pos": round(math.fabs(pos_sum / total), 3),
+            "compound": round(compound, 4)
+        }
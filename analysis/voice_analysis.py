@@ -1,69 +1,114 @@
-import librosa
 import numpy as np
 import os
-from sklearn.preprocessing import StandardScaler
 import warnings
+from utils.metrics import stage_timer
 warnings.filterwarnings('ignore')
 
+# Per quality level: seconds of audio loaded and which feature families run.
+# The rule-based classifier only reads RMS, ZCR, spectral centroid and tempo,
+# so 'reduced' drops the expensive unused families (tonnetz's harmonic
+# separation dominates) without changing the classification. 'minimal' also
+# trims the audio and estimates tempo without full beat tracking. A trained
+# emotion model (analysis/emotion_model.py) reads every family and imputes
+# the skipped ones
+VOICE_QUALITY_SETTINGS = {
+    'full': {'duration': 30, 'mfcc': True, 'chroma': True, 'contrast': True, 'tonnetz': True, 'beat_track': True},
+    'reduced': {'duration': 30, 'mfcc': True, 'chroma': True, 'contrast': False, 'tonnetz': False, 'beat_track': True},
+    'minimal': {'duration': 15, 'mfcc': False, 'chroma': False, 'contrast': False, 'tonnetz': False, 'beat_track': False}
+}
+
+# Every scalar extract_features can produce, in feature-store column order;
+# families skipped at lower quality levels are simply absent
+VOICE_FEATURE_NAMES = (
+    ['spectral_centroid_mean', 'spectral_centroid_std', 'spectral_rolloff_mean', 'spectral_rolloff_std',
+     'zcr_mean', 'zcr_std']
+    + [f'mfcc_{i}_{stat}' for i in range(13) for stat in ('mean', 'std')]
+    + ['chroma_mean', 'chroma_std', 'spectral_contrast_mean', 'spectral_contrast_std',
+       'tonnetz_mean', 'tonnetz_std', 'tempo', 'rms_mean', 'rms_std']
+)
+
 class VoiceAnalyzer:
-    def __init__(self):
-        """Initialize voice analyzer with feature extraction capabilities"""
+    def __init__(self, emotion_model=None):
+        """Initialize voice analyzer (emotion_model: optional ModelHandle used instead of the rules once it loads)"""
         self.sample_rate = 22050
         self.emotion_labels = ['calm', 'happy', 'sad', 'angry', 'fearful', 'surprised']
+        self.emotion_model = emotion_model
         
-    def extract_features(self, audio_path):
+    def extract_features(self, audio_path, quality_level='full'):
         """Extract audio features for emotion analysis"""
+        # librosa (and numba) load on first use to keep startup fast
+        import librosa
+        
+        settings = VOICE_QUALITY_SETTINGS[quality_level]
+        
         try:
             # Load audio file
-            y, sr = librosa.load(audio_path, sr=self.sample_rate, duration=30)
+            with stage_timer('voice.decode'):
+                y, sr = librosa.load(audio_path, sr=self.sample_rate, duration=settings['duration'])
             
             # Extract various audio features
             features = {}
             
             # 1. Spectral features
-            spectral_centroids = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
-            features['spectral_centroid_mean'] = np.mean(spectral_centroids)
-            features['spectral_centroid_std'] = np.std(spectral_centroids)
+            with stage_timer('voice.spectral_centroid'):
+                spectral_centroids = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
+                features['spectral_centroid_mean'] = np.mean(spectral_centroids)
+                features['spectral_centroid_std'] = np.std(spectral_centroids)
             
             # 2. Spectral rolloff
-            spectral_rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr)[0]
-            features['spectral_rolloff_mean'] = np.mean(spectral_rolloff)
-            features['spectral_rolloff_std'] = np.std(spectral_rolloff)
+            with stage_timer('voice.spectral_rolloff'):
+                spectral_rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr)[0]
+                features['spectral_rolloff_mean'] = np.mean(spectral_rolloff)
+                features['spectral_rolloff_std'] = np.std(spectral_rolloff)
             
             # 3. Zero crossing rate
-            zcr = librosa.feature.zero_crossing_rate(y)[0]
-            features['zcr_mean'] = np.mean(zcr)
-            features['zcr_std'] = np.std(zcr)
+            with stage_timer('voice.zcr'):
+                zcr = librosa.feature.zero_crossing_rate(y)[0]
+                features['zcr_mean'] = np.mean(zcr)
+                features['zcr_std'] = np.std(zcr)
             
             # 4. MFCCs (Mel-frequency cepstral coefficients)
-            mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-            for i in range(13):
-                features[f'mfcc_{i}_mean'] = np.mean(mfccs[i])
-                features[f'mfcc_{i}_std'] = np.std(mfccs[i])
+            if settings['mfcc']:
+                with stage_timer('voice.mfcc'):
+                    mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
+                    for i in range(13):
+                        features[f'mfcc_{i}_mean'] = np.mean(mfccs[i])
+                        features[f'mfcc_{i}_std'] = np.std(mfccs[i])
             
             # 5. Chroma features
-            chroma = librosa.feature.chroma_stft(y=y, sr=sr)
-            features['chroma_mean'] = np.mean(chroma)
-            features['chroma_std'] = np.std(chroma)
+            if settings['chroma']:
+                with stage_timer('voice.chroma'):
+                    chroma = librosa.feature.chroma_stft(y=y, sr=sr)
+                    features['chroma_mean'] = np.mean(chroma)
+                    features['chroma_std'] = np.std(chroma)
             
             # 6. Spectral contrast
-            contrast = librosa.feature.spectral_contrast(y=y, sr=sr)
-            features['spectral_contrast_mean'] = np.mean(contrast)
-            features['spectral_contrast_std'] = np.std(contrast)
+            if settings['contrast']:
+                with stage_timer('voice.spectral_contrast'):
+                    contrast = librosa.feature.spectral_contrast(y=y, sr=sr)
+                    features['spectral_contrast_mean'] = np.mean(contrast)
+                    features['spectral_contrast_std'] = np.std(contrast)
             
-            # 7. Tonnetz
-            tonnetz = librosa.feature.tonnetz(y=librosa.effects.harmonic(y), sr=sr)
-            features['tonnetz_mean'] = np.mean(tonnetz)
-            features['tonnetz_std'] = np.std(tonnetz)
+            # 7. Tonnetz (harmonic separation makes this the most expensive family)
+            if settings['tonnetz']:
+                with stage_timer('voice.tonnetz'):
+                    tonnetz = librosa.feature.tonnetz(y=librosa.effects.harmonic(y), sr=sr)
+                    features['tonnetz_mean'] = np.mean(tonnetz)
+                    features['tonnetz_std'] = np.std(tonnetz)
             
             # 8. Tempo
-            tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-            features['tempo'] = tempo
+            with stage_timer('voice.tempo'):
+                if settings['beat_track']:
+                    tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
+                else:
+                    tempo = librosa.feature.tempo(y=y, sr=sr)
+                features['tempo'] = tempo
             
             # 9. RMS Energy
-            rms = librosa.feature.rms(y=y)[0]
-            features['rms_mean'] = np.mean(rms)
-            features['rms_std'] = np.std(rms)
+            with stage_timer('voice.rms'):
+                rms = librosa.feature.rms(y=y)[0]
+                features['rms_mean'] = np.mean(rms)
+                features['rms_std'] = np.std(rms)
             
             return features
             
@@ -183,8 +228,48 @@ class VoiceAnalyzer:
         
         return recommendations
     
-    def analyze_audio(self, audio_path):
-        """Main method to analyze audio file"""
+    def classify_emotion(self, features):
+        """Model-backed classification when a model is loaded, the rule-based classifier otherwise"""
+        model = self.emotion_model.get() if self.emotion_model is not None else None
+        if model is None or not features:
+            return self.classify_emotion_simple(features)
+        return model.classify(features)
+    
+    def score_features(self, features):
+        """Classify extracted features: emotion, vocal characteristics, recommendations and emotion score"""
+        # Classify emotion
+        emotion_result = self.classify_emotion(features)
+        
+        # Analyze vocal characteristics
+        characteristics = self.analyze_vocal_characteristics(features)
+        
+        # Generate recommendations
+        recommendations = self.generate_voice_recommendations(
+            emotion_result['emotion'], 
+            characteristics
+        )
+        
+        # Calculate overall emotion score for combination with other analyses
+        emotion_score = 0.0
+        if emotion_result['emotion'] in ['happy', 'calm']:
+            emotion_score = emotion_result['confidence'] * 0.7
+        elif emotion_result['emotion'] in ['sad', 'angry', 'fearful']:
+            emotion_score = -emotion_result['confidence'] * 0.7
+        
+        result = {
+            "primary_emotion": emotion_result['emotion'],
+            "confidence": emotion_result['confidence'],
+            "emotion_scores": emotion_result['emotion_scores'],
+            "vocal_characteristics": characteristics,
+            "recommendations": recommendations,
+            "emotion_score": emotion_score
+        }
+        if 'model' in emotion_result:
+            result["emotion_model"] = emotion_result['model']
+        return result
+    
+    def analyze_audio(self, audio_path, quality_level='full', include_features=False):
+        """Main method to analyze audio file (include_features adds the raw feature dict for storage)"""
         if not os.path.exists(audio_path):
             return {
                 "error": "Audio file not found",
@@ -194,7 +279,7 @@ class VoiceAnalyzer:
         
         try:
             # Extract features
-            features = self.extract_features(audio_path)
+            features = self.extract_features(audio_path, quality_level)
             
             if not features:
                 return {
@@ -203,35 +288,17 @@ class VoiceAnalyzer:
                     "confidence": 0.0
                 }
             
-            # Classify emotion
-            emotion_result = self.classify_emotion_simple(features)
-            
-            # Analyze vocal characteristics
-            characteristics = self.analyze_vocal_characteristics(features)
-            
-            # Generate recommendations
-            recommendations = self.generate_voice_recommendations(
-                emotion_result['emotion'], 
-                characteristics
-            )
-            
-            # Calculate overall emotion score for combination with other analyses
-            emotion_score = 0.0
-            if emotion_result['emotion'] in ['happy', 'calm']:
-                emotion_score = emotion_result['confidence'] * 0.7
-            elif emotion_result['emotion'] in ['sad', 'angry', 'fearful']:
-                emotion_score = -emotion_result['confidence'] * 0.7
+            with stage_timer('voice.classify'):
+                result = self.score_features(features)
             
-            return {
-                "primary_emotion": emotion_result['emotion'],
-                "confidence": emotion_result['confidence'],
-                "emotion_scores": emotion_result['emotion_scores'],
-                "vocal_characteristics": characteristics,
-                "recommendations": recommendations,
-                "emotion_score": emotion_score,
+            result.update({
                 "audio_duration": self._get_audio_duration(audio_path),
-                "features_extracted": len(features)
-            }
+                "features_extracted": len(features),
+                "quality_level": quality_level
+            })
+            if include_features:
+                result["features"] = features
+            return result
             
         except Exception as e:
             return {
@@ -242,8 +309,11 @@ class VoiceAnalyzer:
     
     def _get_audio_duration(self, audio_path):
         """Get audio file duration"""
+        import librosa
+        
         try:
-            y, sr = librosa.load(audio_path, sr=None)
+            with stage_timer('voice.duration_probe'):
+                y, sr = librosa.load(audio_path, sr=None)
             return len(y) / sr
         except:
             return 0.0
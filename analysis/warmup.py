@@ -0,0 +1,102 @@
+import io
+import os
+import time
+import numpy as np
+from utils.load_control import QUALITY_LEVELS
+
+# Default on-disk location for numba's compiled-kernel cache, next to the
+# other runtime state in instance/ rather than in the source tree
+DEFAULT_NUMBA_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'numba_cache')
+
+def configure_numba_cache(cache_dir=None):
+    """Point numba's on-disk cache at a writable directory.
+
+    librosa marks its kernels with cache=True, so with a writable cache the
+    JIT cost is paid once per machine instead of once per worker. Must run
+    before librosa (and therefore numba) is first imported.
+    """
+    cache_dir = cache_dir or os.environ.get('NUMBA_CACHE_DIR') or DEFAULT_NUMBA_CACHE_DIR
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError as e:
+        print(f"Warning: numba cache disabled, cannot create {cache_dir}: {e}")
+        return None
+    os.environ.setdefault('NUMBA_CACHE_DIR', cache_dir)
+    return os.environ['NUMBA_CACHE_DIR']
+
+def speech_like_signal(seconds=2.0, sample_rate=22050, seed=0):
+    """Float32 samples of a gliding harmonic tone with a syllable-rate envelope and light noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+
+    f0 = 140 + 30 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 4 * t))
+    y = 0.1 * envelope * voiced + 0.005 * rng.standard_normal(len(t))
+    return y.astype(np.float32)
+
+def synthetic_audio(sample_rate=22050, duration=2.0):
+    """Build an in-memory WAV of a speech-like harmonic signal"""
+    import soundfile as sf
+
+    buffer = io.BytesIO()
+    sf.write(buffer, speech_like_signal(duration, sample_rate), sample_rate, format='WAV')
+    buffer.seek(0)
+    return buffer
+
+def synthetic_frame(width=320, height=240):
+    """Build a BGR frame with a drawn face-like pattern"""
+    import cv2
+
+    frame = np.full((height, width, 3), 90, dtype=np.uint8)
+    center = (width // 2, height // 2)
+    cv2.ellipse(frame, center, (width // 6, height // 4), 0, 0, 360, (180, 200, 230), -1)
+    for dx in (-width // 16, width // 16):
+        cv2.circle(frame, (center[0] + dx, center[1] - height // 16), max(3, width // 40), (40, 40, 40), -1)
+    cv2.ellipse(frame, (center[0], center[1] + height // 10), (width // 20, height // 40), 0, 0, 180, (60, 60, 150), 2)
+    return frame
+
+def warm_up(voice_analyzer=None, facial_analyzer=None, text_analyzer=None):
+    """Run each analyzer once on synthetic inputs and return stage timings"""
+    configure_numba_cache()
+
+    stages = {}
+    started = time.perf_counter()
+
+    def timed(name, func):
+        stage_start = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            print(f"Warning: warm-up stage {name} failed: {e}")
+            stages[name] = {'seconds': time.perf_counter() - stage_start, 'error': str(e)}
+            return
+        stages[name] = {'seconds': time.perf_counter() - stage_start}
+
+    if voice_analyzer is not None:
+        def run_voice(quality_level):
+            # First call JIT-compiles (or loads from cache) librosa's numba kernels.
+            # extract_features reports its own failures by returning None
+            if not voice_analyzer.extract_features(synthetic_audio(voice_analyzer.sample_rate), quality_level):
+                raise RuntimeError("extract_features returned no features")
+        timed('voice.extract_features', lambda: run_voice(QUALITY_LEVELS[0]))
+        # The lowest level estimates tempo with different kernels; compile those
+        # now rather than on the first request degraded under load
+        timed(f'voice.extract_features.{QUALITY_LEVELS[-1]}', lambda: run_voice(QUALITY_LEVELS[-1]))
+
+    if facial_analyzer is not None:
+        def run_facial():
+            frame = synthetic_frame()
+            facial_analyzer.detect_faces(frame)
+            height, width = frame.shape[:2]
+            facial_analyzer.extract_facial_features(frame, (width // 3, height // 4, width // 3, height // 2))
+        timed('facial.detect_faces', run_facial)
+
+    if text_analyzer is not None:
+        timed('text.analyze_responses', lambda: text_analyzer.analyze_responses(["Warm-up: feeling fine today"]))
+
+    return {
+        'stages': stages,
+        'total_seconds': time.perf_counter() - started
+    }
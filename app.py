@@ -1,43 +1,450 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, g, send_from_directory
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.wsgi import get_input_stream
 import os
 import json
-from analysis.text_analysis import TextAnalyzer
+import atexit
+from analysis.text_analysis import TextAnalyzer, TEXT_OUTPUTS, DEFAULT_TEXT_OUTPUTS
 from analysis.voice_analysis import VoiceAnalyzer
+from analysis.emotion_model import ModelHandle
 from analysis.facial_analysis import FacialAnalyzer
+from utils.cache import LRUCache
+from utils.http_cache import CachedBody, StaticAssets, WatchedFile
+from utils.lazy import LazyAnalyzer
+from utils.streaming import iter_ndjson, encode_ndjson, format_sse
+from utils.jobs import JobQueue, InMemoryJobStore, SQLiteJobStore, QueueFullError, FINISHED_STATUSES
+from utils.session_store import SessionStore, SQLiteSessionStore
+from utils.history import HistoryStore, HistoryWriter, HistoryTokens, HISTORY_MODALITIES, valid_user_id
+from utils.admission import AdmissionController, AdmissionRejected
+from utils.load_control import LoadController, QUALITY_LEVELS
+from utils.metrics import REGISTRY, BYTE_BUCKETS, stage_timer
+from utils import memory
+from utils.profiling import ProfilingMiddleware
+from analysis.warmup import warm_up, configure_numba_cache
+from analysis.pipeline import AnalysisPipeline
 import base64
+import secrets
+import functools
 import tempfile
-from collections import Counter
+import time
 
-app = Flask(__name__)
+# Let librosa's numba kernels persist compiled code across worker restarts
+configure_numba_cache()
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, recording response serialisation time"""
+    
+    def dumps(self, obj, **kwargs):
+        with stage_timer('response.serialize'):
+            return super().dumps(obj, **kwargs)
+
+# Static files are served by the cached route below instead of Flask's own
+app = Flask(__name__, static_folder=None)
+app.json = TimedJSONProvider(app)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
-# Initialize analyzers
-text_analyzer = TextAnalyzer()
-voice_analyzer = VoiceAnalyzer()
-facial_analyzer = FacialAnalyzer()
+# Opt-in request profiling for admins (?profile=sample|cprofile plus token).
+# Without PROFILE_ADMIN_TOKEN the middleware is never installed
+if os.environ.get('PROFILE_ADMIN_TOKEN'):
+    app.wsgi_app = ProfilingMiddleware(
+        app.wsgi_app,
+        token=os.environ['PROFILE_ADMIN_TOKEN'],
+        output_dir=os.environ.get('PROFILE_DIR', 'instance/profiles'),
+        thread_prefixes=('modality',)
+    )
+
+# Request counts and latency by view and outcome; analysis stages record
+# their own timings into the same registry, served from /metrics
+http_requests = REGISTRY.counter(
+    'http_requests_total', 'Requests handled, by endpoint and outcome', ('endpoint', 'outcome')
+)
+http_request_seconds = REGISTRY.histogram(
+    'http_request_duration_seconds',
+    'Time to produce each response, by endpoint and outcome (streamed bodies count until the first byte)',
+    ('endpoint', 'outcome')
+)
+
+def request_outcome(status_code):
+    if status_code == 503:
+        return 'rejected'
+    if status_code >= 500:
+        return 'error'
+    if status_code >= 400:
+        return 'client_error'
+    return 'success'
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        labels = {'endpoint': request.endpoint or 'unmatched', 'outcome': request_outcome(response.status_code)}
+        http_requests.inc(**labels)
+        http_request_seconds.observe(time.perf_counter() - started, **labels)
+    return response
+
+# MEMORY_TRACKING=1 traces Python allocations with tracemalloc: analysis stages
+# and requests record their peak bytes, and ?debug=memory (or X-Debug: memory)
+# adds a per-stage breakdown to JSON responses. Tracing slows allocation-heavy
+# code, so it is meant for soak runs and investigations rather than always-on
+memory_tracking = os.environ.get('MEMORY_TRACKING', '').lower() in ('1', 'true', 'yes')
+if memory_tracking:
+    memory.start_tracking()
+
+http_request_peak_bytes = REGISTRY.histogram(
+    'http_request_peak_bytes',
+    'Peak Python allocation while producing each response, by endpoint (recorded while MEMORY_TRACKING is on)',
+    ('endpoint',),
+    buckets=BYTE_BUCKETS
+)
+REGISTRY.gauge(
+    'process_resident_memory_bytes', 'Current resident set size of this worker', (),
+    lambda: {(): memory.rss_bytes() or 0}
+)
+REGISTRY.gauge(
+    'process_peak_resident_memory_bytes', 'Highest resident set size this worker has reached', (),
+    lambda: {(): memory.peak_rss_bytes() or 0}
+)
+REGISTRY.gauge(
+    'process_memory_bytes', 'Resident memory of this worker by kind (pss charges shared pages proportionally, private is unshared)', ('kind',),
+    lambda: {(kind,): value for kind, value in (memory.smaps_rollup() or {}).items() if kind in ('pss', 'shared', 'private')}
+)
+
+@app.before_request
+def start_memory_tracking():
+    if not memory_tracking:
+        return
+    g.memory_frame = memory.begin_stage()
+    if 'memory' in (request.args.get('debug'), request.headers.get('X-Debug')):
+        g.memory_collector = memory.MemoryCollector()
+        g.memory_token = memory.collect(g.memory_collector)
+
+@app.after_request
+def attach_memory_report(response):
+    frame = g.pop('memory_frame', None)
+    if frame is None:
+        return response
+    peak = memory.end_stage(frame)
+    http_request_peak_bytes.observe(peak, endpoint=request.endpoint or 'unmatched')
+
+    collector = g.get('memory_collector')
+    if collector is not None and response.is_json:
+        payload = response.get_json(silent=True)
+        if isinstance(payload, dict):
+            report = collector.report()
+            report['request_peak_bytes'] = peak
+            payload['debug'] = {'memory': report}
+            response.set_data(json.dumps(payload))
+    return response
+
+@app.teardown_request
+def stop_memory_tracking(exc):
+    # Close what after_request did not (unhandled errors skip it)
+    frame = g.pop('memory_frame', None)
+    if frame is not None:
+        memory.end_stage(frame)
+    token = g.pop('memory_token', None)
+    if token is not None:
+        memory.stop_collecting(token)
+
+# Analyzers are built on first use of each modality; the sentiment memo is
+# shared by every text endpoint
+text_score_cache = LRUCache(capacity=int(os.environ.get('TEXT_SCORE_CACHE_SIZE', 4096)))
+text_analyzer = LazyAnalyzer(lambda: TextAnalyzer(score_cache=text_score_cache))
+# VOICE_EMOTION_MODEL points at a model from train_emotion_model.py; it is
+# re-read when the file is replaced, and the rules apply until it loads
+voice_emotion_model = None
+if os.environ.get('VOICE_EMOTION_MODEL'):
+    voice_emotion_model = ModelHandle(
+        os.environ['VOICE_EMOTION_MODEL'],
+        check_interval=float(os.environ.get('VOICE_MODEL_CHECK_INTERVAL', 5))
+    )
+voice_analyzer = LazyAnalyzer(lambda: VoiceAnalyzer(emotion_model=voice_emotion_model))
+facial_analyzer = LazyAnalyzer(FacialAnalyzer)
+# Background jobs for long voice/facial analyses; JOB_STORE=sqlite shares job
+# status between worker processes through a local database file
+if os.environ.get('JOB_STORE', 'memory') == 'sqlite':
+    job_store = SQLiteJobStore(os.environ.get('JOB_STORE_PATH', 'instance/jobs.sqlite3'))
+else:
+    job_store = InMemoryJobStore()
+job_queue = JobQueue(
+    job_store,
+    max_workers=int(os.environ.get('JOB_WORKERS', 2)),
+    max_pending=int(os.environ.get('JOB_QUEUE_SIZE', 32))
+)
+
+# Per-session results written by each modality endpoint and read back by
+# /combined_analysis; SESSION_STORE=sqlite shares them across processes
+session_ttl = float(os.environ.get('SESSION_TTL', 3600))
+if os.environ.get('SESSION_STORE', 'memory') == 'sqlite':
+    session_store = SQLiteSessionStore(os.environ.get('SESSION_STORE_PATH', 'instance/sessions.sqlite3'), ttl_seconds=session_ttl)
+else:
+    session_store = SessionStore(ttl_seconds=session_ttl)
+
+# HISTORY_DB keeps the results of requests that carry a history token, for
+# trend queries over weeks; requests only enqueue, a background thread writes.
+# Tokens are signed with HISTORY_SECRET; without it a random secret is made
+# at import (shared by serve.py's forked workers) and tokens end with the process
+history_store = None
+history_writer = None
+history_tokens = None
+HISTORY_TOKEN_COOKIE = 'history_token'
+if os.environ.get('HISTORY_DB'):
+    history_store = HistoryStore(os.environ['HISTORY_DB'])
+    history_tokens = HistoryTokens(os.environ.get('HISTORY_SECRET') or secrets.token_hex(32))
+    history_writer = HistoryWriter(
+        history_store,
+        max_pending=int(os.environ.get('HISTORY_QUEUE_SIZE', 1000)),
+        batch_size=int(os.environ.get('HISTORY_BATCH_SIZE', 200))
+    )
+    REGISTRY.gauge(
+        'history_pending_writes', 'Results queued for the history database', (),
+        lambda: {(): history_writer.pending()}
+    )
+    REGISTRY.gauge(
+        'history_dropped_total', 'Results not recorded because the history queue was full', (),
+        lambda: {(): history_writer.stats()['dropped']}, metric_type='counter'
+    )
+
+def shutdown():
+    """Write queued history before the process exits"""
+    if history_writer is not None:
+        history_writer.close()
+
+atexit.register(shutdown)
+
+# Concurrency limits per CPU-heavy endpoint class. Requests beyond the limit
+# wait in a short bounded queue; the rest get 503 with Retry-After instead of
+# slowing every in-flight analysis down together
+def admission_setting(endpoint_class, name, default):
+    value = os.environ.get(f'ADMISSION_{endpoint_class.upper()}_{name}', os.environ.get(f'ADMISSION_{name}'))
+    return type(default)(value) if value is not None else default
+
+admission = {
+    endpoint_class: AdmissionController(
+        endpoint_class,
+        max_concurrent=admission_setting(endpoint_class, 'CONCURRENCY', os.cpu_count() or 2),
+        max_waiting=admission_setting(endpoint_class, 'QUEUE_SIZE', 2 * (os.cpu_count() or 2)),
+        wait_timeout=admission_setting(endpoint_class, 'WAIT_TIMEOUT', 30.0),
+        retry_after=admission_setting(endpoint_class, 'RETRY_AFTER', 5)
+    )
+    for endpoint_class in ('voice', 'facial', 'answer', 'session')
+}
+
+# Job event streams hold a request thread each while open, so they get their
+# own limit (never the CPU-based default) and are turned away, not queued
+event_streams = AdmissionController(
+    'events',
+    max_concurrent=int(os.environ.get('ADMISSION_EVENTS_CONCURRENCY', 4)),
+    retry_after=admission_setting('events', 'RETRY_AFTER', 5)
+)
+# Seconds an event stream stays open before the client is told to reconnect
+event_stream_seconds = float(os.environ.get('EVENT_STREAM_SECONDS', 60))
+
+def admitted(endpoint_class):
+    """Run the view only once its endpoint class has a free slot"""
+    controller = admission[endpoint_class]
+    
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # Rejected before the upload body is read or saved
+            try:
+                controller.acquire()
+            except AdmissionRejected as e:
+                response = jsonify({"error": str(e)})
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response, 503
+            try:
+                return view(*args, **kwargs)
+            finally:
+                controller.release()
+        return wrapper
+    return decorator
+
+def analysis_pressure():
+    """Share of heavy-endpoint slots and queue places in use; the busiest class wins"""
+    ratios = []
+    for controller in admission.values():
+        stats = controller.stats()
+        ratios.append((stats['active'] + stats['waiting']) / (stats['max_concurrent'] + stats['max_waiting']))
+    job_stats = job_queue.stats()
+    ratios.append(job_stats['pending'] / max(1, job_stats['capacity']))
+    return max(ratios)
+
+# Under load, voice and facial analysis switch to cheaper settings rather than
+# time out; QUALITY_LEVEL pins one level and turns adaptation off
+quality_controller = LoadController(
+    pressure=analysis_pressure,
+    latency_budget=float(os.environ.get('QUALITY_LATENCY_BUDGET', 10.0)),
+    hold_seconds=float(os.environ.get('QUALITY_HOLD_SECONDS', 15.0)),
+    forced_level=os.environ.get('QUALITY_LEVEL') or None
+)
+pipeline = AnalysisPipeline(
+    text_analyzer, voice_analyzer, facial_analyzer,
+    max_workers=int(os.environ.get('SESSION_WORKERS', 6)),
+    quality_controller=quality_controller
+)
+
+REGISTRY.gauge(
+    'admission_requests', 'Requests holding or waiting for an admission slot', ('endpoint_class', 'state'),
+    lambda: {
+        (name, state): controller.stats()[state]
+        for name, controller in dict(admission, events=event_streams).items() for state in ('active', 'waiting')
+    }
+)
+REGISTRY.gauge(
+    'admission_rejected_total', 'Requests turned away with 503 by admission control', ('endpoint_class',),
+    lambda: {(name,): controller.stats()['rejected'] for name, controller in dict(admission, events=event_streams).items()},
+    metric_type='counter'
+)
+REGISTRY.gauge(
+    'job_queue_pending', 'Background jobs queued or running', (),
+    lambda: {(): job_queue.stats()['pending']}
+)
+REGISTRY.gauge(
+    'analysis_quality_level', 'Current voice/facial quality level (0 = full, 1 = reduced, 2 = minimal)', (),
+    lambda: {(): QUALITY_LEVELS.index(quality_controller.stats()['level'])}
+)
+
+def open_session(session_id):
+    """Return the session to record results in, creating one when none is given"""
+    if not session_id:
+        return session_store.create_session()
+    return session_id if session_store.exists(session_id) else None
+
+def unknown_session():
+    return jsonify({"error": "Unknown or expired session"}), 404
+
+class SessionExpired(Exception):
+    """The session expired (or was evicted) before a result could be stored in it"""
+
+    def __init__(self):
+        super().__init__("Unknown or expired session")
+
+def store_result(session_id, modality, payload):
+    if not session_store.put(session_id, modality, payload):
+        raise SessionExpired()
+
+def store_answer(session_id, modality, question_index, result):
+    if not session_store.put_answer(session_id, modality, question_index, result):
+        raise SessionExpired()
+
+def request_user_id():
+    """The caller's history id, from a signed X-History-Token header or history_token cookie"""
+    if history_tokens is None:
+        return None
+    return history_tokens.user_id(request.headers.get('X-History-Token') or request.cookies.get(HISTORY_TOKEN_COOKIE))
+
+def record_history(user_id, session_id, modality, payload):
+    """Queue a result for the user's history; a no-op without HISTORY_DB or a user id"""
+    if history_writer is not None and user_id:
+        history_writer.record(user_id, session_id, modality, payload)
+
+# The page, its scripts and the questions are the same for every visitor:
+# keep them in memory with precompressed variants and validators, reload
+# files only when they change on disk, and answer revalidations with 304
+file_check_interval = float(os.environ.get('FILE_CHECK_INTERVAL', 2))
+static_assets = StaticAssets(os.path.join(app.root_path, 'static'), check_interval=file_check_interval)
+rendered_pages = LRUCache(capacity=8)
+cached_responses = REGISTRY.counter(
+    'http_cached_responses_total', 'Responses served from the in-memory page, asset and question caches, by result',
+    ('endpoint', 'result')
+)
+
+def load_questions(data, mtime):
+    # Parse once per file version; every request reuses the encoded body
+    return CachedBody(app.json.dumps(json.loads(data)).encode('utf-8'), 'application/json', mtime)
+
+questions_file = WatchedFile('questions/questions.json', load_questions, check_interval=file_check_interval)
+# Fallback questions if file doesn't exist
+default_questions = CachedBody(app.json.dumps({"questions": [
+    "How was your day today?",
+    "Have you been feeling anxious or overwhelmed lately?",
+    "Can you share something that made you smile recently?",
+    "How are your sleeping patterns lately?",
+    "Do you often feel tired or restless?"
+]}).encode('utf-8'), 'application/json')
+
+def cached_response(body, cache_control):
+    """Serve a CachedBody in the best encoding the client accepts, or 304 when its copy is current"""
+    encoding, data, etag = body.negotiate(request.accept_encodings.quality)
+    response = Response(data, mimetype=body.mimetype)
+    response.set_etag(etag)
+    if body.last_modified is not None:
+        response.last_modified = body.last_modified
+    if len(body.variants) > 1:
+        response.vary.add('Accept-Encoding')
+    if encoding != 'identity':
+        response.content_encoding = encoding
+    response.headers['Cache-Control'] = cache_control
+    response.make_conditional(request)
+    cached_responses.inc(endpoint=request.endpoint, result='not_modified' if response.status_code == 304 else encoding)
+    return response
+
+@app.context_processor
+def inject_static_url():
+    return {'static_url': static_assets.url}
+
+@app.route('/sessions', methods=['POST'])
+def create_session():
+    """Start an empty session for a client that records results from several requests"""
+    return jsonify({"session_id": session_store.create_session()}), 201
 
 @app.route('/')
 def index():
     """Main page with tabbed interface for different input modes"""
-    return render_template('index.html')
+    html = render_template('index.html')
+    # Keyed by the rendered text, so a new asset fingerprint yields a new entry
+    body = rendered_pages.get_or_compute(html, lambda: CachedBody(html.encode('utf-8'), 'text/html'))
+    return cached_response(body, 'no-cache')
+
+@app.route('/static/<path:filename>', endpoint='static')
+def static_file(filename):
+    """Static assets; fingerprinted URLs (?v=<hash>) may be cached for a year"""
+    body = static_assets.get(filename)
+    if body is None:
+        # Missing, outside the folder or too large to hold in memory
+        return send_from_directory(static_assets.folder, filename)
+    if request.args.get('v') == body.fingerprint:
+        return cached_response(body, 'public, max-age=31536000, immutable')
+    return cached_response(body, 'no-cache')
 
 @app.route('/get_questions')
 def get_questions():
     """API endpoint to get questions for all input modes"""
-    try:
-        with open('questions/questions.json', 'r') as f:
-            questions = json.load(f)
-        return jsonify(questions)
-    except FileNotFoundError:
-        # Fallback questions if file doesn't exist
-        default_questions = [
-            "How was your day today?",
-            "Have you been feeling anxious or overwhelmed lately?",
-            "Can you share something that made you smile recently?",
-            "How are your sleeping patterns lately?",
-            "Do you often feel tired or restless?"
-        ]
-        return jsonify({"questions": default_questions})
+    return cached_response(questions_file.get() or default_questions, 'no-cache')
+
+@app.route('/health')
+def health():
+    """Readiness probe reporting loaded analyzers, warm-up timings, admission queues, quality level, voice model, history writes and cached static assets"""
+    return jsonify({
+        "status": "ready",
+        "analyzers_loaded": {
+            "text": text_analyzer.loaded,
+            "voice": voice_analyzer.loaded,
+            "facial": facial_analyzer.loaded
+        },
+        "warmup": warmup_report,
+        "admission": {name: controller.stats() for name, controller in dict(admission, events=event_streams).items()},
+        "quality": quality_controller.stats(),
+        "voice_model": voice_emotion_model.info() if voice_emotion_model is not None else None,
+        "history": history_writer.stats() if history_writer is not None else None,
+        "static_assets": static_assets.stats()
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint: stage latency histograms, request counters and queue gauges"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache_stats')
+def cache_stats():
+    """API endpoint exposing sentiment memo hit-rate statistics"""
+    return jsonify({"text_scores": text_score_cache.stats()})
 
 @app.route('/analyze_text', methods=['POST'])
 def analyze_text():
@@ -49,260 +456,493 @@ def analyze_text():
         if not responses:
             return jsonify({"error": "No text responses provided"}), 400
         
+        # Callers may name the outputs they need so unused scorers are skipped
+        outputs = data.get('outputs') or DEFAULT_TEXT_OUTPUTS
+        if not isinstance(outputs, (list, tuple)) or not all(isinstance(name, str) for name in outputs):
+            return jsonify({"error": "outputs must be a list of output names"}), 400
+        
+        session_id = open_session(data.get('session_id'))
+        if session_id is None:
+            return unknown_session()
+        
         # Analyze text responses
-        analysis_result = text_analyzer.analyze_responses(responses)
+        try:
+            analysis_result = text_analyzer.analyze_responses(responses, outputs=outputs)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        if not session_store.put(session_id, 'text', analysis_result):
+            return unknown_session()
+        record_history(request_user_id(), session_id, 'text', analysis_result)
         
         return jsonify({
             "success": True,
+            "session_id": session_id,
             "analysis": analysis_result
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/analyze_voice', methods=['POST'])
-def analyze_voice():
-    """Analyze multiple voice recordings for comprehensive emotional analysis"""
-    try:
-        # Get all audio files from the request
-        audio_files = {}
-        for key in request.files:
-            if key.startswith('audio_'):
-                question_index = key.replace('audio_', '')
-                audio_files[question_index] = request.files[key]
+@app.route('/analyze_text_stream', methods=['POST'])
+def analyze_text_stream():
+    """Analyze NDJSON text records from the request body, streaming NDJSON results"""
+    outputs = request.args.get('outputs')
+    outputs = tuple(outputs.split(',')) if outputs else DEFAULT_TEXT_OUTPUTS
+    unknown = set(outputs) - set(TEXT_OUTPUTS)
+    if unknown:
+        return jsonify({"error": f"Unknown text outputs: {', '.join(sorted(unknown))}"}), 400
+    
+    # Read the raw body directly so MAX_CONTENT_LENGTH does not cap bulk uploads
+    stream = get_input_stream(request.environ, max_content_length=None)
+    
+    def analyze_record(item):
+        if 'error' in item:
+            return {"line": item['line'], "success": False, "error": item['error']}
         
-        if not audio_files:
-            return jsonify({"error": "No audio files provided"}), 400
+        record = item['record']
+        record_id = record.get('id', item['line']) if isinstance(record, dict) else item['line']
+        if not isinstance(record, dict):
+            return {"id": record_id, "success": False, "error": "Record must be a JSON object"}
         
-        # Analyze each question's voice recording
-        question_analyses = {}
-        overall_analysis = {
-            'emotions': [],
-            'confidence_scores': [],
-            'vocal_characteristics': {},
-            'recommendations': [],
-            'overall_mood': 'neutral',
-            'stress_level': 'low'
-        }
+        # Accept either a list of responses or a single text entry
+        responses = record.get('responses')
+        if responses is None and record.get('text'):
+            responses = [record['text']]
+        if not responses or not isinstance(responses, list):
+            return {"id": record_id, "success": False, "error": "No text responses provided"}
         
-        temp_files = []
+        try:
+            analysis_result = text_analyzer.analyze_responses(responses, outputs=outputs)
+        except Exception as e:
+            return {"id": record_id, "success": False, "error": str(e)}
+        return {"id": record_id, "success": True, "analysis": analysis_result}
+    
+    # Each stage is a generator, so only one record is in flight at a time
+    results = (analyze_record(item) for item in iter_ndjson(stream))
+    return Response(stream_with_context(encode_ndjson(results)), mimetype='application/x-ndjson')
+
+def save_uploads(prefix, suffix):
+    """Save uploaded files named <prefix><question_index> to temporary paths"""
+    saved_paths = {}
+    try:
+        for key in request.files:
+            if key.startswith(prefix):
+                question_index = key.replace(prefix, '')
+                with stage_timer('upload.save'), tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+                    request.files[key].save(tmp_file.name)
+                    saved_paths[question_index] = tmp_file.name
+    except Exception:
+        remove_files(saved_paths.values())
+        raise
+    return saved_paths
+
+def remove_files(paths):
+    """Delete temporary upload files, ignoring ones already gone"""
+    for tmp_path in paths:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+def analyze_with_answers(session_id, modality, saved_paths, analyze_answer, aggregate):
+    """Analyze new uploads, merge them with answers already stored for the session and aggregate"""
+    # Answers sent earlier through /analyze_answer only need aggregating
+    question_analyses = session_store.get_answers(session_id, modality) or {}
+    for question_index, path in saved_paths.items():
+        question_analyses[question_index] = analyze_answer(path, question_index)
+        store_answer(session_id, modality, question_index, question_analyses[question_index])
+    if not question_analyses:
+        return None
+    payload = aggregate(question_analyses)
+    store_result(session_id, modality, payload)
+    return payload
+
+@app.route('/analyze_answer', methods=['POST'])
+@admitted('answer')
+def analyze_answer():
+    """Analyze recorded answers as they arrive and keep them in the session for later aggregation"""
+    try:
+        session_id = open_session(request.form.get('session_id'))
+        if session_id is None:
+            return unknown_session()
         
+        # Same audio_<index> / video_<index> fields as the batch endpoints
+        audio_paths = save_uploads('audio_', '.wav')
         try:
-            for question_index, audio_file in audio_files.items():
-                # Save temporary file
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_file:
-                    audio_file.save(tmp_file.name)
-                    temp_files.append(tmp_file.name)
-                
-                # Analyze this question's voice
-                try:
-                    analysis_result = voice_analyzer.analyze_audio(tmp_file.name)
-                    question_analyses[question_index] = analysis_result
-                except Exception as e:
-                    print(f"Error analyzing voice for question {question_index}: {e}")
-                    # Provide fallback analysis result
-                    question_analyses[question_index] = {
-                        'primary_emotion': 'neutral',
-                        'confidence': 0.5,
-                        'vocal_characteristics': {'energy_level': 'medium'},
-                        'recommendations': ['Unable to analyze this recording']
-                    }
-                
-                # Aggregate data for overall analysis
-                if analysis_result and 'primary_emotion' in analysis_result:
-                    overall_analysis['emotions'].append(analysis_result['primary_emotion'])
-                if analysis_result and 'confidence' in analysis_result:
-                    overall_analysis['confidence_scores'].append(analysis_result['confidence'])
-                if analysis_result and 'vocal_characteristics' in analysis_result:
-                    # Merge vocal characteristics
-                    for key, value in analysis_result['vocal_characteristics'].items():
-                        if key not in overall_analysis['vocal_characteristics']:
-                            overall_analysis['vocal_characteristics'][key] = []
-                        overall_analysis['vocal_characteristics'][key].append(value)
-                if analysis_result and 'recommendations' in analysis_result:
-                    overall_analysis['recommendations'].extend(analysis_result['recommendations'])
+            video_paths = save_uploads('video_', '.webm')
+        except Exception:
+            remove_files(audio_paths.values())
+            raise
+        
+        try:
+            if not (audio_paths or video_paths):
+                return jsonify({"error": "No audio or video files provided"}), 400
             
-            # Calculate overall mood and stress level
-            if not overall_analysis['emotions']:
-                # Fallback if no emotions detected
-                overall_analysis['emotions'] = ['neutral']
-                overall_analysis['confidence_scores'] = [0.5]
-                overall_analysis['vocal_characteristics'] = {'energy_level': ['medium']}
-                overall_analysis['recommendations'] = ['Unable to analyze voice patterns']
+            voice_results = {}
+            for question_index, audio_path in audio_paths.items():
+                voice_results[question_index] = pipeline.analyze_voice_answer(audio_path, question_index)
+                store_answer(session_id, 'voice', question_index, voice_results[question_index])
             
-            overall_analysis = voice_analyzer.calculate_overall_analysis(overall_analysis)
+            facial_results = {}
+            for question_index, video_path in video_paths.items():
+                facial_results[question_index] = pipeline.analyze_facial_answer(video_path, question_index)
+                store_answer(session_id, 'facial', question_index, facial_results[question_index])
             
             return jsonify({
                 "success": True,
-                "question_analyses": question_analyses,
-                "overall_analysis": overall_analysis
+                "session_id": session_id,
+                "voice": voice_results,
+                "facial": facial_results
             })
-            
+        finally:
+            remove_files(list(audio_paths.values()) + list(video_paths.values()))
+    
+    except SessionExpired:
+        return unknown_session()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/analyze_voice', methods=['POST'])
+@admitted('voice')
+def analyze_voice():
+    """Analyze multiple voice recordings for comprehensive emotional analysis"""
+    try:
+        session_id = open_session(request.form.get('session_id'))
+        if session_id is None:
+            return unknown_session()
+        
+        # Get all audio files from the request
+        audio_paths = save_uploads('audio_', '.wav')
+        
+        try:
+            payload = analyze_with_answers(
+                session_id, 'voice', audio_paths,
+                pipeline.analyze_voice_answer, pipeline.aggregate_voice
+            )
+            if payload is None:
+                return jsonify({"error": "No audio files provided"}), 400
+            record_history(request_user_id(), session_id, 'voice', payload)
+            return jsonify(dict(payload, session_id=session_id))
         finally:
             # Clean up temporary files
-            for tmp_path in temp_files:
-                if os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
+            remove_files(audio_paths.values())
                 
+    except SessionExpired:
+        return unknown_session()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/analyze_facial', methods=['POST'])
+@admitted('facial')
 def analyze_facial():
     """Analyze facial expressions from video/image"""
     try:
+        session_id = open_session(request.form.get('session_id'))
+        if session_id is None:
+            return unknown_session()
+        
         # Get all video files from the request
-        video_files = {}
-        for key in request.files:
-            if key.startswith('video_'):
-                question_index = key.replace('video_', '')
-                video_files[question_index] = request.files[key]
+        video_paths = save_uploads('video_', '.webm')
         
-        if not video_files:
-            return jsonify({"error": "No video files provided"}), 400
+        try:
+            payload = analyze_with_answers(
+                session_id, 'facial', video_paths,
+                pipeline.analyze_facial_answer, pipeline.aggregate_facial
+            )
+            if payload is None:
+                return jsonify({"error": "No video files provided"}), 400
+            record_history(request_user_id(), session_id, 'facial', payload)
+            return jsonify(dict(payload, session_id=session_id))
+        finally:
+            remove_files(video_paths.values())
         
-        # Analyze each question's video
-        question_analyses = {}
-        overall_analysis = {
-            'emotions': [],
-            'confidence_scores': [],
-            'emotion_scores': [],  # Add this
-            'facial_features': {},
-            'recommendations': [],
-            'overall_emotion': 'neutral',
-            'stress_level': 'low'
-        }
+    except SessionExpired:
+        return unknown_session()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def submit_upload_job(kind, modality, prefix, suffix, analyze):
+    """Save uploads and queue their analysis, returning a 202 with the job id"""
+    session_id = open_session(request.form.get('session_id'))
+    if session_id is None:
+        return unknown_session()
+    
+    saved_paths = save_uploads(prefix, suffix)
+    if not saved_paths:
+        return jsonify({"error": f"No {prefix.rstrip('_')} files provided"}), 400
+    user_id = request_user_id()
+    
+    def analyze_and_record(paths):
+        payload = analyze(paths)
+        # Raising marks the job failed with the same message the lookups use
+        store_result(session_id, modality, payload)
+        record_history(user_id, session_id, modality, payload)
+        return dict(payload, session_id=session_id)
+    
+    try:
+        # The job owns the temporary files and removes them when it finishes
+        job_id = job_queue.submit(
+            kind, analyze_and_record, saved_paths,
+            on_finish=lambda: remove_files(saved_paths.values())
+        )
+    except QueueFullError as e:
+        remove_files(saved_paths.values())
+        response = jsonify({"error": str(e)})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "session_id": session_id,
+        "status_url": f"/jobs/{job_id}",
+        "events_url": f"/jobs/{job_id}/events"
+    }), 202
+
+@app.route('/jobs/analyze_voice', methods=['POST'])
+def submit_voice_job():
+    """Queue voice analysis in the background; same uploads as /analyze_voice"""
+    try:
+        return submit_upload_job('analyze_voice', 'voice', 'audio_', '.wav', pipeline.analyze_voice_files)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/jobs/analyze_facial', methods=['POST'])
+def submit_facial_job():
+    """Queue facial analysis in the background; same uploads as /analyze_facial"""
+    try:
+        return submit_upload_job('analyze_facial', 'facial', 'video_', '.webm', pipeline.analyze_facial_files)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Poll a background job's status and, once finished, its result"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Stream a background job's status changes as Server-Sent Events.
+
+    A stream stays open at most event_stream_seconds. EventSource clients
+    then reconnect by themselves, sending the last status as Last-Event-ID
+    so it is not repeated.
+    """
+    if job_queue.get(job_id) is None:
+        return jsonify({"error": "Unknown job"}), 404
+    try:
+        event_streams.acquire()
+    except AdmissionRejected as e:
+        # Polling /jobs/<job_id> still works when every stream slot is taken
+        response = jsonify({"error": str(e)})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+    
+    released = []
+    def release():
+        # From the generator when it ends, or on close if it never started
+        if not released:
+            released.append(True)
+            event_streams.release()
+    
+    def generate():
+        try:
+            last_status = request.headers.get('Last-Event-ID')
+            started = last_sent = time.monotonic()
+            yield "retry: 1000\n\n"
+            while time.monotonic() - started < event_stream_seconds:
+                job = job_queue.get(job_id)
+                if job is None:
+                    yield format_sse({"error": "Job expired"}, event='error')
+                    return
+                if job['status'] != last_status:
+                    last_status = job['status']
+                    last_sent = time.monotonic()
+                    yield format_sse(job, event=last_status, event_id=last_status)
+                    if last_status in FINISHED_STATUSES:
+                        return
+                elif time.monotonic() - last_sent > 15:
+                    # Comment line keeps proxies from closing an idle stream
+                    last_sent = time.monotonic()
+                    yield ": keep-alive\n\n"
+                time.sleep(0.25)
+        finally:
+            release()
+    
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.call_on_close(release)
+    return response
+
+@app.route('/analyze_session', methods=['POST'])
+@admitted('session')
+def analyze_session():
+    """Analyze text, voice and facial input from one multipart request concurrently"""
+    try:
+        # Text arrives as a JSON list in `responses` or as repeated `response` fields
+        responses = request.form.getlist('response')
+        if request.form.get('responses'):
+            try:
+                responses = json.loads(request.form['responses'])
+            except ValueError as e:
+                return jsonify({"error": f"Invalid responses field: {e}"}), 400
+        if not isinstance(responses, list):
+            return jsonify({"error": "responses must be a JSON list"}), 400
         
-        temp_files = []
+        session_id = open_session(request.form.get('session_id'))
+        if session_id is None:
+            return unknown_session()
         
+        audio_paths = save_uploads('audio_', '.wav')
         try:
-            for question_index, video_file in video_files.items():
-                # Save temporary file
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as tmp_file:
-                    video_file.save(tmp_file.name)
-                    temp_files.append(tmp_file.name)
-                
-                # Analyze this question's video
-                analysis_result = facial_analyzer.analyze_video(tmp_file.name)
-                question_analyses[question_index] = analysis_result
-                
-                # Aggregate data
-                if 'primary_emotion' in analysis_result:
-                    overall_analysis['emotions'].append(analysis_result['primary_emotion'])
-                if 'confidence' in analysis_result:
-                    overall_analysis['confidence_scores'].append(analysis_result['confidence'])
-                if 'features_summary' in analysis_result:
-                    # Simple merge, you can improve this
-                    overall_analysis['facial_features'][question_index] = analysis_result['features_summary']
-                if 'recommendations' in analysis_result:
-                    overall_analysis['recommendations'].extend(analysis_result['recommendations'])
-                if 'emotion_score' in analysis_result:
-                    overall_analysis['emotion_scores'].append(analysis_result['emotion_score'])
-            
-            # Calculate overall emotion
-            if overall_analysis['emotions']:
-                counter = Counter(overall_analysis['emotions'])
-                overall_analysis['overall_emotion'] = counter.most_common(1)[0][0]
-            
-            # Calculate average confidence
-            if overall_analysis['confidence_scores']:
-                overall_analysis['average_confidence'] = sum(overall_analysis['confidence_scores']) / len(overall_analysis['confidence_scores'])
-            
-            if overall_analysis['emotion_scores']:
-                overall_analysis['emotion_score'] = sum(overall_analysis['emotion_scores']) / len(overall_analysis['emotion_scores'])
-            else:
-                overall_analysis['emotion_score'] = 0.0
-            
-            return jsonify({
-                "success": True,
-                "question_analyses": question_analyses,
-                "overall_analysis": overall_analysis
-            })
-        finally:
-            for tmp in temp_files:
-                if os.path.exists(tmp):
-                    os.unlink(tmp)
+            video_paths = save_uploads('video_', '.webm')
+        except Exception:
+            remove_files(audio_paths.values())
+            raise
         
+        try:
+            if not (responses or audio_paths or video_paths):
+                return jsonify({"error": "No responses, audio or video provided"}), 400
+            payload = pipeline.analyze_session(responses, audio_paths, video_paths)
+            user_id = request_user_id()
+            for modality in ('text', 'voice', 'facial'):
+                if payload[modality] is not None:
+                    store_result(session_id, modality, payload[modality])
+                    record_history(user_id, session_id, modality, payload[modality])
+            record_history(user_id, session_id, 'combined', payload['analysis'])
+            return jsonify(dict(payload, session_id=session_id))
+        finally:
+            remove_files(list(audio_paths.values()) + list(video_paths.values()))
+    
+    except SessionExpired:
+        return unknown_session()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Off by default: the old request shape re-analyzed text_responses and trusted
+# client-supplied voice_analysis/facial_analysis. Kept only for old clients
+legacy_combined_analysis = os.environ.get('LEGACY_COMBINED_ANALYSIS', '').lower() in ('1', 'true', 'yes')
+
 @app.route('/combined_analysis', methods=['POST'])
 def combined_analysis():
-    """Perform combined analysis from all three input modes"""
+    """Combine the results the server stored for a session"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object with a session_id"}), 400
+
     try:
-        data = request.get_json()
-        
-        # Get individual analysis results
-        text_result = None
-        voice_result = None
-        facial_result = None
-        
-        if data.get('text_responses'):
-            text_result = text_analyzer.analyze_responses(data['text_responses'])
-        
-        if data.get('voice_analysis'):
-            voice_result = data['voice_analysis']
-        
-        if data.get('facial_analysis'):
-            facial_result = data['facial_analysis']
-        
-        # Combine results for overall mental state assessment
-        combined_result = {
-            "overall_mood": "Neutral",
-            "confidence": 0.0,
-            "recommendations": [],
-            "individual_analyses": {
-                "text": text_result,
-                "voice": voice_result,
-                "facial": facial_result
-            }
-        }
-        
-        # Simple combination logic
-        mood_scores = []
-        if text_result:
-            mood_scores.append(text_result.get('overall_sentiment_score', 0))
-        if voice_result:
-            mood_scores.append(voice_result.get('emotion_score', 0))
-        if facial_result:
-            # Update to use new structure
-            mood_scores.append(facial_result.get('overall_analysis', {}).get('emotion_score', 0))
-        
-        if mood_scores:
-            avg_score = sum(mood_scores) / len(mood_scores)
-            if avg_score > 0.3:
-                combined_result["overall_mood"] = "Positive"
-            elif avg_score < -0.3:
-                combined_result["overall_mood"] = "Negative"
-            else:
-                combined_result["overall_mood"] = "Neutral"
-            
-            combined_result["confidence"] = min(0.95, len(mood_scores) * 0.3)
-        
-        # Generate combined recommendations
-        all_recommendations = []
-        if text_result and 'recommendations' in text_result:
-            all_recommendations.extend(text_result['recommendations'])
-        if voice_result and 'recommendations' in voice_result:
-            all_recommendations.extend(voice_result['recommendations'])
-        if facial_result and 'overall_analysis' in facial_result and 'recommendations' in facial_result['overall_analysis']:
-            all_recommendations.extend(facial_result['overall_analysis']['recommendations'])
-        
-        # Remove duplicates and add general recommendations
-        combined_result["recommendations"] = list(set(all_recommendations))
-        if not combined_result["recommendations"]:
-            combined_result["recommendations"] = [
-                "Continue monitoring your mental health regularly",
-                "Consider speaking with a mental health professional if needed"
-            ]
-        
+        if data.get('session_id'):
+            results = session_store.get(data['session_id'])
+            if results is None:
+                return unknown_session()
+            combined = pipeline.combine_session_results(results)
+            record_history(request_user_id(), data['session_id'], 'combined', combined)
+            return jsonify({
+                "success": True,
+                "session_id": data['session_id'],
+                "analysis": combined
+            })
+
+        if not legacy_combined_analysis:
+            return jsonify({"error": "session_id is required"}), 400
+
+        # Deprecated (LEGACY_COMBINED_ANALYSIS=1): analyze text again and
+        # trust client-supplied voice/facial results
+        text_result = pipeline.analyze_text(data['text_responses']) if data.get('text_responses') else None
+        combined_result = pipeline.combine_results(text_result, data.get('voice_analysis'), data.get('facial_analysis'))
         return jsonify({
             "success": True,
             "analysis": combined_result
         })
-        
+
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/history/token', methods=['POST'])
+def history_token():
+    """Opt in to history: issue a new history id with the token that proves it, also set as a cookie"""
+    if history_store is None:
+        return jsonify({"error": "History is not enabled (set HISTORY_DB)"}), 404
+    user_id, token = history_tokens.issue()
+    response = jsonify({"user_id": user_id, "token": token})
+    response.set_cookie(HISTORY_TOKEN_COOKIE, token, max_age=366 * 86400, httponly=True, samesite='Lax')
+    return response
+
+def history_query(user_id):
+    """Validate a history request; returns (days, window, modality) or an error response"""
+    if history_store is None:
+        return None, (jsonify({"error": "History is not enabled (set HISTORY_DB)"}), 404)
+    if not valid_user_id(user_id):
+        return None, (jsonify({"error": "Invalid user id"}), 400)
+    # Only the holder of the id's token may read it
+    if request_user_id() != user_id:
+        return None, (jsonify({"error": "History token missing or not issued for this user"}), 403)
+    modality = request.args.get('modality') or None
+    if modality is not None and modality not in HISTORY_MODALITIES:
+        return None, (jsonify({"error": f"modality must be one of {', '.join(HISTORY_MODALITIES)}"}), 400)
+    try:
+        days = int(request.args.get('days', 30))
+        window = int(request.args.get('window', 7))
+    except ValueError:
+        return None, (jsonify({"error": "days and window must be integers"}), 400)
+    if not 1 <= days <= 366 or not 1 <= window <= days:
+        return None, (jsonify({"error": "Need 1 <= window <= days <= 366"}), 400)
+    return (days, window, modality), None
+
+@app.route('/history/<user_id>')
+def history(user_id):
+    """A user's latest recorded results, newest first"""
+    params, error = history_query(user_id)
+    if error:
+        return error
+    try:
+        limit = min(100, max(1, int(request.args.get('limit', 20))))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    return jsonify({
+        "user_id": user_id,
+        "results": history_store.recent(user_id, limit, params[2])
+    })
+
+@app.route('/history/<user_id>/trends')
+def history_trends(user_id):
+    """Daily and rolling mean emotion_score / overall_sentiment_score per modality, from the daily aggregates"""
+    params, error = history_query(user_id)
+    if error:
+        return error
+    days, window, modality = params
+    return jsonify({
+        "user_id": user_id,
+        "days": days,
+        "window": window,
+        "series": history_store.trends(user_id, days, window, modality)
+    })
+
+@app.route('/history/<user_id>/emotions')
+def history_emotions(user_id):
+    """Emotion counts and shares per window of days and modality, from the daily aggregates"""
+    params, error = history_query(user_id)
+    if error:
+        return error
+    days, window, modality = params
+    return jsonify({
+        "user_id": user_id,
+        "days": days,
+        "window": window,
+        "periods": history_store.emotion_distribution(user_id, days, window, modality)
+    })
+
+# Opt-in warm-up: pay JIT and cascade start-up before the worker serves
+# traffic instead of on the first voice/facial request
+warmup_report = None
+if os.environ.get('WARMUP_ON_BOOT', '').lower() in ('1', 'true', 'yes'):
+    warmup_report = warm_up(voice_analyzer, facial_analyzer, text_analyzer)
+    print(f"🔥 Warm-up finished in {warmup_report['total_seconds']:.2f}s")
+
 if __name__ == '__main__':
     # Create necessary directories
     os.makedirs('templates', exist_ok=True)
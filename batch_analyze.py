@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+Offline batch analysis of archived recordings and transcripts
+
+Walks directories (or reads a manifest), runs the voice, facial and text
+analyzers over every item on a process pool and appends one JSON line per
+item to the output as soon as it finishes. The output doubles as the
+checkpoint: re-running the same command after a crash skips every item
+already recorded and carries on.
+
+Run from the project root:
+    python batch_analyze.py archive/ --output results.jsonl
+    python batch_analyze.py archive/ --jobs 16 --chunksize 4 --quality reduced
+    python batch_analyze.py --manifest sessions.jsonl --output results.parquet
+    python batch_analyze.py --rescore --feature-store instance/features --output rescored.jsonl
+    python batch_analyze.py --rescore --feature-store instance/features --model models/voice_emotion.pkl
+
+Inputs:
+    audio  .wav .mp3 .flac .ogg .m4a
+    video  .mp4 .webm .avi .mov .mkv   (use --modality voice for audio-only .webm)
+    text   .txt (one response per line) or .json (a list of responses)
+
+A manifest is JSONL with {"path": ..., "id": ..., "modality": ...} per line
+(id and modality optional; text items may give "responses" instead of a
+path) or plain text with one path per line.
+
+With --retry-failed, retried items are appended again; the latest record
+for an id is the one that counts. Parquet output needs pyarrow; results
+are checkpointed to <output>.partial.jsonl and converted (keeping the
+latest record per id) once every item is done.
+
+--rescore re-classifies the feature vectors an earlier --feature-store run
+saved, with the vectorized rules in analysis/batch_classifiers.py, and
+overwrites the output with one record per stored id.
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+
+from utils.streaming import json_default
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac', '.ogg', '.m4a')
+VIDEO_EXTENSIONS = ('.mp4', '.webm', '.avi', '.mov', '.mkv')
+TEXT_EXTENSIONS = ('.txt', '.json')
+
+MODALITIES = ('voice', 'facial', 'text')
+
+# Native libraries would otherwise start one thread per core in every worker
+SINGLE_THREAD_ENV = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'NUMBA_NUM_THREADS')
+
+
+def infer_modality(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in AUDIO_EXTENSIONS:
+        return 'voice'
+    if extension in VIDEO_EXTENSIONS:
+        return 'facial'
+    if extension in TEXT_EXTENSIONS:
+        return 'text'
+    return None
+
+
+def discover(paths, modality=None):
+    """Yield {id, path, modality} for every analyzable file under the given files and directories"""
+    for root in paths:
+        if os.path.isfile(root):
+            found = [(os.path.basename(root), root)]
+        else:
+            found = []
+            for directory, subdirectories, files in os.walk(root):
+                subdirectories.sort()
+                for name in sorted(files):
+                    path = os.path.join(directory, name)
+                    found.append((os.path.relpath(path, root), path))
+        for item_id, path in found:
+            item_modality = modality or infer_modality(path)
+            if item_modality is not None:
+                yield {'id': item_id, 'path': path, 'modality': item_modality}
+
+
+def read_manifest(manifest_path, modality=None):
+    """Yield items from a JSONL manifest or a plain list of paths"""
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            entry = json.loads(line) if line.startswith('{') else {'path': line}
+            path = entry.get('path')
+            if path is not None and not os.path.isabs(path):
+                path = os.path.join(base, path)
+            item = {
+                'id': str(entry.get('id') or entry.get('path') or f'line-{line_number}'),
+                'path': path,
+                'modality': entry.get('modality') or modality or (infer_modality(path) if path else 'text')
+            }
+            if 'responses' in entry:
+                item['responses'] = entry['responses']
+            if item['modality'] not in MODALITIES:
+                raise ValueError(f"{manifest_path}:{line_number}: cannot tell the modality of {path!r}")
+            yield item
+
+
+def load_checkpoint(path, retry_failed=False):
+    """Return {id: status} of items already recorded in a JSONL output, dropping a torn last line"""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, 'rb+') as f:
+        data = f.read()
+        # A crash mid-write leaves a partial line; cut it so appends start clean
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            f.truncate(end)
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('status') == 'ok' or not retry_failed:
+                done[record['id']] = record.get('status')
+    return done
+
+
+# Per-process analyzers, built once by init_worker
+_worker = {}
+
+
+def init_worker(quality_level, include_features=False, model_path=None):
+    from analysis.warmup import configure_numba_cache
+
+    # Share compiled librosa kernels between workers and runs
+    configure_numba_cache()
+    _worker['quality_level'] = quality_level
+    _worker['include_features'] = include_features
+    _worker['model_path'] = model_path
+    _worker['analyzers'] = {}
+
+
+def analyzer(modality):
+    analyzers = _worker['analyzers']
+    if modality not in analyzers:
+        if modality == 'voice':
+            from analysis.voice_analysis import VoiceAnalyzer
+            from analysis.emotion_model import ModelHandle
+            # Loaded once (memory-mapped, so workers share it); no reloads mid-run
+            model = ModelHandle(_worker['model_path'], check_interval=float('inf')) if _worker['model_path'] else None
+            analyzers[modality] = VoiceAnalyzer(emotion_model=model)
+        elif modality == 'facial':
+            import cv2
+            from analysis.facial_analysis import FacialAnalyzer
+            # One OpenCV thread per process; the pool provides the parallelism
+            cv2.setNumThreads(1)
+            analyzers[modality] = FacialAnalyzer()
+        else:
+            from analysis.text_analysis import TextAnalyzer
+            analyzers[modality] = TextAnalyzer()
+    return analyzers[modality]
+
+
+def read_responses(item):
+    if 'responses' in item:
+        return item['responses']
+    with open(item['path']) as f:
+        if item['path'].lower().endswith('.json'):
+            data = json.load(f)
+            return data.get('responses', []) if isinstance(data, dict) else data
+        return [line.strip() for line in f if line.strip()]
+
+
+def analyze_item(item):
+    """Analyze one item in a pool worker and return its output record"""
+    started = time.perf_counter()
+    record = {'id': item['id'], 'path': item['path'], 'modality': item['modality']}
+    try:
+        if item['modality'] == 'voice':
+            result = analyzer('voice').analyze_audio(item['path'], _worker['quality_level'], _worker['include_features'])
+        elif item['modality'] == 'facial':
+            result = analyzer('facial').analyze_video(item['path'], _worker['quality_level'], _worker['include_features'])
+        else:
+            result = analyzer('text').analyze_responses(read_responses(item))
+    except Exception as e:
+        result = {'error': f"{type(e).__name__}: {e}"}
+
+    record['status'] = 'error' if isinstance(result, dict) and result.get('error') else 'ok'
+    if record['status'] == 'error':
+        record['error'] = result['error']
+    record['seconds'] = round(time.perf_counter() - started, 4)
+    record['result'] = result
+    return record
+
+
+def default_chunksize(total, jobs):
+    """Several chunks per worker keep the pool balanced when item costs vary"""
+    return max(1, min(16, math.ceil(total / (jobs * 8))))
+
+
+def feature_writers(store):
+    """One writer per stored modality; voice rows hold extract_features output, facial rows per-video averages"""
+    from analysis.voice_analysis import VOICE_FEATURE_NAMES
+    from analysis.facial_analysis import FACIAL_FEATURE_NAMES
+
+    return {
+        'voice': store.writer('voice', VOICE_FEATURE_NAMES),
+        'facial': store.writer('facial', FACIAL_FEATURE_NAMES)
+    }
+
+
+def stored_ids(store):
+    ids = set()
+    for name in store.tables():
+        ids.update(store.table(name).index)
+    return ids
+
+
+def run_batch(items, output_path, jobs, chunksize=None, quality_level='full', fsync_every=50,
+              max_tasks_per_child=None, progress_every=25, feature_store=None, model_path=None):
+    """Analyze items on a process pool, appending each record to output_path.
+
+    With a feature_store, voice and facial features go to its tables instead
+    of the records, flushed as a segment at every checkpoint fsync. With a
+    model_path, voice emotions come from that model instead of the rules.
+    """
+    counts = {'ok': 0, 'error': 0}
+    if not items:
+        return counts
+    writers = feature_writers(feature_store) if feature_store is not None else {}
+
+    for name in SINGLE_THREAD_ENV:
+        os.environ.setdefault(name, '1')
+    chunksize = chunksize or default_chunksize(len(items), jobs)
+    started = time.perf_counter()
+
+    with open(output_path, 'a') as output, multiprocessing.Pool(
+        jobs, initializer=init_worker, initargs=(quality_level, bool(writers), model_path), maxtasksperchild=max_tasks_per_child
+    ) as pool:
+        for done, record in enumerate(pool.imap_unordered(analyze_item, items, chunksize), 1):
+            features = record['result'].pop('features', None) if isinstance(record['result'], dict) else None
+            if features is not None and record['modality'] in writers:
+                writers[record['modality']].add(record['id'], features)
+            output.write(json.dumps(record, default=json_default) + '\n')
+            output.flush()
+            if done % fsync_every == 0:
+                for writer in writers.values():
+                    writer.flush()
+                os.fsync(output.fileno())
+            counts[record['status']] += 1
+            if done % progress_every == 0 or done == len(items):
+                elapsed = time.perf_counter() - started
+                rate = done / elapsed if elapsed else 0.0
+                eta = (len(items) - done) / rate if rate else 0.0
+                print(f"{done}/{len(items)} items ({counts['error']} failed), "
+                      f"{rate:.2f} items/s, ETA {eta:.0f}s")
+        for writer in writers.values():
+            writer.close()
+        os.fsync(output.fileno())
+
+    # Checkpoint-sized segments add up over many runs; merge them now and then
+    for name in writers:
+        if len(feature_store.table(name).segments) > 16:
+            feature_store.compact(name)
+    return counts
+
+
+def rescore_table(table, modality, model=None):
+    """Re-classify the latest stored features of every id with the vectorized rules.
+
+    Yields the same records an analysis run would, with score_features
+    results; rows with no stored features become error records. A voice
+    model (EmotionModel) replaces the voice rules with one batch prediction.
+    """
+    import numpy as np
+    from analysis.batch_classifiers import (
+        VOICE_EMOTIONS, FACIAL_EMOTIONS, classify_voice, voice_characteristics, voice_emotion_score, classify_facial
+    )
+
+    started = time.perf_counter()
+    rows = np.array(sorted(table.index.values()), dtype=np.int64)
+    ids = table.ids[rows].tolist()
+    matrix = table.matrix()[rows]
+    if modality == 'voice':
+        from analysis.voice_analysis import VoiceAnalyzer
+
+        if model is not None:
+            labels, scored = model.labels, model.classify_batch(table.matrix(model.columns)[rows])
+            scored['emotion_score'] = voice_emotion_score(scored['emotion'], scored['confidence'])
+        else:
+            labels, scored = VOICE_EMOTIONS, classify_voice(matrix, table.columns)
+        characteristics = voice_characteristics(matrix, table.columns)
+        keys = list(zip(scored['emotion'], *characteristics.values()))
+        recommend = VoiceAnalyzer().generate_voice_recommendations
+    else:
+        from analysis.facial_analysis import FacialAnalyzer
+
+        labels, scored = FACIAL_EMOTIONS, classify_facial(matrix, table.columns)
+        characteristics = None
+        eye_count = np.nan_to_num(matrix[:, table.columns.index('eye_count')], nan=0.0)
+        keys = list(zip(scored['emotion'], (eye_count < 1).tolist()))
+        recommend = FacialAnalyzer().generate_facial_recommendations
+    seconds = round((time.perf_counter() - started) / max(1, len(ids)), 6)
+
+    # Recommendations depend on a handful of labels, so build each combination once
+    recommendations = {}
+    confidence = scored['confidence'].tolist()
+    emotion_scores = scored['emotion_scores'].tolist()
+    emotion_score = scored['emotion_score'].tolist()
+    for i, item_id in enumerate(ids):
+        record = {'id': item_id, 'path': None, 'modality': modality, 'status': 'ok'}
+        if characteristics is not None and characteristics['energy_level'][i] is None:
+            record.update(status='error', error='No features stored', seconds=seconds, result={'error': 'No features stored'})
+            yield record
+            continue
+
+        key = keys[i]
+        if key not in recommendations:
+            if characteristics is not None:
+                recommendations[key] = recommend(key[0], dict(zip(characteristics, key[1:])))
+            else:
+                recommendations[key] = recommend(key[0], {'average_eye_count': 0 if key[1] else 1})
+        result = {
+            'primary_emotion': key[0],
+            'confidence': confidence[i],
+            'emotion_scores': dict(zip(labels, emotion_scores[i]))
+        }
+        if characteristics is not None:
+            result['vocal_characteristics'] = dict(zip(characteristics, key[1:]))
+        result['recommendations'] = list(recommendations[key])
+        result['emotion_score'] = emotion_score[i]
+        if model is not None and characteristics is not None:
+            result['emotion_model'] = model.version
+        record['seconds'] = seconds
+        record['result'] = result
+        yield record
+
+
+def rescore(store, output_path, model=None):
+    """Write re-scored records for every voice and facial table in the store to output_path"""
+    counts = {'ok': 0, 'error': 0}
+    with open(output_path, 'w') as output:
+        for name in store.tables():
+            if name not in ('voice', 'facial'):
+                continue
+            started = time.perf_counter()
+            table_counts = {'ok': 0, 'error': 0}
+            for record in rescore_table(store.table(name), name, model):
+                output.write(json.dumps(record, default=json_default) + '\n')
+                table_counts[record['status']] += 1
+            print(f"Re-scored {sum(table_counts.values())} {name} items "
+                  f"({table_counts['error']} without features) in {time.perf_counter() - started:.2f}s")
+            for status, count in table_counts.items():
+                counts[status] += count
+        os.fsync(output.fileno())
+    return counts
+
+
+def write_parquet(jsonl_path, parquet_path):
+    """Convert the JSONL checkpoint to Parquet, keeping each result as a JSON string column"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # A retried item appears more than once; its latest record wins
+    records = {}
+    with open(jsonl_path) as f:
+        for line in f:
+            record = json.loads(line)
+            records[record['id']] = record
+
+    columns = {name: [] for name in ('id', 'path', 'modality', 'status', 'error', 'seconds', 'result')}
+    for record in records.values():
+        for name in columns:
+            value = record.get(name)
+            columns[name].append(json.dumps(value) if name == 'result' else value)
+    pq.write_table(pa.table(columns), parquet_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze archived recordings and transcripts on a process pool")
+    parser.add_argument('paths', nargs='*', help="Files or directories to analyze")
+    parser.add_argument('--manifest', help="JSONL manifest or list of paths instead of walking directories")
+    parser.add_argument('--output', default='batch_results.jsonl', help="Results file, .jsonl or .parquet (default batch_results.jsonl)")
+    parser.add_argument('--modality', choices=MODALITIES, help="Treat every input as this modality instead of going by extension")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help="Worker processes (default: every core)")
+    parser.add_argument('--chunksize', type=int, help="Items handed to a worker at a time (default: about 8 chunks per worker, at most 16)")
+    parser.add_argument('--quality', default='full', choices=('full', 'reduced', 'minimal'), help="Voice/facial quality level (default full)")
+    parser.add_argument('--retry-failed', action='store_true', help="Re-run items whose recorded status is error")
+    parser.add_argument('--max-tasks-per-child', type=int, help="Replace a worker after this many items, to cap leaks")
+    parser.add_argument('--feature-store', metavar='DIR', help="Also persist voice/facial feature vectors to this feature store")
+    parser.add_argument('--rescore', action='store_true',
+                        help="Re-classify the features in --feature-store instead of analyzing inputs (no media is decoded)")
+    parser.add_argument('--model', metavar='PATH', help="Classify voice emotions with this model (train_emotion_model.py) instead of the rules")
+    args = parser.parse_args(argv)
+
+    # Before anything imports NumPy, so the parent and every worker stay single-threaded
+    for name in SINGLE_THREAD_ENV:
+        os.environ.setdefault(name, '1')
+
+    if args.rescore:
+        if not args.feature_store:
+            parser.error("--rescore needs --feature-store")
+        if args.paths or args.manifest:
+            parser.error("--rescore reads the feature store; drop the input paths")
+    elif not args.paths and not args.manifest:
+        parser.error("give input paths or --manifest")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    parquet = args.output.lower().endswith('.parquet')
+    if parquet:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("Parquet output needs pyarrow (pip install pyarrow); use a .jsonl output instead")
+    checkpoint = args.output + '.partial.jsonl' if parquet else args.output
+
+    model = None
+    if args.model:
+        from analysis.emotion_model import EmotionModel
+
+        # Fail now rather than silently falling back to the rules in every worker
+        try:
+            model = EmotionModel.load(args.model)
+        except Exception as e:
+            parser.error(f"cannot load --model {args.model}: {e}")
+
+    if args.rescore:
+        from utils.feature_store import FeatureStore
+
+        rescore(FeatureStore(args.feature_store), checkpoint, model)
+        if parquet:
+            write_parquet(checkpoint, args.output)
+            os.remove(checkpoint)
+        print(f"Results written to {args.output}")
+        return 0
+
+    items = list(read_manifest(args.manifest, args.modality)) if args.manifest else list(discover(args.paths, args.modality))
+    done = load_checkpoint(checkpoint, args.retry_failed)
+    store = None
+    if args.feature_store:
+        from utils.feature_store import FeatureStore
+
+        store = FeatureStore(args.feature_store)
+        # Recorded items whose features missed the store (crash between flushes) run again
+        stored = stored_ids(store)
+        done = {item['id'] for item in items if item['id'] in done and (
+            done[item['id']] != 'ok' or item['modality'] == 'text' or item['id'] in stored)}
+    pending = [item for item in items if item['id'] not in done]
+    print(f"{len(items)} items, {len(items) - len(pending)} already in {checkpoint}, {len(pending)} to analyze with {args.jobs} workers")
+
+    counts = run_batch(pending, checkpoint, args.jobs, args.chunksize, args.quality,
+                       max_tasks_per_child=args.max_tasks_per_child, feature_store=store, model_path=args.model)
+
+    if parquet:
+        write_parquet(checkpoint, args.output)
+        os.remove(checkpoint)
+        print(f"Results written to {args.output}")
+    return 1 if counts['error'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
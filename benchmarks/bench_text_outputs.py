@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Benchmark the text pipeline for different requested outputs
+
+Run from the project root: python -m benchmarks.bench_text_outputs
+"""
+
+import random
+import timeit
+
+from analysis.text_analysis import TextAnalyzer, DEFAULT_TEXT_OUTPUTS
+from utils.cache import LRUCache
+
+WORDS = [
+    'today', 'was', 'fine', 'but', 'i', 'feel', 'tired', 'and', 'a', 'little',
+    'anxious', 'about', 'work', 'happy', 'with', 'my', 'friends', 'not', 'great',
+    'sleep', 'has', 'been', 'okay', 'calm', 'stressed', 'weekend', 'really'
+]
+
+OUTPUT_SETS = {
+    'default': DEFAULT_TEXT_OUTPUTS,
+    'mood_only': ('mood', 'sentiment', 'emotions'),
+    'sentiment_only': ('sentiment',),
+}
+
+
+def make_responses(words_per_response, count=5, seed=42):
+    """Build deterministic pseudo-sentences of the given length"""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(words_per_response)) for _ in range(count)]
+
+
+def main():
+    # Disable the sentiment memo so every call pays the full scoring cost
+    analyzer = TextAnalyzer(score_cache=LRUCache(capacity=0))
+    inputs = {
+        'short': make_responses(3),
+        'long': make_responses(200),
+    }
+    
+    print(f"{'input':<8}{'outputs':<16}{'ms/call':>10}")
+    for input_name, responses in inputs.items():
+        for set_name, outputs in OUTPUT_SETS.items():
+            # Warm lazy loaders before timing
+            analyzer.analyze_responses(responses, outputs=outputs)
+            runs = 200 if input_name == 'short' else 20
+            elapsed = timeit.timeit(lambda: analyzer.analyze_responses(responses, outputs=outputs), number=runs)
+            print(f"{input_name:<8}{set_name:<16}{elapsed / runs * 1000:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
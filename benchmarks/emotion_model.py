@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Latency and memory of the voice emotion model against the rule engine
+
+Times one-item classification (the request path: a feature dict per
+answer) and batch classification of a feature matrix (the --rescore path)
+for the rules, the vectorized rules and the model, and reports the
+allocation peak of each batch call and what loading the model allocates
+with and without memory-mapping.
+
+Run from the project root:
+    python -m benchmarks.emotion_model
+    python -m benchmarks.emotion_model --model models/voice_emotion.pkl --rows 50000 --json model.json
+
+Without --model, a model is trained on synthetic features labelled by the
+rules, which is enough to measure cost but says nothing about accuracy
+(train_emotion_model.py reports that on real recordings).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fixtures import make_feature_matrix
+
+MB = 1024 * 1024
+
+
+def per_item_us(classify, rows):
+    """Median and p99 microseconds of classify(row) over rows, after one warm call"""
+    classify(rows[0])
+    timings = []
+    for row in rows:
+        started = time.perf_counter()
+        classify(row)
+        timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    return {'median_us': statistics.median(timings), 'p99_us': timings[min(len(timings) - 1, int(len(timings) * 0.99))]}
+
+
+def batch_run(classify, matrix, repeat=5):
+    """Median milliseconds of classify(matrix), rows/s and the traced allocation peak of one call"""
+    classify(matrix)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        classify(matrix)
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    classify(matrix)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    median = statistics.median(timings)
+    return {'median_ms': median * 1000, 'rows_per_second': len(matrix) / median, 'peak_bytes': peak}
+
+
+def load_cost(path):
+    """Traced bytes and seconds to load the model, with and without mmap_mode"""
+    import joblib
+
+    costs = {}
+    for name, mmap_mode in (('mmap', 'r'), ('copy', None)):
+        tracemalloc.start()
+        started = time.perf_counter()
+        bundle = joblib.load(path, mmap_mode=mmap_mode)
+        seconds = time.perf_counter() - started
+        costs[name] = {'traced_bytes': tracemalloc.get_traced_memory()[0], 'seconds': seconds}
+        tracemalloc.stop()
+        del bundle
+    return costs
+
+
+def run(model_path, rows, single):
+    from analysis.batch_classifiers import classify_voice
+    from analysis.emotion_model import EmotionModel, train_model, save_model
+    from analysis.voice_analysis import VoiceAnalyzer, VOICE_FEATURE_NAMES
+
+    with tempfile.TemporaryDirectory(prefix='mindscope-model-') as workdir:
+        label = model_path
+        if model_path is None:
+            training = make_feature_matrix(VOICE_FEATURE_NAMES, 20000, seed=0)
+            model_path = os.path.join(workdir, 'voice_emotion.pkl')
+            save_model(train_model(training, classify_voice(training)['emotion']), model_path)
+            label = 'synthetic (trained on rule labels)'
+        model = EmotionModel.load(model_path)
+        report = {'model': label, 'model_bytes': os.path.getsize(model_path), 'rows': rows, 'single': single}
+        report['load'] = load_cost(model_path)
+
+        matrix = make_feature_matrix(model.columns, rows, seed=1)
+        features = [{name: value for name, value in zip(model.columns, row) if value == value}
+                    for row in matrix[:single].tolist()]
+        analyzer = VoiceAnalyzer()
+        report['per_item'] = {
+            'rules': per_item_us(analyzer.classify_emotion_simple, features),
+            'model': per_item_us(model.classify, features)
+        }
+        # The scalar loop runs over the `single` rows; rows/s makes it comparable
+        report['batch'] = {
+            'rules.loop': batch_run(lambda m: [analyzer.classify_emotion_simple(f) for f in features], matrix[:single]),
+            'rules.vectorized': batch_run(lambda m: classify_voice(m, model.columns), matrix),
+            'model': batch_run(model.classify_batch, matrix)
+        }
+    return report
+
+
+def print_report(report):
+    print(f"Model {report['model']} ({report['model_bytes'] / 1024:.1f} KiB)")
+    load = report['load']
+    print(f"Load: mmap {load['mmap']['seconds'] * 1000:.1f} ms, {load['mmap']['traced_bytes'] / 1024:.1f} KiB allocated; "
+          f"copy {load['copy']['seconds'] * 1000:.1f} ms, {load['copy']['traced_bytes'] / 1024:.1f} KiB allocated")
+
+    print(f"\n{'one item':<20}{'median us':>12}{'p99 us':>12}")
+    for name, timing in report['per_item'].items():
+        print(f"{name:<20}{timing['median_us']:>12.1f}{timing['p99_us']:>12.1f}")
+
+    print(f"\n{'batch':<20}{'rows/s':>14}{'median ms':>12}{'peak MB':>10}")
+    for name, timing in report['batch'].items():
+        print(f"{name:<20}{timing['rows_per_second']:>14,.0f}{timing['median_ms']:>12.2f}{timing['peak_bytes'] / MB:>10.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the voice emotion model's latency and memory with the rules")
+    parser.add_argument('--model', help="Saved model to measure (default: train one on synthetic features)")
+    parser.add_argument('--rows', type=int, default=10000, help="Rows in the batch matrix (default 10000)")
+    parser.add_argument('--single', type=int, default=2000, help="Items timed one at a time (default 2000)")
+    parser.add_argument('--json', metavar='PATH', help="Write the report to a JSON file")
+    args = parser.parse_args(argv)
+    if args.single < 1 or args.rows < args.single:
+        parser.error("need 1 <= --single <= --rows")
+
+    report = run(args.model, args.rows, args.single)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic inputs for benchmarks
+
+Every generator is seeded, so the same arguments always produce the same
+samples, frames and words, and timings stay comparable between runs.
+"""
+
+import os
+import random
+
+import numpy as np
+
+from analysis.warmup import speech_like_signal, synthetic_frame
+
+AUDIO_KINDS = ('tone', 'noise', 'speech')
+
+# File extension -> OpenCV fourcc; webm matches what browsers record
+VIDEO_CODECS = {
+    'webm': 'VP80',
+    'mp4': 'mp4v',
+}
+
+WORDS = [
+    'today', 'was', 'fine', 'but', 'i', 'feel', 'tired', 'and', 'a', 'little',
+    'anxious', 'about', 'work', 'happy', 'with', 'my', 'friends', 'not', 'great',
+    'sleep', 'has', 'been', 'okay', 'calm', 'stressed', 'weekend', 'really',
+    'overwhelmed', 'grateful', 'lonely', 'excited', 'worried', 'peaceful'
+]
+
+
+def make_audio(kind='speech', seconds=5.0, sample_rate=22050, seed=0):
+    """Return float32 samples of a pure tone, white noise or a speech-like signal"""
+    if kind not in AUDIO_KINDS:
+        raise ValueError(f"Unknown audio kind: {kind}")
+
+    if kind == 'speech':
+        # The same signal the warm-up pass runs through the voice analyzer
+        return speech_like_signal(seconds, sample_rate, seed)
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    if kind == 'tone':
+        y = 0.2 * np.sin(2 * np.pi * 220 * t)
+    else:
+        y = 0.05 * rng.standard_normal(len(t))
+    return y.astype(np.float32)
+
+
+def write_audio(path, kind='speech', seconds=5.0, sample_rate=22050, seed=0):
+    """Write a synthetic WAV file and return its path"""
+    import soundfile as sf
+
+    sf.write(path, make_audio(kind, seconds, sample_rate, seed), sample_rate, format='WAV')
+    return path
+
+
+def write_video(path, seconds=3.0, fps=15, width=320, height=240):
+    """Write a clip of a drawn face drifting across the frame; returns None if the codec is unavailable"""
+    import cv2
+
+    extension = os.path.splitext(path)[1].lstrip('.')
+    fourcc = cv2.VideoWriter_fourcc(*VIDEO_CODECS[extension])
+    writer = cv2.VideoWriter(path, fourcc, fps, (width, height))
+    if not writer.isOpened():
+        return None
+
+    face = synthetic_frame(width, height)
+    try:
+        for index in range(int(seconds * fps)):
+            # Small horizontal drift so consecutive frames differ
+            shift = int(round(width * 0.05 * np.sin(2 * np.pi * index / fps)))
+            writer.write(np.roll(face, shift, axis=1))
+    finally:
+        writer.release()
+    return path
+
+
+def make_responses(count=5, words_per_response=20, seed=42):
+    """Build deterministic pseudo-sentences for the text analyzer"""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(words_per_response)) for _ in range(count)]
+
+
+# Feature ranges around the classifier thresholds: (low, high) per column
+FEATURE_RANGES = {
+    'rms_mean': (0.0, 0.04),
+    'tempo': (60.0, 180.0),
+    'spectral_centroid_mean': (1000.0, 3000.0),
+    'spectral_centroid_std': (100.0, 900.0),
+    'zcr_mean': (0.0, 0.25),
+    'mean_brightness': (60.0, 200.0),
+    'brightness_std': (20.0, 80.0),
+    'eye_count': (0.0, 3.0),
+    'eye_symmetry': (0.0, 10.0),
+    'face_width': (30.0, 150.0),
+    'face_height': (30.0, 150.0),
+}
+
+
+def make_feature_matrix(columns, rows=10000, missing=0.05, seed=0):
+    """Build a deterministic rows x columns feature matrix with some absent (NaN) values"""
+    rng = np.random.default_rng(seed)
+    matrix = np.empty((rows, len(columns)))
+    for i, name in enumerate(columns):
+        low, high = FEATURE_RANGES.get(name, (0.0, 1.0))
+        matrix[:, i] = rng.uniform(low, high, size=rows)
+    matrix[rng.random(matrix.shape) < missing] = np.nan
+    return matrix
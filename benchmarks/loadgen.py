@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Load generator for the Flask endpoints
+
+Starts the app under serve.py with a fixed pool of --server-threads request
+threads (or targets --url), replays weighted session mixes from concurrent
+clients and reports p50/p95/p99 latency, throughput and error rate per
+endpoint.
+
+Run from the project root:
+    python -m benchmarks.loadgen --concurrency 1,2,4,8 --duration 30
+    python -m benchmarks.loadgen --mix full=1,text=4 --questions 5 --json load.json
+    ADMISSION_CONCURRENCY=2 python -m benchmarks.loadgen --concurrency 8
+
+Environment variables are passed through to the server process, so server
+configurations can be compared on the same machine.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+from benchmarks.fixtures import write_audio, write_video, make_responses
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class SessionRunner:
+    """Builds and sends the requests of one simulated user session"""
+
+    def __init__(self, base_url, fixtures, questions):
+        self.base_url = base_url
+        self.fixtures = fixtures
+        self.questions = questions
+
+    def post(self, http, record, endpoint, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = http.post(self.base_url + endpoint, timeout=300, **kwargs)
+            status = response.status_code
+            body = response.json() if response.headers.get('Content-Type', '').startswith('application/json') else {}
+        except (requests.RequestException, ValueError) as e:
+            status, body = None, {'error': str(e)}
+        record(endpoint, status, time.perf_counter() - started)
+        return body
+
+    def files(self, prefix, path, mimetype):
+        return {f'{prefix}_{i}': (f'question_{i}{os.path.splitext(path)[1]}', open(path, 'rb'), mimetype)
+                for i in range(self.questions)}
+
+    def upload(self, http, record, endpoint, prefix, path, mimetype, session_id):
+        files = self.files(prefix, path, mimetype)
+        try:
+            return self.post(http, record, endpoint, files=files, data={'session_id': session_id} if session_id else {})
+        finally:
+            for _, handle, _ in files.values():
+                handle.close()
+
+    def text(self, http, record):
+        body = self.post(http, record, '/analyze_text', json={'responses': self.fixtures['responses']})
+        return body.get('session_id')
+
+    def combined(self, http, record, session_id):
+        if session_id:
+            self.post(http, record, '/combined_analysis', json={'session_id': session_id})
+
+    def run(self, mix, http, record):
+        """Run one session of the named mix"""
+        session_id = None
+        if mix in ('text', 'full'):
+            session_id = self.text(http, record)
+        if mix in ('voice', 'full'):
+            body = self.upload(http, record, '/analyze_voice', 'audio', self.fixtures['audio'], 'audio/wav', session_id)
+            session_id = body.get('session_id', session_id)
+        if mix in ('facial', 'full'):
+            body = self.upload(http, record, '/analyze_facial', 'video', self.fixtures['video'], 'video/webm', session_id)
+            session_id = body.get('session_id', session_id)
+        if mix == 'incremental':
+            # One upload per recorded answer, then an aggregate-only call
+            for i in range(self.questions):
+                with open(self.fixtures['audio'], 'rb') as audio:
+                    body = self.post(http, record, '/analyze_answer',
+                                     files={f'audio_{i}': (f'question_{i}.wav', audio, 'audio/wav')},
+                                     data={'session_id': session_id} if session_id else {})
+                session_id = body.get('session_id', session_id)
+            self.post(http, record, '/analyze_voice', data={'session_id': session_id} if session_id else {})
+        self.combined(http, record, session_id)
+
+
+MIXES = ('text', 'voice', 'facial', 'full', 'incremental')
+
+
+def parse_mix(text):
+    """Parse 'full=1,text=3' into [(mix, weight)]"""
+    weights = []
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in MIXES:
+            raise argparse.ArgumentTypeError(f"Unknown mix '{name}', expected one of {', '.join(MIXES)}")
+        weights.append((name, float(weight or 1)))
+    return weights
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(1, rank)) - 1]
+
+
+def summarize(samples, elapsed):
+    """Per-endpoint and overall latency percentiles, throughput and error rates"""
+    by_endpoint = defaultdict(list)
+    for endpoint, status, seconds in samples:
+        by_endpoint[endpoint].append((status, seconds))
+    by_endpoint['ALL'] = [(status, seconds) for _, status, seconds in samples]
+
+    summary = {}
+    for endpoint, entries in by_endpoint.items():
+        latencies = sorted(seconds for _, seconds in entries)
+        rejected = sum(1 for status, _ in entries if status == 503)
+        errors = sum(1 for status, _ in entries if status is None or (status >= 400 and status != 503))
+        summary[endpoint] = {
+            'requests': len(entries),
+            'throughput_rps': len(entries) / elapsed if elapsed else 0.0,
+            'error_rate': errors / len(entries),
+            'rejected_rate': rejected / len(entries),
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000
+        }
+    return summary
+
+
+def run_load(runner, weights, concurrency, duration, max_sessions=None, seed=0):
+    """Run sessions from `concurrency` client threads until the duration or session budget is spent"""
+    samples = []
+    lock = threading.Lock()
+    sessions = {'started': 0, 'completed': 0}
+    deadline = time.monotonic() + duration
+    names = [name for name, _ in weights]
+    mix_weights = [weight for _, weight in weights]
+
+    def record(endpoint, status, seconds):
+        with lock:
+            samples.append((endpoint, status, seconds))
+
+    def client(index):
+        rng = random.Random(seed + index)
+        http = requests.Session()
+        while time.monotonic() < deadline:
+            with lock:
+                if max_sessions is not None and sessions['started'] >= max_sessions:
+                    return
+                sessions['started'] += 1
+            runner.run(rng.choices(names, mix_weights)[0], http, record)
+            with lock:
+                sessions['completed'] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    result = {
+        'concurrency': concurrency,
+        'elapsed_seconds': elapsed,
+        'sessions': sessions['completed'],
+        'sessions_per_second': sessions['completed'] / elapsed if elapsed else 0.0,
+        'endpoints': summarize(samples, elapsed) if samples else {}
+    }
+    return result
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, threads):
+    """Start the app under serve.py (one worker, a pool of `threads` request threads) and wait for /health"""
+    command = [sys.executable, 'serve.py', '--workers', '1', '--threads', str(threads),
+               '--host', '127.0.0.1', '--port', str(port)]
+    process = subprocess.Popen(command, cwd=PROJECT_ROOT,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server process exited during start-up")
+        try:
+            if requests.get(url + '/health', timeout=2).ok:
+                return process, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError("Server did not become ready within 120s")
+
+
+def print_result(result):
+    print(f"\nconcurrency {result['concurrency']}: {result['sessions']} sessions in "
+          f"{result['elapsed_seconds']:.1f}s ({result['sessions_per_second']:.2f} sessions/s)")
+    print(f"{'endpoint':<22}{'requests':>9}{'req/s':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}{'503s':>8}")
+    for endpoint, stats in sorted(result['endpoints'].items(), key=lambda item: item[0] == 'ALL'):
+        print(f"{endpoint:<22}{stats['requests']:>9}{stats['throughput_rps']:>8.2f}{stats['p50_ms']:>10.1f}"
+              f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['error_rate']:>8.1%}{stats['rejected_rate']:>8.1%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay session mixes against the app and report latency percentiles")
+    parser.add_argument('--url', help="Target an already running server instead of starting one")
+    parser.add_argument('--concurrency', default='1,2,4', help="Comma-separated client counts to sweep (default 1,2,4)")
+    parser.add_argument('--duration', type=float, default=20.0, help="Seconds per concurrency level (default 20)")
+    parser.add_argument('--sessions', type=int, help="Stop each level after this many sessions")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('full=1,text=2,incremental=1'),
+                        help=f"Weighted session mix, e.g. full=1,text=3 (mixes: {', '.join(MIXES)})")
+    parser.add_argument('--questions', type=int, default=5, help="Answers per voice/facial session (default 5)")
+    parser.add_argument('--audio-seconds', type=float, default=5.0, help="Length of each synthetic answer (default 5)")
+    parser.add_argument('--server-threads', type=int, default=16, help="Request threads in the started serve.py worker (default 16)")
+    parser.add_argument('--json', metavar='PATH', help="Write the results to a JSON file")
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    with tempfile.TemporaryDirectory(prefix='mindscope-load-') as workdir:
+        fixtures = {
+            'responses': make_responses(args.questions, 25),
+            'audio': write_audio(os.path.join(workdir, 'answer.wav'), 'speech', args.audio_seconds)
+        }
+        # Only mixes that upload video need the webm fixture
+        if any(name in ('facial', 'full') for name, _ in args.mix):
+            fixtures['video'] = write_video(os.path.join(workdir, 'answer.webm'), 3.0)
+            if fixtures['video'] is None:
+                parser.error("OpenCV cannot write webm here; drop the facial and full mixes")
+
+        process = None
+        url = args.url
+        if url is None:
+            process, url = start_server(free_port(), args.server_threads)
+            print(f"Started server at {url}")
+
+        try:
+            runner = SessionRunner(url.rstrip('/'), fixtures, args.questions)
+            # One untimed session per mix warms lazy loaders and JIT caches
+            warm = requests.Session()
+            for name, _ in args.mix:
+                runner.run(name, warm, lambda *sample: None)
+
+            results = []
+            for level in levels:
+                result = run_load(runner, args.mix, level, args.duration, args.sessions)
+                print_result(result)
+                results.append(result)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'mix': dict(args.mix), 'questions': args.questions, 'levels': results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
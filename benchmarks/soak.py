@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Soak test: run thousands of analyses in one process and watch memory
+
+Repeats voice, facial and/or text analyses on synthetic inputs, sampling
+resident set size (and tracemalloc's traced total with --tracemalloc) as it
+goes. Growth after warm-up that keeps rising with the iteration count points
+at a leak, typically an unreleased cv2.VideoCapture or arrays kept alive on
+the librosa path.
+
+Run from the project root:
+    python -m benchmarks.soak --iterations 2000
+    python -m benchmarks.soak --modality facial --iterations 5000 --tracemalloc
+    python -m benchmarks.soak --modality voice --max-growth-mb 20 --json soak.json
+
+Exits with status 1 when RSS grows by more than --max-growth-mb between the
+end of warm-up and the last iteration.
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fixtures import write_audio, write_video, make_responses
+from utils.memory import rss_bytes, peak_rss_bytes
+
+MODALITIES = ('voice', 'facial', 'text')
+
+MB = 1024 * 1024
+
+
+def build_runs(modalities, workdir, quality_level='full', audio_seconds=5.0, video_seconds=2.0):
+    """Return {modality: zero-argument callable} for the requested modalities"""
+    runs = {}
+    if 'voice' in modalities:
+        from analysis.voice_analysis import VoiceAnalyzer
+
+        voice = VoiceAnalyzer()
+        audio = write_audio(os.path.join(workdir, 'soak.wav'), 'speech', audio_seconds)
+        runs['voice'] = lambda: voice.analyze_audio(audio, quality_level)
+    if 'facial' in modalities:
+        from analysis.facial_analysis import FacialAnalyzer
+
+        facial = FacialAnalyzer()
+        video = write_video(os.path.join(workdir, 'soak.webm'), video_seconds)
+        if video is None:
+            raise RuntimeError("OpenCV cannot write webm here; the facial soak is unavailable")
+        runs['facial'] = lambda: facial.analyze_video(video, quality_level)
+    if 'text' in modalities:
+        from analysis.text_analysis import TextAnalyzer
+        from utils.cache import LRUCache
+
+        text = TextAnalyzer(score_cache=LRUCache(capacity=0))
+        responses = make_responses(5, 40)
+        runs['text'] = lambda: text.analyze_responses(responses)
+    return runs
+
+
+def sample(iteration):
+    gc.collect()
+    traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    return {'iteration': iteration, 'rss_bytes': rss_bytes(), 'traced_bytes': traced}
+
+
+def growth_per_thousand(samples, key='rss_bytes'):
+    """Least-squares slope of a sampled value, in bytes per 1000 iterations"""
+    points = [(s['iteration'], s[key]) for s in samples if s[key] is not None]
+    if len(points) < 2:
+        return 0.0
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if spread == 0:
+        return 0.0
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+    return slope * 1000
+
+
+def run_soak(runs, iterations, warmup=50, sample_every=100, trace=False, top=10):
+    """Run every callable `iterations` times and summarise memory after warm-up"""
+    # Warm up untraced: loading models under tracemalloc is very slow
+    for _ in range(warmup):
+        for run in runs.values():
+            run()
+
+    if trace:
+        tracemalloc.start(25)
+        for run in runs.values():
+            run()
+
+    baseline_snapshot = tracemalloc.take_snapshot() if trace else None
+    samples = [sample(0)]
+    failures = 0
+    started = time.perf_counter()
+    for iteration in range(1, iterations + 1):
+        for run in runs.values():
+            result = run()
+            if isinstance(result, dict) and result.get('error'):
+                failures += 1
+        if iteration % sample_every == 0 or iteration == iterations:
+            samples.append(sample(iteration))
+            last = samples[-1]
+            print(f"{iteration:>7} iterations  rss {(last['rss_bytes'] or 0) / MB:8.1f} MB"
+                  + (f"  traced {last['traced_bytes'] / MB:8.1f} MB" if trace else ''))
+    elapsed = time.perf_counter() - started
+
+    report = {
+        'modalities': list(runs),
+        'iterations': iterations,
+        'warmup': warmup,
+        'elapsed_seconds': elapsed,
+        'failures': failures,
+        'rss_start_bytes': samples[0]['rss_bytes'],
+        'rss_end_bytes': samples[-1]['rss_bytes'],
+        'rss_growth_bytes': (samples[-1]['rss_bytes'] or 0) - (samples[0]['rss_bytes'] or 0),
+        'rss_slope_bytes_per_1000': growth_per_thousand(samples),
+        'peak_rss_bytes': peak_rss_bytes(),
+        'samples': samples
+    }
+    if trace:
+        report['traced_slope_bytes_per_1000'] = growth_per_thousand(samples, 'traced_bytes')
+        # Allocation sites that grew the most since warm-up
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        stats = tracemalloc.take_snapshot().filter_traces(ignore).compare_to(
+            baseline_snapshot.filter_traces(ignore), 'traceback')
+        report['top_growth'] = [
+            {'size_diff_bytes': stat.size_diff, 'count_diff': stat.count_diff,
+             'traceback': stat.traceback.format(limit=4)}
+            for stat in stats[:top] if stat.size_diff > 0
+        ]
+        tracemalloc.stop()
+    return report
+
+
+def print_report(report):
+    print(f"\n{report['iterations']} iterations of {', '.join(report['modalities'])} "
+          f"in {report['elapsed_seconds']:.1f}s ({report['failures']} failed)")
+    print(f"RSS after warm-up {(report['rss_start_bytes'] or 0) / MB:.1f} MB, "
+          f"at end {(report['rss_end_bytes'] or 0) / MB:.1f} MB, "
+          f"peak {(report['peak_rss_bytes'] or 0) / MB:.1f} MB")
+    print(f"RSS growth {report['rss_growth_bytes'] / MB:+.1f} MB "
+          f"({report['rss_slope_bytes_per_1000'] / MB:+.2f} MB per 1000 iterations)")
+    if 'traced_slope_bytes_per_1000' in report:
+        print(f"Traced Python memory {report['traced_slope_bytes_per_1000'] / MB:+.2f} MB per 1000 iterations")
+        for entry in report['top_growth']:
+            print(f"\n{entry['size_diff_bytes'] / 1024:+.1f} KiB in {entry['count_diff']:+d} blocks")
+            print("\n".join(entry['traceback']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Repeat analyses in one process and report memory growth")
+    parser.add_argument('--modality', default=','.join(MODALITIES),
+                        help=f"Comma-separated modalities to soak (default {','.join(MODALITIES)})")
+    parser.add_argument('--iterations', type=int, default=2000, help="Timed iterations after warm-up (default 2000)")
+    parser.add_argument('--warmup', type=int, default=50, help="Untracked iterations to fill caches first (default 50)")
+    parser.add_argument('--sample-every', type=int, default=100, help="Iterations between memory samples (default 100)")
+    parser.add_argument('--quality', default='full', help="Voice/facial quality level (default full)")
+    parser.add_argument('--audio-seconds', type=float, default=5.0, help="Length of the synthetic answer (default 5)")
+    parser.add_argument('--tracemalloc', action='store_true', help="Trace allocations and list the sites that grew")
+    parser.add_argument('--max-growth-mb', type=float, default=50.0,
+                        help="Fail when RSS grows by more than this after warm-up (default 50)")
+    parser.add_argument('--json', metavar='PATH', help="Write the report to a JSON file")
+    args = parser.parse_args(argv)
+
+    modalities = [m for m in args.modality.split(',') if m]
+    unknown = set(modalities) - set(MODALITIES)
+    if unknown:
+        parser.error(f"Unknown modality: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory(prefix='mindscope-soak-') as workdir:
+        runs = build_runs(modalities, workdir, args.quality, args.audio_seconds)
+        report = run_soak(runs, args.iterations, args.warmup, args.sample_every, args.tracemalloc)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json}")
+
+    if report['rss_growth_bytes'] > args.max_growth_mb * MB:
+        print(f"\nRSS grew by more than {args.max_growth_mb:.0f} MB; possible leak")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the analyzers and Flask routes on synthetic inputs
+
+Run from the project root:
+    python -m benchmarks.suite                                  # run and print
+    python -m benchmarks.suite --save benchmarks/baselines/local.json
+    python -m benchmarks.suite --compare benchmarks/baselines/local.json --threshold 0.2
+    python -m benchmarks.suite --filter voice --filter route.
+
+--compare exits with status 1 when any case's median is slower than the
+baseline by more than the threshold. Baselines are machine-specific, so
+compare only against ones recorded on the same host.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.fixtures import write_audio, write_video, make_responses, make_feature_matrix
+
+
+def text_case(count, words, outputs=None):
+    def setup(workdir):
+        from analysis.text_analysis import TextAnalyzer, DEFAULT_TEXT_OUTPUTS
+        from utils.cache import LRUCache
+
+        analyzer = TextAnalyzer(score_cache=LRUCache(capacity=0))
+        responses = make_responses(count, words)
+        return lambda: analyzer.analyze_responses(responses, outputs=outputs or DEFAULT_TEXT_OUTPUTS)
+    return setup
+
+
+def voice_case(kind, seconds, sample_rate, quality_level='full'):
+    def setup(workdir):
+        from analysis.voice_analysis import VoiceAnalyzer
+
+        analyzer = VoiceAnalyzer()
+        path = write_audio(os.path.join(workdir, f'{kind}_{seconds}_{sample_rate}.wav'), kind, seconds, sample_rate)
+        return lambda: analyzer.analyze_audio(path, quality_level)
+    return setup
+
+
+def facial_case(extension, seconds, width, height, quality_level='full'):
+    def setup(workdir):
+        from analysis.facial_analysis import FacialAnalyzer
+
+        analyzer = FacialAnalyzer()
+        path = write_video(os.path.join(workdir, f'face_{seconds}_{width}.{extension}'), seconds, width=width, height=height)
+        if path is None:
+            return None
+        return lambda: analyzer.analyze_video(path, quality_level)
+    return setup
+
+
+def classify_case(modality, rows, vectorized):
+    """Re-score a feature matrix with the scalar rules row by row, analysis/batch_classifiers.py or the voice model"""
+    def setup(workdir):
+        from analysis import batch_classifiers
+        from analysis.voice_analysis import VoiceAnalyzer, VOICE_FEATURE_NAMES
+        from analysis.facial_analysis import FacialAnalyzer, FACIAL_FEATURE_NAMES
+
+        columns = VOICE_FEATURE_NAMES if modality == 'voice' else FACIAL_FEATURE_NAMES
+        matrix = make_feature_matrix(columns, rows)
+        if vectorized == 'model':
+            from analysis.emotion_model import EmotionModel, train_model, save_model
+
+            training = make_feature_matrix(columns, rows, seed=1)
+            path = os.path.join(workdir, 'voice_emotion.pkl')
+            save_model(train_model(training, batch_classifiers.classify_voice(training)['emotion']), path)
+            model = EmotionModel.load(path)
+            return lambda: model.classify_batch(matrix)
+        if vectorized and modality == 'voice':
+            return lambda: (batch_classifiers.classify_voice(matrix, columns),
+                            batch_classifiers.voice_characteristics(matrix, columns))
+        if vectorized:
+            return lambda: batch_classifiers.classify_facial(matrix, columns)
+
+        rows_as_dicts = [{name: value for name, value in zip(columns, row) if value == value} for row in matrix.tolist()]
+        if modality == 'voice':
+            analyzer = VoiceAnalyzer()
+            return lambda: [(analyzer.classify_emotion_simple(features), analyzer.analyze_vocal_characteristics(features))
+                            for features in rows_as_dicts]
+        analyzer = FacialAnalyzer()
+        return lambda: [analyzer.classify_features(features) for features in rows_as_dicts]
+    return setup
+
+
+def route_client():
+    # Route cases must not be served from the sentiment memo or a degraded
+    # quality level; both are read when app is first imported
+    os.environ.setdefault('TEXT_SCORE_CACHE_SIZE', '0')
+    os.environ.setdefault('QUALITY_LEVEL', 'full')
+    from app import app
+    return app.test_client()
+
+
+def route_text_case(workdir):
+    client = route_client()
+    responses = make_responses(5, 20)
+    return lambda: client.post('/analyze_text', json={'responses': responses})
+
+
+def route_voice_case(workdir):
+    client = route_client()
+    path = write_audio(os.path.join(workdir, 'route_speech.wav'), 'speech', 5.0)
+
+    def run():
+        with open(path, 'rb') as audio:
+            return client.post('/analyze_voice', data={'audio_0': (audio, 'question_0.wav')},
+                               content_type='multipart/form-data')
+    return run
+
+
+def route_facial_case(workdir):
+    client = route_client()
+    path = write_video(os.path.join(workdir, 'route_face.webm'), 3.0)
+    if path is None:
+        return None
+
+    def run():
+        with open(path, 'rb') as video:
+            return client.post('/analyze_facial', data={'video_0': (video, 'question_0.webm')},
+                               content_type='multipart/form-data')
+    return run
+
+
+def route_combined_case(workdir):
+    client = route_client()
+    session_id = client.post('/analyze_text', json={'responses': make_responses(5, 20)}).get_json()['session_id']
+    return lambda: client.post('/combined_analysis', json={'session_id': session_id})
+
+
+def route_get_case(path, revalidate=False):
+    def setup(workdir):
+        client = route_client()
+        headers = {'Accept-Encoding': 'gzip, br'}
+        if revalidate:
+            # A repeat visit: the browser presents the ETag it already holds
+            headers['If-None-Match'] = client.get(path, headers=headers).headers['ETag']
+        return lambda: client.get(path, headers=headers)
+    return setup
+
+
+# name -> (setup(workdir) returning a zero-argument callable or None, timed runs)
+CASES = {
+    'text.analyzer.5x20': (text_case(5, 20), 50),
+    'text.analyzer.5x200': (text_case(5, 200), 20),
+    'text.analyzer.50x200': (text_case(50, 200), 5),
+    'text.analyzer.5x200.mood_only': (text_case(5, 200, ('mood', 'sentiment', 'emotions')), 20),
+    'voice.analyzer.speech_5s_22k': (voice_case('speech', 5.0, 22050), 5),
+    'voice.analyzer.speech_30s_22k': (voice_case('speech', 30.0, 22050), 3),
+    'voice.analyzer.speech_30s_22k.minimal': (voice_case('speech', 30.0, 22050, 'minimal'), 3),
+    'voice.analyzer.tone_10s_16k': (voice_case('tone', 10.0, 16000), 3),
+    'voice.analyzer.noise_10s_44k': (voice_case('noise', 10.0, 44100), 3),
+    'facial.analyzer.webm_3s_320': (facial_case('webm', 3.0, 320, 240), 3),
+    'facial.analyzer.mp4_3s_640': (facial_case('mp4', 3.0, 640, 480), 3),
+    'facial.analyzer.mp4_3s_640.minimal': (facial_case('mp4', 3.0, 640, 480, 'minimal'), 3),
+    'classify.voice.scalar_10k': (classify_case('voice', 10000, False), 5),
+    'classify.voice.batch_10k': (classify_case('voice', 10000, True), 20),
+    'classify.voice.model_10k': (classify_case('voice', 10000, 'model'), 20),
+    'classify.facial.scalar_10k': (classify_case('facial', 10000, False), 5),
+    'classify.facial.batch_10k': (classify_case('facial', 10000, True), 20),
+    'route.analyze_text': (route_text_case, 20),
+    'route.analyze_voice': (route_voice_case, 3),
+    'route.analyze_facial': (route_facial_case, 3),
+    'route.combined_analysis': (route_combined_case, 50),
+    'route.index': (route_get_case('/'), 200),
+    'route.index.not_modified': (route_get_case('/', revalidate=True), 200),
+    'route.get_questions': (route_get_case('/get_questions'), 200),
+    'route.static.app_js': (route_get_case('/static/js/app.js'), 200),
+}
+
+
+def time_case(run, repeat):
+    """Warm once (JIT, cascades, lazy imports), then time each run"""
+    run()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return {
+        'runs': repeat,
+        'median_ms': statistics.median(timings) * 1000,
+        'min_ms': min(timings) * 1000,
+        'mean_ms': statistics.fmean(timings) * 1000
+    }
+
+
+def run_suite(filters=(), repeat_scale=1.0):
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='mindscope-bench-') as workdir:
+        for name, (setup, repeat) in CASES.items():
+            if filters and not any(f in name for f in filters):
+                continue
+            run = setup(workdir)
+            if run is None:
+                print(f"{name:<42} skipped (codec unavailable)")
+                continue
+            results[name] = time_case(run, max(1, int(repeat * repeat_scale)))
+            print(f"{name:<42}{results[name]['median_ms']:>12.2f} ms  (min {results[name]['min_ms']:.2f}, n={results[name]['runs']})")
+    return results
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print median changes against a baseline; return names of regressed cases"""
+    regressions = []
+    print(f"\n{'case':<42}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            print(f"{name:<42}{'-':>12}{current['median_ms']:>10.2f}ms{'new':>10}")
+            continue
+        change = current['median_ms'] / previous['median_ms'] - 1
+        flag = '  REGRESSION' if change > threshold else ''
+        print(f"{name:<42}{previous['median_ms']:>10.2f}ms{current['median_ms']:>10.2f}ms{change:>+9.1%}{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark analyzers and routes on synthetic inputs")
+    parser.add_argument('--filter', action='append', default=[], help="Only run cases whose name contains this text (repeatable)")
+    parser.add_argument('--save', metavar='PATH', help="Write results as a JSON baseline")
+    parser.add_argument('--compare', metavar='PATH', help="Compare against a JSON baseline")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed median slowdown before a case counts as regressed (default 0.2 = 20%%)")
+    parser.add_argument('--repeat-scale', type=float, default=1.0, help="Multiply every case's number of timed runs")
+    parser.add_argument('--list', action='store_true', help="List case names and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(CASES))
+        return 0
+
+    results = run_suite(args.filter, args.repeat_scale)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
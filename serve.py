@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Production launcher: preload once, fork workers that share it copy-on-write
+
+The master process imports app.py, builds every analyzer (OpenCV cascades,
+VADER lexicon, NLTK data, librosa) and, unless --no-warmup, runs one warm-up
+pass so numba kernels and lazy imports are resolved. It then freezes the
+garbage collector's view of those objects and forks the workers, which
+inherit the already-built analyzers and share their pages with the master
+until written to. Workers accept from one listening socket, each serving
+requests from a bounded thread pool. Workers that die are replaced by a
+fresh fork of the master.
+
+Run from the project root:
+    python serve.py --workers 4 --threads 8
+    WEB_WORKERS=2 PORT=8080 python serve.py --memory-interval 30
+
+With more than one worker, sessions and background jobs default to the
+SQLite stores (SESSION_STORE=sqlite, JOB_STORE=sqlite) so any worker can
+serve any request of a session.
+
+app.py's admission limits are per worker process, so serve.py also defaults
+them from the worker and thread counts: each endpoint class may run
+cpu_count // workers analyses per worker (at least one) and queue as many
+more as the worker has request threads left over. A full node then answers
+overload with 503 and Retry-After instead of leaving it waiting in the
+accept backlog. Open job event streams each hold a request thread, so at
+most a quarter of the threads (at least one) may serve them. Set
+ADMISSION_CONCURRENCY / ADMISSION_QUEUE_SIZE (or their per-class forms) and
+ADMISSION_EVENTS_CONCURRENCY to override this.
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from utils.memory import smaps_rollup
+
+MB = 1024 * 1024
+
+
+class RequestHandler(WSGIRequestHandler):
+    # One request per connection, so an idle keep-alive client never pins a pool thread
+    protocol_version = 'HTTP/1.0'
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server handling connections on a fixed-size thread pool"""
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads, fd):
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='request')
+        super().__init__(host, port, app, handler=RequestHandler, fd=fd)
+        # Every worker polls the shared socket; losers of an accept race must not block
+        self.socket.setblocking(False)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def drain(self):
+        """Wait for in-flight requests once serve_forever has returned, then close"""
+        self.pool.shutdown(wait=True)
+        self.server_close()
+
+
+def listen(host, port, backlog=128):
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+def admission_defaults(workers, threads, cpus=None):
+    """(concurrency, queue size, event streams) per worker that fit the node and its request threads"""
+    cpus = cpus or os.cpu_count() or 1
+    concurrency = min(threads, max(1, cpus // workers))
+    return concurrency, threads - concurrency, max(1, threads // 4)
+
+
+def preload(warmup=True):
+    """Import the app and build every analyzer in the master process"""
+    started = time.perf_counter()
+    import app as app_module
+
+    for analyzer in (app_module.text_analyzer, app_module.voice_analyzer, app_module.facial_analyzer):
+        analyzer.get()
+    if warmup and app_module.warmup_report is None:
+        app_module.warmup_report = app_module.warm_up(
+            app_module.voice_analyzer, app_module.facial_analyzer, app_module.text_analyzer
+        )
+
+    # Fork with no threads but this one: locks held by other threads would be copied locked
+    stray = [thread.name for thread in threading.enumerate() if thread is not threading.main_thread()]
+    if stray:
+        print(f"Warning: threads running before fork ({', '.join(stray)}); workers may deadlock on their locks")
+
+    # Keep the collector from touching (and so un-sharing) preloaded objects
+    gc.collect()
+    gc.freeze()
+    print(f"Preloaded analyzers in {time.perf_counter() - started:.1f}s ({gc.get_freeze_count()} objects frozen)")
+    return app_module.app
+
+
+def run_worker(app, sock, host, port, threads, on_exit=None):
+    """Serve from the inherited socket until SIGTERM/SIGINT, then drain and exit"""
+    server = PooledWSGIServer(host, port, app, threads, sock.fileno())
+
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever to return, so call it from another thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        server.serve_forever()
+    finally:
+        server.drain()
+        # os._exit skips atexit handlers, so run the app's shutdown hook here
+        if on_exit is not None:
+            on_exit()
+    os._exit(0)
+
+
+class Master:
+    """Forks workers, replaces ones that die and reports their memory"""
+
+    def __init__(self, app, sock, host, port, workers, threads, memory_interval, on_exit=None):
+        self.app = app
+        self.on_exit = on_exit
+        self.sock = sock
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.threads = threads
+        self.memory_interval = memory_interval
+        self.pids = {}
+        self.stopping = False
+
+    def spawn(self, index):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(self.app, self.sock, self.host, self.port, self.threads, self.on_exit)
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(1)
+        self.pids[pid] = index
+        print(f"Worker {index} started (pid {pid})")
+
+    def stop(self, signum, frame):
+        self.stopping = True
+
+    def reap(self):
+        while self.pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            index = self.pids.pop(pid, None)
+            if index is not None and not self.stopping:
+                print(f"Worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}; restarting")
+                self.spawn(index)
+
+    def report_memory(self):
+        rows = [('master', os.getpid())] + [(f'worker {index}', pid) for pid, index in sorted(self.pids.items(), key=lambda item: item[1])]
+        print(f"{'process':<12}{'pid':>8}{'rss MB':>10}{'pss MB':>10}{'shared MB':>11}{'private MB':>12}")
+        total_pss = 0
+        for name, pid in rows:
+            usage = smaps_rollup(pid)
+            if usage is None:
+                print(f"{name:<12}{pid:>8}{'n/a':>10}")
+                continue
+            total_pss += usage['pss']
+            print(f"{name:<12}{pid:>8}{usage['rss'] / MB:>10.1f}{usage['pss'] / MB:>10.1f}"
+                  f"{usage['shared'] / MB:>11.1f}{usage['private'] / MB:>12.1f}")
+        print(f"{'total pss':<20}{total_pss / MB:>10.1f}")
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for index in range(self.workers):
+            self.spawn(index)
+        print(f"🧠 Serving on http://{self.host}:{self.port} with {self.workers} workers x {self.threads} threads")
+
+        # First report once workers have settled, then every memory_interval seconds
+        next_report = time.monotonic() + 5 if self.memory_interval else None
+        while not self.stopping:
+            time.sleep(1)
+            self.reap()
+            if next_report is not None and time.monotonic() >= next_report:
+                self.report_memory()
+                next_report = time.monotonic() + self.memory_interval
+
+        for pid in list(self.pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in list(self.pids):
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        self.sock.close()
+        print("Stopped")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Preload the analyzers and serve app.py from forked workers")
+    parser.add_argument('--host', default=os.environ.get('HOST', '127.0.0.1'), help="Address to bind (default 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)), help="Port to bind (default 5000)")
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_WORKERS', os.cpu_count() or 1)),
+                        help="Worker processes (default WEB_WORKERS or the CPU count)")
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('WEB_THREADS', 8)),
+                        help="Request threads per worker (default WEB_THREADS or 8)")
+    parser.add_argument('--no-warmup', action='store_true', help="Build the analyzers but skip the warm-up pass")
+    parser.add_argument('--memory-interval', type=float, default=float(os.environ.get('MEMORY_REPORT_INTERVAL', 60)),
+                        help="Seconds between per-worker memory reports; 0 disables them (default 60)")
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, 'fork'):
+        parser.error("serve.py needs os.fork; on this platform run app.py directly")
+    if args.workers < 1 or args.threads < 1:
+        parser.error("--workers and --threads must be at least 1")
+
+    if args.workers > 1:
+        # In-memory stores would give each worker its own sessions and jobs
+        os.environ.setdefault('SESSION_STORE', 'sqlite')
+        os.environ.setdefault('JOB_STORE', 'sqlite')
+        os.makedirs('instance', exist_ok=True)
+
+    # Read by app.py when preload imports it; admission is per process, not per node
+    concurrency, queue_size, event_streams = admission_defaults(args.workers, args.threads)
+    os.environ.setdefault('ADMISSION_CONCURRENCY', str(concurrency))
+    os.environ.setdefault('ADMISSION_QUEUE_SIZE', str(queue_size))
+    os.environ.setdefault('ADMISSION_EVENTS_CONCURRENCY', str(event_streams))
+
+    # Bind before the slow preload so a busy port fails fast
+    sock = listen(args.host, args.port)
+    app = preload(warmup=not args.no_warmup)
+    import app as app_module
+    Master(app, sock, args.host, args.port, args.workers, args.threads, args.memory_interval,
+           on_exit=app_module.shutdown).run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
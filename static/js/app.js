@@ -7,6 +7,14 @@ class MindScopeAnalyzer {
             voice: null,
             facial: null
         };
+        // Server-side session that stores each analysis for the combined report.
+        // It is created once behind sessionReady, which every request awaits, so
+        // text and answer uploads starting together share one session
+        this.sessionId = null;
+        this.sessionReady = null;
+        // Answers are analyzed one at a time as they are recorded
+        this.answerUploads = Promise.resolve();
+        this.analyzedAnswers = {};
         this.init();
     }
 
@@ -85,6 +93,7 @@ class MindScopeAnalyzer {
 
         // Listen for recording events
         document.addEventListener('recordingCompleted', (e) => {
+            this.uploadAnswer(e.detail.questionIndex, e.detail.audioBlob);
             this.checkAllQuestionsRecorded();
         });
 
@@ -337,13 +346,20 @@ class MindScopeAnalyzer {
                 return;
             }
 
+            const sessionId = await this.ensureSession();
             const response = await fetch('/analyze_text', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
                 },
-                body: JSON.stringify({ responses: responses })
+                // Subjectivity is not displayed, so skip the TextBlob pass
+                body: JSON.stringify({
+                    responses: responses,
+                    outputs: ['mood', 'sentiment', 'emotions'],
+                    session_id: sessionId
+                })
             });
+            this.resetSession(response);
 
             const result = await response.json();
             
@@ -363,6 +379,32 @@ class MindScopeAnalyzer {
         }
     }
 
+    ensureSession() {
+        if (!this.sessionReady) {
+            this.sessionReady = fetch('/sessions', { method: 'POST' })
+                .then(response => response.json())
+                .then(result => {
+                    this.sessionId = result.session_id;
+                    return this.sessionId;
+                })
+                .catch(error => {
+                    // Let the next request try again
+                    this.sessionReady = null;
+                    throw error;
+                });
+        }
+        return this.sessionReady;
+    }
+
+    resetSession(response) {
+        // An expired session keeps answering 404; drop it so the next request starts a new one
+        if (response.status === 404) {
+            this.sessionId = null;
+            this.sessionReady = null;
+            this.analyzedAnswers = {};
+        }
+    }
+
     checkAllQuestionsRecorded() {
         const allRecorded = window.voiceRecorder?.hasAllRecordings(this.questions.length);
 
@@ -372,6 +414,31 @@ class MindScopeAnalyzer {
         }
     }
 
+    uploadAnswer(questionIndex, audioBlob) {
+        // Analyze this answer in the background while the next one is recorded
+        this.answerUploads = this.answerUploads.then(async () => {
+            try {
+                const formData = new FormData();
+                formData.append(`audio_${questionIndex}`, audioBlob, `question_${questionIndex}.wav`);
+                formData.append('session_id', await this.ensureSession());
+
+                const response = await fetch('/analyze_answer', {
+                    method: 'POST',
+                    body: formData
+                });
+                this.resetSession(response);
+                const result = await response.json();
+                if (result.success) {
+                    this.analyzedAnswers[questionIndex] = audioBlob;
+                }
+            } catch (error) {
+                // The clip is sent again with the final analysis request
+                console.error(`Error analyzing answer ${questionIndex}:`, error);
+            }
+        });
+        return this.answerUploads;
+    }
+
     async analyzeVoice() {
         try {
             if (!window.voiceRecorder?.hasAllRecordings(this.questions.length)) {
@@ -381,21 +448,27 @@ class MindScopeAnalyzer {
 
             this.showLoading('Analyzing your voice patterns...');
             
+            // Let in-flight per-answer analyses land in the session first
+            await this.answerUploads;
+
             const formData = new FormData();
             const recordings = window.voiceRecorder.getAllRecordings();
             
-            // Add all question recordings
+            // Only recordings the server has not analyzed yet need uploading
             Object.keys(recordings).forEach(index => {
                 const recording = recordings[index];
-                if (recording.audioBlob) {
+                if (recording.audioBlob && this.analyzedAnswers[index] !== recording.audioBlob) {
                     formData.append(`audio_${index}`, recording.audioBlob, `question_${index}.wav`);
                 }
             });
 
+            formData.append('session_id', await this.ensureSession());
+
             const response = await fetch('/analyze_voice', {
                 method: 'POST',
                 body: formData
             });
+            this.resetSession(response);
 
             const result = await response.json();
             
@@ -896,12 +969,10 @@ class MindScopeAnalyzer {
                 headers: {
                     'Content-Type': 'application/json'
                 },
-                body: JSON.stringify({
-                    text_result: this.results.text,
-                    voice_result: this.results.voice,
-                    facial_result: this.results.facial
-                })
+                // Results already live on the server; only the session id is sent
+                body: JSON.stringify({ session_id: this.sessionId })
             });
+            this.resetSession(response);
 
             const result = await response.json();
             
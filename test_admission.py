@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for per-endpoint admission control
+"""
+
+import threading
+import time
+
+import pytest
+
+from utils.admission import AdmissionController, AdmissionRejected
+
+
+def test_rejects_when_slots_and_queue_are_full():
+    controller = AdmissionController('voice', max_concurrent=1, max_waiting=0, retry_after=7)
+    controller.acquire()
+
+    with pytest.raises(AdmissionRejected) as excinfo:
+        controller.acquire()
+    assert excinfo.value.retry_after == 7
+
+    controller.release()
+    with controller.slot():
+        pass
+    stats = controller.stats()
+    assert stats['admitted'] == 2
+    assert stats['rejected'] == 1
+    assert stats['active'] == 0
+
+
+def test_queued_request_runs_when_a_slot_frees():
+    controller = AdmissionController('voice', max_concurrent=1, max_waiting=1, wait_timeout=5)
+    controller.acquire()
+    admitted = threading.Event()
+
+    def waiter():
+        with controller.slot():
+            admitted.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    while controller.stats()['waiting'] == 0:
+        time.sleep(0.01)
+
+    # The queue holds one request, so a third is turned away immediately
+    with pytest.raises(AdmissionRejected):
+        controller.acquire()
+    assert not admitted.is_set()
+
+    controller.release()
+    thread.join(timeout=5)
+    assert admitted.is_set()
+    assert controller.stats()['waiting'] == 0
+
+
+def test_queued_request_times_out():
+    controller = AdmissionController('facial', max_concurrent=1, max_waiting=1, wait_timeout=0.05)
+    controller.acquire()
+
+    with pytest.raises(AdmissionRejected):
+        controller.acquire()
+    stats = controller.stats()
+    assert stats['timed_out'] == 1
+    assert stats['waiting'] == 0
+    assert stats['active'] == 1
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for per-answer analysis and aggregating stored answers later
+"""
+
+import io
+
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+def upload(field):
+    return {field: (io.BytesIO(b'\0' * 64), f'{field}.bin')}
+
+
+def test_answers_are_analyzed_once_and_aggregated_from_the_session(client, monkeypatch):
+    calls = []
+
+    def voice_answer(path, question_index):
+        calls.append(('voice', question_index))
+        return {'primary_emotion': 'sad', 'confidence': 0.6, 'emotion_score': -0.42,
+                'vocal_characteristics': {'energy_level': 'low'}, 'recommendations': []}
+
+    def facial_answer(path, question_index):
+        calls.append(('facial', question_index))
+        return {'primary_emotion': 'neutral', 'confidence': 0.5, 'emotion_score': 0.0}
+
+    monkeypatch.setattr(app_module.pipeline, 'analyze_voice_answer', voice_answer)
+    monkeypatch.setattr(app_module.pipeline, 'analyze_facial_answer', facial_answer)
+
+    first = client.post('/analyze_answer', data=upload('audio_0'), content_type='multipart/form-data').get_json()
+    session_id = first['session_id']
+    assert first['voice']['0']['primary_emotion'] == 'sad' and first['facial'] == {}
+
+    second = client.post('/analyze_answer', data=dict(upload('audio_1'), **upload('video_1'), session_id=session_id),
+                         content_type='multipart/form-data').get_json()
+    assert set(second['voice']) == {'1'} and set(second['facial']) == {'1'}
+
+    # Finishing the questionnaire only aggregates what was already analyzed
+    voice = client.post('/analyze_voice', data={'session_id': session_id}, content_type='multipart/form-data').get_json()
+    assert set(voice['question_analyses']) == {'0', '1'}
+    assert voice['overall_analysis']['emotion_score'] == pytest.approx(-0.42)
+    assert calls == [('voice', '0'), ('voice', '1'), ('facial', '1')]
+    assert app_module.session_store.get(session_id)['voice'] == {k: v for k, v in voice.items() if k != 'session_id'}
+
+
+def test_answer_endpoint_rejects_missing_files_and_unknown_sessions(client):
+    assert client.post('/analyze_answer', data={}, content_type='multipart/form-data').status_code == 400
+    response = client.post('/analyze_answer', data=dict(upload('audio_0'), session_id='missing'),
+                           content_type='multipart/form-data')
+    assert response.status_code == 404
+
+
+def test_session_expiring_mid_request_is_reported_not_dropped(client, monkeypatch):
+    monkeypatch.setattr(app_module.pipeline, 'analyze_voice_answer', lambda path, question_index: {'emotion_score': 0.0})
+    monkeypatch.setattr(app_module.pipeline, 'aggregate_voice', lambda analyses: {'question_analyses': analyses})
+    session_id = app_module.session_store.create_session()
+    # The session exists when the request starts but is gone by the time results are stored
+    monkeypatch.setattr(app_module.session_store, 'put_answer', lambda *args: False)
+    monkeypatch.setattr(app_module.session_store, 'put', lambda *args: False)
+
+    for endpoint in ('/analyze_answer', '/analyze_voice'):
+        response = client.post(endpoint, data=dict(upload('audio_0'), session_id=session_id),
+                               content_type='multipart/form-data')
+        assert response.status_code == 404
+        assert response.get_json() == {"error": "Unknown or expired session"}
+
+    response = client.post('/analyze_text', json={'responses': ['fine'], 'session_id': session_id})
+    assert response.status_code == 404
+
+
+def test_created_session_is_shared_by_text_and_answers(client, monkeypatch):
+    monkeypatch.setattr(app_module.pipeline, 'analyze_voice_answer', lambda path, question_index: {'emotion_score': 0.0})
+    created = client.post('/sessions')
+    assert created.status_code == 201
+    session_id = created.get_json()['session_id']
+
+    text = client.post('/analyze_text', json={'responses': ['fine'], 'session_id': session_id}).get_json()
+    answer = client.post('/analyze_answer', data=dict(upload('audio_0'), session_id=session_id),
+                         content_type='multipart/form-data').get_json()
+    assert text['session_id'] == answer['session_id'] == session_id
+    assert app_module.session_store.get_answers(session_id, 'voice') == {'0': {'emotion_score': 0.0}}
+    assert 'text' in app_module.session_store.get(session_id)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for /analyze_session, which runs every modality of one request concurrently
+"""
+
+import io
+import json
+import threading
+
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+def uploads(**fields):
+    data = {key: (io.BytesIO(b'\0' * 64), f'{key}.bin') for key in fields.pop('files', ())}
+    data.update(fields)
+    return data
+
+
+def fake_modality(name, barrier=None, fail=False):
+    def analyze(paths):
+        if barrier is not None:
+            # Only passes when the other modality is running at the same time
+            barrier.wait()
+        if fail:
+            raise RuntimeError(f"{name} decoder crashed")
+        return {'success': True, 'question_analyses': {index: {} for index in paths},
+                'overall_analysis': {'emotion_score': 0.0}, 'analyzed_by': threading.current_thread().name}
+    return analyze
+
+
+def test_modalities_run_concurrently(client, monkeypatch):
+    barrier = threading.Barrier(2, timeout=5)
+    monkeypatch.setattr(app_module.pipeline, 'analyze_voice_files', fake_modality('voice', barrier))
+    monkeypatch.setattr(app_module.pipeline, 'analyze_facial_files', fake_modality('facial', barrier))
+
+    response = client.post('/analyze_session', data=uploads(
+        responses=json.dumps(['I slept well', 'Work was fine']), files=('audio_0', 'video_0')
+    ), content_type='multipart/form-data')
+    payload = response.get_json()
+
+    assert response.status_code == 200 and payload['errors'] == {}
+    assert payload['text']['response_count'] == 2
+    assert payload['voice']['analyzed_by'] != payload['facial']['analyzed_by']
+    assert app_module.session_store.get(payload['session_id']).keys() == {'text', 'voice', 'facial'}
+
+
+def test_failing_modality_is_reported_and_others_still_return(client, monkeypatch):
+    monkeypatch.setattr(app_module.pipeline, 'analyze_voice_files', fake_modality('voice'))
+    monkeypatch.setattr(app_module.pipeline, 'analyze_facial_files', fake_modality('facial', fail=True))
+
+    response = client.post('/analyze_session', data=uploads(
+        response=['I feel calm'], files=('audio_0', 'video_0')
+    ), content_type='multipart/form-data')
+    payload = response.get_json()
+
+    assert response.status_code == 200
+    assert payload['errors'] == {'facial': 'facial decoder crashed'}
+    assert payload['facial'] is None
+    assert payload['text'] is not None and payload['voice']['success']
+    assert payload['analysis']['individual_analyses']['facial'] is None
+
+
+@pytest.mark.parametrize('fields', [
+    {},
+    {'responses': '[]'},
+    {'responses': 'not json'},
+    {'responses': '{"0": "a dict"}'},
+])
+def test_empty_or_invalid_input_is_rejected(client, fields):
+    response = client.post('/analyze_session', data=fields, content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_unknown_session_is_rejected(client):
+    response = client.post('/analyze_session', data={'response': 'hello', 'session_id': 'missing'},
+                           content_type='multipart/form-data')
+    assert response.status_code == 404
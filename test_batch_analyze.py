@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for the offline batch runner
+"""
+
+import json
+
+from batch_analyze import discover, read_manifest, load_checkpoint, run_batch, default_chunksize, main
+from utils.feature_store import FeatureStore
+from analysis.voice_analysis import VoiceAnalyzer, VOICE_FEATURE_NAMES
+from analysis.facial_analysis import FacialAnalyzer, FACIAL_FEATURE_NAMES
+
+
+def test_discover_walks_directories_and_infers_modality(tmp_path):
+    (tmp_path / 'session').mkdir()
+    for name in ('q0.wav', 'q0.webm', 'answers.txt', 'notes.md'):
+        (tmp_path / 'session' / name).write_text('x')
+
+    items = {item['id']: item['modality'] for item in discover([str(tmp_path)])}
+    assert items == {'session/answers.txt': 'text', 'session/q0.wav': 'voice', 'session/q0.webm': 'facial'}
+    # An explicit modality overrides the extension (audio-only webm)
+    assert {item['modality'] for item in discover([str(tmp_path / 'session' / 'q0.webm')], 'voice')} == {'voice'}
+
+
+def test_manifest_accepts_jsonl_and_plain_paths(tmp_path):
+    manifest = tmp_path / 'manifest.jsonl'
+    manifest.write_text('\n'.join([
+        json.dumps({'id': 'a', 'path': 'a.wav'}),
+        json.dumps({'id': 'b', 'responses': ['fine']}),
+        'clips/c.mp4',
+        '# comment'
+    ]))
+    items = list(read_manifest(str(manifest)))
+    assert [(item['id'], item['modality']) for item in items] == [('a', 'voice'), ('b', 'text'), ('clips/c.mp4', 'facial')]
+    assert items[0]['path'] == str(tmp_path / 'a.wav')
+
+
+def test_checkpoint_drops_torn_line_and_retries_failures(tmp_path):
+    output = tmp_path / 'out.jsonl'
+    output.write_text(json.dumps({'id': 'a', 'status': 'ok'}) + '\n'
+                      + json.dumps({'id': 'b', 'status': 'error'}) + '\n'
+                      + '{"id": "c", "sta')
+
+    assert load_checkpoint(str(output)) == {'a': 'ok', 'b': 'error'}
+    assert output.read_text().endswith('"error"}\n')
+    assert load_checkpoint(str(output), retry_failed=True) == {'a': 'ok'}
+
+
+def test_default_chunksize_keeps_several_chunks_per_worker():
+    assert default_chunksize(10, 4) == 1
+    assert default_chunksize(1000, 4) == 16
+    assert default_chunksize(200, 4) == 7
+
+
+def test_run_batch_appends_one_record_per_item(tmp_path):
+    items = [{'id': f'r{i}', 'path': None, 'modality': 'text', 'responses': ['I feel calm and happy today']}
+             for i in range(3)]
+    output = tmp_path / 'out.jsonl'
+
+    counts = run_batch(items, str(output), jobs=1, chunksize=2)
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert counts == {'ok': 3, 'error': 0}
+    assert sorted(record['id'] for record in records) == ['r0', 'r1', 'r2']
+    assert all('overall_mood' in record['result'] for record in records)
+    assert set(load_checkpoint(str(output))) == {'r0', 'r1', 'r2'}
+
+
+def test_rescore_matches_scalar_scoring(tmp_path):
+    store = FeatureStore(str(tmp_path / 'features'))
+    with store.writer('voice', VOICE_FEATURE_NAMES) as writer:
+        writer.add('loud', {'rms_mean': 0.03, 'tempo': 130.0, 'spectral_centroid_mean': 2500.0, 'zcr_mean': 0.2})
+        writer.add('quiet', {'rms_mean': 0.01, 'zcr_mean': 0.05, 'spectral_centroid_std': 700.0})
+        writer.add('empty', {})
+    with store.writer('facial', FACIAL_FEATURE_NAMES) as writer:
+        writer.add('clip', {'mean_brightness': 150.0, 'eye_count': 2.0, 'eye_symmetry': 3.0})
+        writer.add('dark', {'mean_brightness': 90.0, 'face_width': 40.0, 'face_height': 40.0})
+
+    output = tmp_path / 'rescored.jsonl'
+    assert main(['--rescore', '--feature-store', str(tmp_path / 'features'), '--output', str(output)]) == 0
+    records = {record['id']: record for record in map(json.loads, output.read_text().splitlines())}
+    assert records['empty']['status'] == 'error'
+
+    voice, facial = store.table('voice'), store.table('facial')
+    for item_id in ('loud', 'quiet'):
+        assert records[item_id]['result'] == VoiceAnalyzer().score_features(voice.row(item_id))
+    for item_id in ('clip', 'dark'):
+        assert records[item_id]['result'] == FacialAnalyzer().score_features(facial.row(item_id))
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Row-for-row parity tests for the vectorized classifiers against the scalar rules
+"""
+
+import numpy as np
+
+from analysis.batch_classifiers import (
+    VOICE_EMOTIONS, FACIAL_EMOTIONS, classify_voice, voice_characteristics, classify_facial
+)
+from analysis.voice_analysis import VoiceAnalyzer, VOICE_FEATURE_NAMES
+from analysis.facial_analysis import FacialAnalyzer, FACIAL_FEATURE_NAMES
+
+# Rule thresholds, so the random rows land exactly on every boundary too
+VOICE_VALUES = {
+    'rms_mean': [0.0, 0.01, 0.015, 0.02, 0.025, 0.03],
+    'tempo': [0.0, 100.0, 120.0, 140.0],
+    'spectral_centroid_mean': [0.0, 1500.0, 2000.0, 2500.0],
+    'zcr_mean': [0.0, 0.05, 0.08, 0.1, 0.15, 0.2],
+    'spectral_centroid_std': [0.0, 300.0, 500.0, 600.0, 800.0],
+}
+FACIAL_VALUES = {
+    'mean_brightness': [0.0, 90.0, 100.0, 128.0, 140.0, 160.0],
+    'brightness_std': [0.0, 50.0, 60.0],
+    'eye_count': [0.0, 0.5, 1.0, 2.0, 3.0],
+    'eye_symmetry': [0.0, 4.0, 5.0, 8.0],
+    'face_width': [0.0, 50.0, 60.0, 100.0, 120.0],
+    'face_height': [0.0, 50.0, 60.0, 100.0, 120.0],
+}
+
+
+def random_matrix(columns, values, rows=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    matrix = rng.normal(size=(rows, len(columns)))
+    for i, name in enumerate(columns):
+        if name in values:
+            lo, hi = min(values[name]), max(values[name])
+            uniform = rng.uniform(lo - (hi - lo) * 0.1, hi * 1.1, size=rows)
+            matrix[:, i] = np.where(rng.random(rows) < 0.5, rng.choice(values[name], size=rows), uniform)
+    # Absent features, including some rows with none at all
+    matrix[rng.random(matrix.shape) < 0.15] = np.nan
+    matrix[:20] = np.nan
+    return matrix
+
+
+def as_dict(columns, row):
+    return {name: value for name, value in zip(columns, row.tolist()) if value == value}
+
+
+def test_voice_matches_scalar_rules():
+    analyzer = VoiceAnalyzer()
+    matrix = random_matrix(VOICE_FEATURE_NAMES, VOICE_VALUES)
+    result = classify_voice(matrix)
+    characteristics = voice_characteristics(matrix)
+
+    for i, row in enumerate(matrix):
+        features = as_dict(VOICE_FEATURE_NAMES, row)
+        expected = analyzer.classify_emotion_simple(features)
+        assert result['emotion'][i] == expected['emotion']
+        assert result['confidence'][i] == expected['confidence']
+        expected_characteristics = analyzer.analyze_vocal_characteristics(features)
+        if not features:
+            assert expected_characteristics == {}
+            assert all(labels[i] is None for labels in characteristics.values())
+            continue
+        assert dict(zip(VOICE_EMOTIONS, result['emotion_scores'][i].tolist())) == expected['emotion_scores']
+        assert {key: labels[i] for key, labels in characteristics.items()} == expected_characteristics
+        assert result['emotion_score'][i] == analyzer.score_features(features)['emotion_score']
+
+
+def test_facial_matches_scalar_rules():
+    analyzer = FacialAnalyzer()
+    matrix = random_matrix(FACIAL_FEATURE_NAMES, FACIAL_VALUES)
+    result = classify_facial(matrix)
+
+    for i, row in enumerate(matrix):
+        features = as_dict(FACIAL_FEATURE_NAMES, row)
+        expected = analyzer.score_features(features)
+        assert result['emotion'][i] == expected['primary_emotion']
+        assert result['confidence'][i] == expected['confidence']
+        assert dict(zip(FACIAL_EMOTIONS, result['emotion_scores'][i].tolist())) == expected['emotion_scores']
+        assert result['emotion_score'][i] == expected['emotion_score']
+
+
+def test_column_subsets_and_missing_columns_use_scalar_defaults():
+    analyzer = FacialAnalyzer()
+    # No mean_brightness column: the scalar default of 128 applies, not 0
+    columns = ['eye_count', 'face_width', 'face_height']
+    matrix = np.array([[2.0, 120.0, 120.0], [0.0, 10.0, 10.0]])
+    result = classify_facial(matrix, columns)
+    for i, row in enumerate(matrix):
+        expected = analyzer.classify_features(as_dict(columns, row))
+        assert result['emotion'][i] == expected['emotion']
+        assert result['confidence'][i] == expected['confidence']
+
+    voice = classify_voice(np.empty((0, len(VOICE_FEATURE_NAMES))))
+    assert voice['emotion'].shape == (0,)
+    assert voice['emotion_scores'].shape == (0, len(VOICE_EMOTIONS))
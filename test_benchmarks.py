@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Tests for the benchmark fixtures and baseline comparison
+"""
+
+import numpy as np
+
+from benchmarks.fixtures import make_audio, make_responses
+from benchmarks.suite import compare
+
+
+def test_fixtures_are_deterministic():
+    assert np.array_equal(make_audio('speech', 0.5), make_audio('speech', 0.5))
+    assert make_audio('tone', 1.0, sample_rate=16000).shape == (16000,)
+    assert make_responses(3, 10) == make_responses(3, 10)
+    assert make_responses(3, 10) != make_responses(3, 10, seed=7)
+
+
+def test_compare_flags_slowdowns_beyond_threshold():
+    baseline = {'results': {'fast': {'median_ms': 10.0}, 'slow': {'median_ms': 10.0}}}
+    results = {'fast': {'median_ms': 11.0}, 'slow': {'median_ms': 13.0}, 'new': {'median_ms': 1.0}}
+    assert compare(results, baseline, threshold=0.2) == ['slow']
+
+
+def test_load_summary_percentiles_and_error_rates():
+    from benchmarks.loadgen import percentile, summarize, parse_mix
+
+    assert percentile([1, 2, 3, 4], 0.5) == 2
+    assert percentile([1, 2, 3, 4], 0.99) == 4
+    assert parse_mix('full=1,text=3') == [('full', 1.0), ('text', 3.0)]
+
+    samples = [('/analyze_text', 200, 0.01)] * 8 + [('/analyze_text', 503, 0.001), ('/analyze_text', 500, 0.02)]
+    summary = summarize(samples, elapsed=2.0)
+    assert summary['/analyze_text']['requests'] == 10
+    assert summary['/analyze_text']['throughput_rps'] == 5.0
+    assert summary['/analyze_text']['error_rate'] == 0.1
+    assert summary['/analyze_text']['rejected_rate'] == 0.1
+    assert summary['ALL']['p50_ms'] == 10.0
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for the LRU memo used by sentiment scoring
+"""
+
+import threading
+
+from utils.cache import LRUCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(capacity=2)
+    cache.put('fine', 1)
+    cache.put('tired', 2)
+    cache.get('fine')
+    cache.put('not great', 3)
+
+    assert cache.get('tired') is None
+    assert cache.get('fine') == 1
+    assert cache.stats()['evictions'] == 1
+
+
+def test_get_or_compute_tracks_hit_rate():
+    cache = LRUCache(capacity=8)
+    calls = []
+    for text in ['fine', 'fine', 'tired', 'fine']:
+        cache.get_or_compute(text, lambda: calls.append(text) or len(text))
+
+    stats = cache.stats()
+    assert calls == ['fine', 'tired']
+    assert (stats['hits'], stats['misses']) == (2, 2)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_zero_capacity_disables_caching():
+    cache = LRUCache(capacity=0)
+    cache.put('fine', 1)
+    assert len(cache) == 0
+
+
+def test_concurrent_access_stays_bounded():
+    cache = LRUCache(capacity=50)
+
+    def worker(offset):
+        for i in range(2000):
+            cache.get_or_compute((offset + i) % 120, lambda: i)
+
+    threads = [threading.Thread(target=worker, args=(n * 7,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats()
+    assert stats['size'] == 50
+    assert stats['hits'] + stats['misses'] == 8 * 2000
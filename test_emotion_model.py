@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for the model-backed voice emotion classifier and its hot reload
+"""
+
+import os
+
+import numpy as np
+
+from analysis.batch_classifiers import classify_voice
+from analysis.emotion_model import EmotionModel, ModelHandle, train_model, save_model
+from analysis.voice_analysis import VoiceAnalyzer, VOICE_FEATURE_NAMES
+from benchmarks.fixtures import make_feature_matrix
+
+
+def synthetic_model(rows=800, seed=0, labels=None):
+    matrix = make_feature_matrix(VOICE_FEATURE_NAMES, rows, seed=seed)
+    return train_model(matrix, labels if labels is not None else classify_voice(matrix)['emotion'])
+
+
+def test_saved_model_loads_memory_mapped_and_batches_match_single_items(tmp_path):
+    path = str(tmp_path / 'voice_emotion.pkl')
+    save_model(synthetic_model(), path)
+    model = EmotionModel.load(path)
+    scaler = model.pipeline.named_steps['standardscaler']
+    assert isinstance(scaler.scale_, np.memmap)
+
+    matrix = make_feature_matrix(VOICE_FEATURE_NAMES, 50, seed=3)
+    batch = model.classify_batch(matrix)
+    assert batch['emotion_scores'].shape == (50, len(model.labels))
+    for i, row in enumerate(matrix.tolist()):
+        # Absent features are NaN in the matrix and missing keys in the dict
+        single = model.classify({name: value for name, value in zip(VOICE_FEATURE_NAMES, row) if value == value})
+        assert single['emotion'] == batch['emotion'][i]
+        assert np.isclose(single['confidence'], batch['confidence'][i])
+
+    # librosa's one-element tempo array and a mostly empty feature dict still classify
+    assert model.classify({'tempo': np.array([128.0]), 'rms_mean': 0.03})['emotion'] in model.labels
+
+
+def test_handle_reloads_replaced_file_and_keeps_model_on_bad_file(tmp_path):
+    path = str(tmp_path / 'voice_emotion.pkl')
+    handle = ModelHandle(path, check_interval=0)
+    assert handle.get() is None
+
+    save_model(synthetic_model(), path)
+    first = handle.get()
+    assert first is not None and handle.get() is first
+
+    labels = np.where(np.arange(400) % 2, 'calm', 'sad')
+    save_model(synthetic_model(rows=400, seed=5, labels=labels), path)
+    second = handle.get()
+    assert second is not first and second.labels == ['calm', 'sad']
+
+    with open(path + '.new', 'wb') as f:
+        f.write(b'not a model')
+    os.replace(path + '.new', path)
+    assert handle.get() is second
+    assert handle.info()['last_error'] and handle.info()['reloads'] == 2
+
+    # A removed file keeps the model in service, unlike a removed static file
+    os.remove(path)
+    assert handle.get() is second and handle.info()['loaded']
+
+
+def test_analyzer_uses_model_when_loaded_and_rules_otherwise(tmp_path):
+    path = str(tmp_path / 'voice_emotion.pkl')
+    analyzer = VoiceAnalyzer(emotion_model=ModelHandle(path, check_interval=0))
+    features = {'rms_mean': 0.03, 'tempo': 130.0, 'spectral_centroid_mean': 2500.0, 'zcr_mean': 0.2}
+
+    assert analyzer.score_features(features) == VoiceAnalyzer().score_features(features)
+
+    save_model(synthetic_model(), path)
+    result = analyzer.score_features(features)
+    assert result['emotion_model'].startswith('voice_emotion.pkl@')
+    assert set(result['emotion_scores']) == set(analyzer.emotion_model.get().labels)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for the columnar feature store
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from utils.feature_store import FeatureStore
+from analysis.voice_analysis import VoiceAnalyzer
+from analysis.facial_analysis import FacialAnalyzer, FACIAL_FEATURE_NAMES
+
+COLUMNS = ['rms_mean', 'zcr_mean', 'tempo']
+
+
+def test_rows_round_trip_with_absent_features(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    with store.writer('voice', COLUMNS) as writer:
+        writer.add('a', {'rms_mean': 0.03, 'zcr_mean': 0.12, 'tempo': np.array([130.0])})
+        writer.add('b', {'rms_mean': 0.01, 'unknown': 5})
+
+    table = store.table('voice')
+    assert len(table) == 2
+    assert table.row('a') == {'rms_mean': 0.03, 'zcr_mean': 0.12, 'tempo': 130.0}
+    assert table.row('b') == {'rms_mean': 0.01}
+    assert math.isnan(table.column('tempo')[1])
+    assert table.matrix(['tempo', 'rms_mean']).shape == (2, 2)
+    assert isinstance(table.column('rms_mean'), np.memmap)
+
+
+def test_segments_concatenate_and_latest_row_wins(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    writer = store.writer('voice', COLUMNS, segment_rows=2)
+    for i in range(5):
+        writer.add(f'id{i}', {'rms_mean': float(i)})
+    writer.add('id0', {'rms_mean': 99.0})
+    writer.close()
+
+    table = store.table('voice')
+    assert len(table.segments) == 3
+    assert len(table) == 6
+    assert table.row('id0') == {'rms_mean': 99.0}
+    assert dict(table.records())['id4'] == {'rms_mean': 4.0}
+    assert len(list(table.records())) == 5
+
+    assert store.compact('voice') == 5
+    table = store.table('voice')
+    assert len(table.segments) == 1
+    assert table.column('rms_mean').tolist() == [1.0, 2.0, 3.0, 4.0, 99.0]
+
+
+def test_writer_refuses_a_different_schema(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    store.writer('voice', COLUMNS).close()
+    with pytest.raises(ValueError):
+        store.writer('voice', ['rms_mean'])
+    with pytest.raises(KeyError):
+        store.table('facial')
+
+
+def test_stored_features_score_like_live_ones(tmp_path):
+    voice = VoiceAnalyzer()
+    facial = FacialAnalyzer()
+    voice_features = {'rms_mean': 0.03, 'zcr_mean': 0.09, 'spectral_centroid_mean': 2500.0,
+                      'spectral_centroid_std': 650.0, 'tempo': np.array([123.0])}
+    frames = [{'face_width': 120, 'face_height': 110, 'eye_count': 2, 'eye_symmetry': 3, 'mean_brightness': 150},
+              {'face_width': 100, 'face_height': 100, 'eye_count': 1, 'mean_brightness': 142}]
+    facial_features = facial.aggregate_features(frames)
+
+    store = FeatureStore(str(tmp_path))
+    with store.writer('voice', ['rms_mean', 'zcr_mean', 'spectral_centroid_mean', 'spectral_centroid_std', 'tempo']) as writer:
+        writer.add('v', voice_features)
+    with store.writer('facial', FACIAL_FEATURE_NAMES) as writer:
+        writer.add('f', facial_features)
+
+    assert voice.score_features(store.table('voice').row('v')) == voice.score_features(voice_features)
+    assert facial.score_features(store.table('facial').row('f')) == facial.score_features(facial_features)
+    assert facial.score_features(facial_features)['primary_emotion'] == facial.analyze_emotion_simple(frames)['emotion']
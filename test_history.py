@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-user history store, its write-behind queue and trend endpoints
+"""
+
+import random
+import sqlite3
+import threading
+from datetime import date
+
+import pytest
+
+from utils.history import HistoryStore, HistoryWriter, HistoryTokens, summarize
+
+
+def record(user_id, session_id, modality, day, emotion=None, emotion_score=None, sentiment_score=None):
+    return {
+        'user_id': user_id, 'session_id': session_id, 'modality': modality, 'recorded_at': 0.0, 'day': day,
+        'emotion': emotion, 'emotion_score': emotion_score, 'sentiment_score': sentiment_score, 'result': '{}'
+    }
+
+
+def test_aggregates_match_raw_rows_after_replacements(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    rng = random.Random(3)
+    for _ in range(20):
+        # Reused session ids replace earlier results, possibly on another day
+        store.write([
+            record(rng.choice('ab'), f's{rng.randrange(15)}', rng.choice(('text', 'voice')),
+                   f'2026-10-0{rng.randrange(1, 4)}', rng.choice(('sad', 'calm', None)),
+                   rng.choice((None, rng.uniform(-1, 1))), rng.choice((None, rng.uniform(-1, 1))))
+            for _ in range(rng.randrange(1, 6))
+        ])
+
+    with sqlite3.connect(store.path) as conn:
+        expected = conn.execute(
+            'SELECT user_id, day, modality, COUNT(*), COALESCE(SUM(emotion_score), 0), COUNT(emotion_score), '
+            'COALESCE(SUM(sentiment_score), 0), COUNT(sentiment_score) FROM results GROUP BY 1, 2, 3 ORDER BY 1, 2, 3'
+        ).fetchall()
+        aggregated = conn.execute('SELECT * FROM daily_scores ORDER BY 1, 2, 3').fetchall()
+        expected_emotions = conn.execute(
+            'SELECT user_id, day, modality, emotion, COUNT(*) FROM results WHERE emotion IS NOT NULL '
+            'GROUP BY 1, 2, 3, 4 ORDER BY 1, 2, 3, 4'
+        ).fetchall()
+        emotions = conn.execute('SELECT * FROM daily_emotions ORDER BY 1, 2, 3, 4').fetchall()
+
+    assert [row[:4] for row in aggregated] == [row[:4] for row in expected]
+    for got, want in zip(aggregated, expected):
+        assert got[4:] == pytest.approx(want[4:])
+    assert emotions == expected_emotions
+
+
+def test_trends_and_distributions_read_from_aggregates(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    store.write([
+        record('u', 's1', 'facial', '2026-10-01', 'sad', -0.6),
+        record('u', 's2', 'facial', '2026-10-01', 'sad', -0.2),
+        record('u', 's3', 'facial', '2026-10-03', 'happy', 0.6),
+        record('u', 's3', 'text', '2026-10-03', 'happy', None, 0.5),
+        record('other', 's4', 'facial', '2026-10-03', 'happy', 0.9),
+    ])
+
+    series = store.trends('u', days=3, window=3, today=date(2026, 10, 3))
+    assert set(series) == {'facial', 'text'}
+    facial = series['facial']
+    assert [point['day'] for point in facial] == ['2026-10-01', '2026-10-02', '2026-10-03']
+    assert facial[0]['emotion_score'] == pytest.approx(-0.4)
+    assert facial[1]['results'] == 0 and facial[1]['emotion_score'] is None
+    # Weighted by result count: (-0.6 - 0.2 + 0.6) / 3
+    assert facial[2]['rolling_emotion_score'] == pytest.approx(-0.2 / 3)
+    assert series['text'][2]['rolling_sentiment_score'] == pytest.approx(0.5)
+
+    periods = store.emotion_distribution('u', days=4, window=2, modality='facial', today=date(2026, 10, 3))['facial']
+    assert [(p['start'], p['end']) for p in periods] == [('2026-09-30', '2026-10-01'), ('2026-10-02', '2026-10-03')]
+    assert periods[0]['counts'] == {'sad': 2}
+    assert periods[1]['shares'] == {'happy': 1.0}
+
+
+def test_writer_batches_in_background_and_drops_when_full(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    release = threading.Event()
+    write = store.write
+
+    def slow_write(records, conn=None):
+        release.wait(5)
+        write(records, conn)
+
+    store.write = slow_write
+    writer = HistoryWriter(store, max_pending=3)
+    payload = {'primary_emotion': 'calm', 'overall_sentiment_score': 0.25}
+    # The first record is taken by the blocked thread, three more fill the queue
+    accepted = [writer.record('u', f's{i}', 'text', payload) for i in range(6)]
+    assert not writer.record('bad id!', 's', 'text', payload)
+    release.set()
+    assert writer.flush()
+    writer.close()
+
+    stats = writer.stats()
+    assert accepted.count(True) == stats['written'] and stats['dropped'] == 6 - stats['written']
+    assert stats['batches'] < stats['written']
+    assert store.recent('u')[0]['result'] == payload
+
+
+def test_summaries_per_modality():
+    voice = {'overall_analysis': {'dominant_emotion': 'calm'},
+             'question_analyses': {'0': {'emotion_score': 0.2}, '1': {'error': 'x'}, '2': {'emotion_score': 0.4}}}
+    assert summarize('voice', voice) == ('calm', pytest.approx(0.3), None)
+    combined = {'overall_mood': 'Positive', 'individual_analyses': {
+        'text': {'overall_sentiment_score': 0.8}, 'voice': None, 'facial': {'overall_analysis': {'emotion_score': 0.4}}}}
+    assert summarize('combined', combined) == ('Positive', pytest.approx(0.6), 0.8)
+
+
+def history_client(tmp_path, monkeypatch):
+    import app as app_module
+
+    store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    writer = HistoryWriter(store)
+    monkeypatch.setattr(app_module, 'history_store', store)
+    monkeypatch.setattr(app_module, 'history_writer', writer)
+    monkeypatch.setattr(app_module, 'history_tokens', HistoryTokens('test-secret'))
+    return app_module.app.test_client(), writer
+
+
+def test_endpoints_record_and_report_history(tmp_path, monkeypatch):
+    client, writer = history_client(tmp_path, monkeypatch)
+    issued = client.post('/history/token').get_json()
+    user_id, headers = issued['user_id'], {'X-History-Token': issued['token']}
+
+    response = client.post('/analyze_text', json={'responses': ['I feel great today']}, headers=headers)
+    session_id = response.get_json()['session_id']
+    client.post('/combined_analysis', json={'session_id': session_id}, headers=headers)
+    assert writer.flush()
+
+    results = client.get(f'/history/{user_id}', headers=headers).get_json()['results']
+    assert [r['modality'] for r in results] == ['combined', 'text']
+    assert 'individual_analyses' not in results[0]['result']
+
+    trends = client.get(f'/history/{user_id}/trends?days=7&window=3', headers=headers).get_json()
+    assert trends['series']['text'][-1]['results'] == 1
+    emotions = client.get(f'/history/{user_id}/emotions?days=7&window=7&modality=text', headers=headers).get_json()
+    assert emotions['periods']['text'][0]['results'] == 1
+
+    assert client.get(f'/history/{user_id}/trends?window=40', headers=headers).status_code == 400
+    assert client.get('/history/bad%20id', headers=headers).status_code == 400
+    writer.close()
+
+
+def test_history_is_bound_to_the_issued_token(tmp_path, monkeypatch):
+    client, writer = history_client(tmp_path, monkeypatch)
+    victim = client.post('/history/token').get_json()
+    # The test client keeps the issued cookie; it identifies the victim from here on
+    client.post('/analyze_text', json={'responses': ['I feel low']})
+    assert writer.flush()
+    assert len(client.get(f"/history/{victim['user_id']}").get_json()['results']) == 1
+
+    client.delete_cookie('history_token')
+    attacker = client.post('/history/token').get_json()
+    attacker_headers = {'X-History-Token': attacker['token']}
+    for path in ('', '/trends', '/emotions'):
+        assert client.get(f"/history/{victim['user_id']}{path}", headers=attacker_headers).status_code == 403
+    client.delete_cookie('history_token')
+    assert client.get(f"/history/{victim['user_id']}").status_code == 403
+    forged = {'X-History-Token': victim['user_id'] + '.forged'}
+    assert client.get(f"/history/{victim['user_id']}", headers=forged).status_code == 403
+
+    # A chosen id in the old header or body field is ignored, not recorded
+    client.post('/analyze_text', json={'responses': ['x'], 'user_id': victim['user_id']},
+                headers={'X-User-Id': victim['user_id']})
+    assert writer.flush()
+    victim_headers = {'X-History-Token': victim['token']}
+    assert len(client.get(f"/history/{victim['user_id']}", headers=victim_headers).get_json()['results']) == 1
+    writer.close()
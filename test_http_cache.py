@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory caches behind the page, static assets and questions
+"""
+
+import gzip
+import json
+import os
+import re
+
+from utils.http_cache import CachedBody, WatchedFile
+
+
+def test_body_negotiates_encoding_with_a_distinct_etag_each():
+    body = CachedBody(b'console.log("hello");\n' * 100, 'application/javascript')
+    assert gzip.decompress(body.variants['gzip']) == body.variants['identity']
+
+    encoding, data, etag = body.negotiate(lambda name: 1 if name == 'gzip' else 0)
+    assert (encoding, data) == ('gzip', body.variants['gzip'])
+    assert body.negotiate(lambda name: 0) == ('identity', body.variants['identity'], body.digest)
+    assert etag != body.digest
+
+    # Tiny and binary bodies are never compressed
+    assert list(CachedBody(b'{}', 'application/json').variants) == ['identity']
+    assert list(CachedBody(os.urandom(4096), 'image/png').variants) == ['identity']
+
+
+def test_watched_file_reloads_on_change_and_keeps_value_on_bad_file(tmp_path):
+    path = tmp_path / 'questions.json'
+    watched = WatchedFile(str(path), lambda data, mtime: json.loads(data), check_interval=0)
+    assert watched.get() is None
+
+    path.write_text('{"questions": ["a"]}')
+    first = watched.get()
+    assert first == {'questions': ['a']} and watched.get() is first and watched.reloads == 1
+
+    path.write_text('{"questions": ["a", "b"]}')
+    assert watched.get() == {'questions': ['a', 'b']}
+
+    path.write_text('{"questions": [')
+    assert watched.get() == {'questions': ['a', 'b']} and watched.last_error
+
+    path.unlink()
+    assert watched.get() is None
+
+
+def test_page_assets_and_questions_are_revalidated_or_cached_for_good(tmp_path, monkeypatch):
+    import app as app_module
+
+    client = app_module.app.test_client()
+    gzip_only = {'Accept-Encoding': 'gzip'}
+
+    page = client.get('/', headers=gzip_only)
+    assert page.headers['Content-Encoding'] == 'gzip' and page.headers['Cache-Control'] == 'no-cache'
+    assert client.get('/', headers={**gzip_only, 'If-None-Match': page.headers['ETag']}).status_code == 304
+
+    script = re.search(r'src="(/static/js/app\.js\?v=\w+)"', gzip.decompress(page.data).decode()).group(1)
+    fingerprinted = client.get(script, headers=gzip_only)
+    assert 'immutable' in fingerprinted.headers['Cache-Control']
+    plain = client.get('/static/js/app.js')
+    assert plain.headers['Cache-Control'] == 'no-cache' and 'Content-Encoding' not in plain.headers
+    assert gzip.decompress(fingerprinted.data) == plain.data
+    assert client.get('/static/js/app.js', headers={'If-Modified-Since': plain.headers['Last-Modified']}).status_code == 304
+    assert client.get('/static/../app.py').status_code == 404
+
+    path = tmp_path / 'questions.json'
+    monkeypatch.setattr(app_module, 'questions_file', WatchedFile(str(path), app_module.load_questions, check_interval=0))
+    assert len(client.get('/get_questions').get_json()['questions']) == 5
+
+    path.write_text(json.dumps({'questions': ['one', 'two', 'three', 'four', 'five']}))
+    first = client.get('/get_questions')
+    assert first.get_json()['questions'][0] == 'one'
+    assert client.get('/get_questions', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    path.write_text(json.dumps({'questions': ['uno', 'dos', 'tres', 'cuatro', 'cinco']}))
+    assert client.get('/get_questions', headers={'If-None-Match': first.headers['ETag']}).get_json()['questions'][0] == 'uno'
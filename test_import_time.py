@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Import-time budget for app.py startup
+
+Run with `python -m pytest -s test_import_time.py` to see the per-module report.
+"""
+
+import os
+import subprocess
+import sys
+
+# Libraries that must only load on first use of their modality
+HEAVY_MODULES = ('librosa', 'numba', 'cv2', 'sklearn', 'scipy', 'nltk', 'textblob')
+
+# Cumulative import time allowed for `import app`, in seconds
+IMPORT_BUDGET_SECONDS = 1.0
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_imports(module):
+    """Import module in a fresh interpreter and return {name: (self_us, cumulative_us)}"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings.setdefault(name.strip(), (int(self_us), int(cumulative_us)))
+    return timings
+
+
+def report(timings, top=15):
+    """Print the most expensive modules by self time"""
+    print(f"\n{'module':<50}{'self ms':>10}{'cumul ms':>10}")
+    for name, (self_us, cumulative_us) in sorted(timings.items(), key=lambda x: -x[1][0])[:top]:
+        print(f"{name:<50}{self_us / 1000:>10.1f}{cumulative_us / 1000:>10.1f}")
+
+
+def test_app_import_defers_heavy_modules():
+    timings = measure_imports('app')
+    loaded = [name for name in HEAVY_MODULES if name in timings]
+    assert not loaded, f"Imported at startup: {', '.join(loaded)}"
+
+
+def test_app_import_within_budget():
+    timings = measure_imports('app')
+    report(timings)
+
+    cumulative_seconds = timings['app'][1] / 1e6
+    assert cumulative_seconds < IMPORT_BUDGET_SECONDS, \
+        f"import app took {cumulative_seconds:.2f}s (budget {IMPORT_BUDGET_SECONDS:.2f}s)"
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Tests for the background job queue and its stores
+"""
+
+import io
+import json
+import threading
+import time
+
+import pytest
+
+import app as app_module
+from utils.jobs import JobQueue, InMemoryJobStore, SQLiteJobStore, QueueFullError, FINISHED_STATUSES
+
+
+def wait_for(queue, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in FINISHED_STATUSES:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def sse_messages(response):
+    """Each Server-Sent Events message of a response as a dict of its fields"""
+    blocks = response.get_data(as_text=True).strip().split('\n\n')
+    return [dict(line.split(': ', 1) for line in block.split('\n')) for block in blocks]
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteJobStore(str(tmp_path / 'jobs.sqlite3'))
+    return InMemoryJobStore()
+
+
+def test_job_runs_and_records_result(store):
+    queue = JobQueue(store, max_workers=1)
+    cleaned = []
+    job_id = queue.submit('demo', lambda paths: {'count': len(paths)}, {'0': 'a', '1': 'b'},
+                          on_finish=lambda: cleaned.append(True))
+
+    job = wait_for(queue, job_id)
+    assert job['status'] == 'done'
+    assert job['result'] == {'count': 2}
+    assert cleaned == [True]
+    queue.shutdown()
+
+
+def test_failed_job_records_error(store):
+    queue = JobQueue(store, max_workers=1)
+    job_id = queue.submit('demo', lambda: 1 / 0)
+
+    job = wait_for(queue, job_id)
+    assert job['status'] == 'failed'
+    assert 'division' in job['error']
+    queue.shutdown()
+
+
+def test_full_queue_rejects_jobs():
+    queue = JobQueue(InMemoryJobStore(), max_workers=1, max_pending=1)
+    release = threading.Event()
+    job_id = queue.submit('slow', release.wait)
+
+    with pytest.raises(QueueFullError):
+        queue.submit('slow', release.wait)
+    assert queue.stats()['rejected'] == 1
+
+    release.set()
+    wait_for(queue, job_id)
+    assert queue.stats()['pending'] == 0
+    queue.submit('fast', lambda: None)
+    queue.shutdown()
+
+
+def test_job_endpoints_poll_and_stream_results(monkeypatch):
+    def slow_voice(paths):
+        time.sleep(0.3)
+        return {'success': True, 'question_analyses': {index: {} for index in paths}}
+
+    monkeypatch.setattr(app_module.pipeline, 'analyze_voice_files', slow_voice)
+    client = app_module.app.test_client()
+
+    submitted = client.post('/jobs/analyze_voice', data={'audio_0': (io.BytesIO(b'RIFF'), 'a.wav')},
+                            content_type='multipart/form-data')
+    assert submitted.status_code == 202
+    job_id = submitted.get_json()['job_id']
+
+    # The event stream stays open until the job finishes and ends with its result
+    events = client.get(f'/jobs/{job_id}/events')
+    assert events.mimetype == 'text/event-stream'
+    messages = sse_messages(events)
+    assert messages[0] == {'retry': '1000'}
+    assert messages[-1]['event'] == messages[-1]['id'] == 'done'
+    done = json.loads(messages[-1]['data'])
+    assert done['result']['question_analyses'] == {'0': {}}
+    assert done['result']['session_id'] == submitted.get_json()['session_id']
+
+    job = client.get(f'/jobs/{job_id}').get_json()
+    assert job['status'] == 'done' and job['result'] == done['result']
+
+
+def test_job_endpoints_reject_unknown_jobs_and_empty_uploads():
+    client = app_module.app.test_client()
+    assert client.get('/jobs/missing').status_code == 404
+    assert client.get('/jobs/missing/events').status_code == 404
+    assert client.post('/jobs/analyze_facial', data={}, content_type='multipart/form-data').status_code == 400
+
+
+def test_job_fails_when_its_session_expires_before_the_result_is_stored(monkeypatch):
+    monkeypatch.setattr(app_module.pipeline, 'analyze_voice_files',
+                        lambda paths: {'success': True, 'question_analyses': {}})
+    monkeypatch.setattr(app_module.session_store, 'put', lambda *args: False)
+    client = app_module.app.test_client()
+
+    submitted = client.post('/jobs/analyze_voice', data={'audio_0': (io.BytesIO(b'RIFF'), 'a.wav')},
+                            content_type='multipart/form-data')
+    job = wait_for(app_module.job_queue, submitted.get_json()['job_id'])
+    assert job['status'] == 'failed' and job['error'] == 'Unknown or expired session'
+
+
+def test_event_streams_end_after_their_lifetime_and_are_limited(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(app_module.pipeline, 'analyze_voice_files', lambda paths: release.wait(5) and {})
+    monkeypatch.setattr(app_module, 'event_stream_seconds', 0.3)
+    client = app_module.app.test_client()
+    job_id = client.post('/jobs/analyze_voice', data={'audio_0': (io.BytesIO(b'RIFF'), 'a.wav')},
+                         content_type='multipart/form-data').get_json()['job_id']
+    try:
+        wait_until = time.time() + 5
+        while app_module.job_queue.get(job_id)['status'] != 'running' and time.time() < wait_until:
+            time.sleep(0.01)
+
+        # The stream closes while the job still runs; the client reconnects with the last status
+        first = sse_messages(client.get(f'/jobs/{job_id}/events'))
+        assert [message.get('event') for message in first] == [None, 'running']
+        again = sse_messages(client.get(f'/jobs/{job_id}/events', headers={'Last-Event-ID': 'running'}))
+        assert again == [{'retry': '1000'}]
+
+        # Every slot taken: new streams get 503 until one closes
+        streams = app_module.event_streams
+        for _ in range(streams.max_concurrent):
+            streams.acquire()
+        try:
+            busy = client.get(f'/jobs/{job_id}/events')
+            assert busy.status_code == 503 and busy.headers['Retry-After']
+        finally:
+            for _ in range(streams.max_concurrent):
+                streams.release()
+        assert streams.stats()['active'] == 0
+    finally:
+        release.set()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for the load-adaptive quality controller
+"""
+
+import time
+
+import pytest
+
+from utils.load_control import LoadController
+
+
+def test_degrades_immediately_under_pressure():
+    pressure = {'value': 0.0}
+    controller = LoadController(pressure=lambda: pressure['value'], hold_seconds=60)
+    assert controller.level() == 'full'
+
+    pressure['value'] = 0.7
+    assert controller.level() == 'reduced'
+    pressure['value'] = 1.0
+    assert controller.level() == 'minimal'
+
+
+def test_recovers_one_level_at_a_time_after_hold():
+    pressure = {'value': 1.0}
+    controller = LoadController(pressure=lambda: pressure['value'], hold_seconds=0.05)
+    assert controller.level() == 'minimal'
+
+    pressure['value'] = 0.0
+    # Still inside the hold window
+    assert controller.level() == 'minimal'
+    time.sleep(0.06)
+    assert controller.level() == 'reduced'
+    time.sleep(0.06)
+    assert controller.level() == 'full'
+
+
+def test_hysteresis_keeps_level_near_threshold():
+    pressure = {'value': 0.65}
+    controller = LoadController(pressure=lambda: pressure['value'], hold_seconds=0)
+    assert controller.level() == 'reduced'
+
+    # Below the threshold but inside the hysteresis margin
+    pressure['value'] = 0.5
+    assert controller.level() == 'reduced'
+    pressure['value'] = 0.3
+    assert controller.level() == 'full'
+
+
+def test_slow_analyses_degrade_quality():
+    controller = LoadController(latency_budget=2.0, hold_seconds=60)
+    for _ in range(10):
+        controller.observe(1.9)
+    assert controller.level() == 'minimal'
+    assert controller.stats()['latency_p90'] == pytest.approx(1.9)
+
+
+def test_forced_level_ignores_load():
+    controller = LoadController(pressure=lambda: 1.0, forced_level='full')
+    assert controller.level() == 'full'
+    with pytest.raises(ValueError):
+        LoadController(forced_level='best')
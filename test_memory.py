@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for per-stage allocation tracking
+"""
+
+import threading
+import tracemalloc
+
+import pytest
+
+from utils import memory
+from utils.metrics import STAGE_PEAK_BYTES, stage_timer
+from benchmarks.soak import growth_per_thousand
+
+
+@pytest.fixture
+def tracing():
+    already = tracemalloc.is_tracing()
+    memory.start_tracking()
+    yield
+    if not already:
+        tracemalloc.stop()
+
+
+def test_nested_stage_peaks_include_inner_stages(tracing):
+    outer = memory.begin_stage()
+    inner = memory.begin_stage()
+    block = bytearray(4 * 1024 * 1024)
+    del block
+    inner_peak = memory.end_stage(inner)
+    outer_peak = memory.end_stage(outer)
+
+    assert inner_peak >= 4 * 1024 * 1024
+    # The inner stage reset tracemalloc's peak, but the outer one still sees it
+    assert outer_peak >= inner_peak
+
+
+def test_stage_timer_reports_into_the_request_collector(tracing):
+    collector = memory.MemoryCollector()
+    token = memory.collect(collector)
+    try:
+        before = STAGE_PEAK_BYTES.count(stage='test.alloc')
+        with stage_timer('test.alloc'):
+            block = bytearray(1024 * 1024)
+            del block
+    finally:
+        memory.stop_collecting(token)
+
+    assert collector.stages['test.alloc'] >= 1024 * 1024
+    assert STAGE_PEAK_BYTES.count(stage='test.alloc') == before + 1
+    report = collector.report()
+    assert report['tracemalloc'] is True
+    assert report['peak_rss_bytes'] >= (report['rss_bytes'] or 0) > 0
+
+
+def test_stage_timer_skips_memory_when_not_tracing():
+    if tracemalloc.is_tracing():
+        pytest.skip("tracemalloc enabled for the whole run")
+    collector = memory.MemoryCollector()
+    token = memory.collect(collector)
+    try:
+        with stage_timer('test.untraced'):
+            pass
+    finally:
+        memory.stop_collecting(token)
+    assert collector.stages == {}
+
+
+def test_collector_is_not_shared_with_unrelated_threads(tracing):
+    collector = memory.MemoryCollector()
+    token = memory.collect(collector)
+    try:
+        thread = threading.Thread(target=lambda: memory.record_stage('other', 1))
+        thread.start()
+        thread.join()
+    finally:
+        memory.stop_collecting(token)
+    assert 'other' not in collector.stages
+
+
+def test_soak_growth_slope_per_thousand_iterations():
+    samples = [{'iteration': i, 'rss_bytes': 1000 + 2 * i} for i in range(0, 500, 100)]
+    assert growth_per_thousand(samples) == pytest.approx(2000)
+    assert growth_per_thousand(samples[:1]) == 0.0
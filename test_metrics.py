@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests for the Prometheus metrics registry
+"""
+
+from utils.metrics import MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('stage_seconds', 'Stage time', ('stage',), buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage='decode')
+    histogram.observe(0.5, stage='decode')
+    histogram.observe(5.0, stage='decode')
+
+    lines = registry.render().splitlines()
+    assert '# TYPE stage_seconds histogram' in lines
+    assert 'stage_seconds_bucket{stage="decode",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="decode",le="1.0"} 2' in lines
+    assert 'stage_seconds_bucket{stage="decode",le="+Inf"} 3' in lines
+    assert 'stage_seconds_sum{stage="decode"} 5.55' in lines
+    assert 'stage_seconds_count{stage="decode"} 3' in lines
+
+
+def test_histogram_timer_records_on_error():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('stage_seconds', 'Stage time', ('stage',))
+    try:
+        with histogram.time(stage='detect'):
+            raise RuntimeError('boom')
+    except RuntimeError:
+        pass
+    assert histogram.count(stage='detect') == 1
+
+
+def test_counters_and_gauges_render_with_escaped_labels():
+    registry = MetricsRegistry()
+    counter = registry.counter('requests_total', 'Requests', ('endpoint', 'outcome'))
+    counter.inc(endpoint='analyze_voice', outcome='success')
+    counter.inc(2, endpoint='analyze_voice', outcome='success')
+    registry.gauge('queue_depth', 'Waiting requests', ('name',), lambda: {('say "hi"',): 4})
+
+    text = registry.render()
+    assert 'requests_total{endpoint="analyze_voice",outcome="success"} 3' in text
+    assert '# TYPE queue_depth gauge' in text
+    assert 'queue_depth{name="say \\"hi\\""} 4' in text
+
+
+def test_registering_a_name_twice_returns_the_same_metric():
+    registry = MetricsRegistry()
+    first = registry.counter('requests_total', 'Requests')
+    assert registry.counter('requests_total', 'Requests') is first
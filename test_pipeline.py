@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests for combining per-modality results into the overall assessment
+"""
+
+from analysis.pipeline import AnalysisPipeline
+from analysis.voice_analysis import VoiceAnalyzer
+
+
+def sad_answer():
+    return {'primary_emotion': 'sad', 'confidence': 0.6, 'emotion_score': -0.42,
+            'vocal_characteristics': {'energy_level': 'low'}, 'recommendations': []}
+
+
+def test_voice_only_session_scores_from_its_answers():
+    pipeline = AnalysisPipeline(None, VoiceAnalyzer(), None, max_workers=1)
+    voice = pipeline.aggregate_voice({0: sad_answer(), 1: sad_answer()})
+    assert voice['overall_analysis']['emotion_score'] == -0.42
+
+    combined = pipeline.combine_session_results({'voice': voice})
+    assert combined['overall_mood'] == 'Negative'
+    assert combined['confidence'] == 0.3
+
+    # Payloads stored before overall_analysis carried emotion_score are scored the same way
+    del voice['overall_analysis']['emotion_score']
+    assert pipeline.combine_session_results({'voice': voice})['overall_mood'] == 'Negative'
+
+
+def test_combined_endpoint_uses_stored_voice_scores():
+    import app as app_module
+
+    client = app_module.app.test_client()
+    session_id = app_module.session_store.create_session()
+    voice = app_module.pipeline.aggregate_voice({0: sad_answer(), 1: sad_answer()})
+    app_module.session_store.put(session_id, 'voice', voice)
+
+    response = client.post('/combined_analysis', json={'session_id': session_id}).get_json()
+    assert response['analysis']['overall_mood'] == 'Negative'
+
+
+def test_combined_endpoint_requires_a_session_id(monkeypatch):
+    import app as app_module
+
+    client = app_module.app.test_client()
+    assert client.post('/combined_analysis', data='not json', content_type='text/plain').status_code == 400
+    assert client.post('/combined_analysis', json=['session']).status_code == 400
+
+    # The legacy body is refused unless explicitly re-enabled
+    tampered = {'voice_analysis': {'emotion_score': 1.0}}
+    assert client.post('/combined_analysis', json=tampered).status_code == 400
+    monkeypatch.setattr(app_module, 'legacy_combined_analysis', True)
+    assert client.post('/combined_analysis', json=tampered).get_json()['analysis']['overall_mood'] == 'Positive'
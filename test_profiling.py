@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for the opt-in request profiling middleware
+"""
+
+import os
+import time
+
+from flask import Flask
+
+from utils.profiling import ProfilingMiddleware
+
+
+def busy_work(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+
+def make_client(tmp_path):
+    app = Flask(__name__)
+
+    @app.route('/work')
+    def work():
+        busy_work(0.1)
+        return {'done': True}
+
+    app.wsgi_app = ProfilingMiddleware(app.wsgi_app, token='secret', output_dir=str(tmp_path))
+    return app.test_client()
+
+
+def test_requests_without_flag_are_not_profiled(tmp_path):
+    client = make_client(tmp_path)
+    response = client.get('/work')
+    assert response.get_json() == {'done': True}
+    assert 'X-Profile-Id' not in response.headers
+    assert os.listdir(tmp_path) == []
+
+
+def test_wrong_token_is_rejected(tmp_path):
+    client = make_client(tmp_path)
+    response = client.get('/work?profile=1', headers={'X-Profile-Token': 'guess'})
+    assert response.status_code == 403
+    # The token is only accepted as a header, never from the logged query string
+    assert client.get('/work?profile=1&profile_token=secret').status_code == 403
+    assert os.listdir(tmp_path) == []
+
+
+def test_sampling_writes_collapsed_stacks_and_table(tmp_path):
+    client = make_client(tmp_path)
+    response = client.get('/work', headers={'X-Profile': 'sample', 'X-Profile-Token': 'secret'})
+    assert response.get_json() == {'done': True}
+
+    profile_id = response.headers['X-Profile-Id']
+    folded = (tmp_path / f'{profile_id}.folded').read_text()
+    assert 'busy_work' in folded
+    assert folded.splitlines()[0].rsplit(' ', 1)[1].isdigit()
+    table = (tmp_path / f'{profile_id}.txt').read_text().splitlines()
+    # The busy loop's own frames lead the table, not the WSGI frames around it
+    assert any('busy_work' in line for line in table[3:6])
+
+
+def test_cprofile_writes_stats_and_table(tmp_path):
+    client = make_client(tmp_path)
+    response = client.get('/work?profile=cprofile', headers={'X-Profile-Token': 'secret'})
+    profile_id = response.headers['X-Profile-Id']
+    assert (tmp_path / f'{profile_id}.prof').exists()
+    table = (tmp_path / f'{profile_id}.txt').read_text()
+    rows = table.split('(function)', 1)[1].splitlines()[1:4]
+    assert any('busy_work' in row for row in rows)
+
+
+def test_unknown_mode_is_rejected(tmp_path):
+    client = make_client(tmp_path)
+    response = client.get('/work?profile=perf', headers={'X-Profile-Token': 'secret'})
+    assert response.status_code == 400
+
+    # The echoed mode is escaped, so the body stays valid JSON
+    response = client.get('/work', headers={'X-Profile': 'x"}\\', 'X-Profile-Token': 'secret'})
+    assert response.get_json() == {'error': 'Unknown profile mode: x"}\\'}
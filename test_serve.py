@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Tests for the preforking production launcher
+"""
+
+import threading
+
+import requests
+
+from serve import PooledWSGIServer, admission_defaults, listen
+from utils.memory import smaps_rollup
+
+
+def hello_app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [threading.current_thread().name.encode()]
+
+
+def test_pooled_server_serves_from_an_inherited_socket():
+    sock = listen('127.0.0.1', 0)
+    port = sock.getsockname()[1]
+    server = PooledWSGIServer('127.0.0.1', port, hello_app, threads=2, fd=sock.fileno())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        response = requests.get(f'http://127.0.0.1:{port}/', timeout=10)
+        assert response.status_code == 200
+        # Handled on the bounded pool, not the accepting thread
+        assert response.text.startswith('request')
+    finally:
+        server.shutdown()
+        thread.join(timeout=10)
+        server.drain()
+        sock.close()
+
+
+def test_admission_defaults_split_the_cpus_between_workers():
+    # One worker per CPU: one analysis at a time each, the other threads queue
+    assert admission_defaults(workers=8, threads=8, cpus=8) == (1, 7, 2)
+    assert admission_defaults(workers=2, threads=8, cpus=8) == (4, 4, 2)
+    # Never more running or waiting than the worker has request threads
+    assert admission_defaults(workers=1, threads=4, cpus=16) == (4, 0, 1)
+
+
+def test_smaps_rollup_splits_shared_and_private_memory():
+    usage = smaps_rollup()
+    if usage is None:
+        return  # no /proc/<pid>/smaps_rollup on this platform
+    assert usage['rss'] > 0
+    assert usage['private'] <= usage['rss']
+    assert smaps_rollup(2 ** 22 + 1) is None
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for the server-side session result store
+"""
+
+import time
+
+import pytest
+
+from utils.session_store import SessionStore, SQLiteSessionStore
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_store(request, tmp_path):
+    def factory(ttl_seconds=3600):
+        if request.param == 'sqlite':
+            return SQLiteSessionStore(str(tmp_path / 'sessions.sqlite3'), ttl_seconds=ttl_seconds)
+        return SessionStore(ttl_seconds=ttl_seconds)
+    return factory
+
+
+def test_results_are_stored_per_modality(make_store):
+    store = make_store()
+    session_id = store.create_session()
+
+    assert store.put(session_id, 'text', {'overall_sentiment_score': 0.5})
+    assert store.put(session_id, 'voice', {'overall_analysis': {'overall_mood': 'calm'}})
+    assert store.get(session_id) == {
+        'text': {'overall_sentiment_score': 0.5},
+        'voice': {'overall_analysis': {'overall_mood': 'calm'}}
+    }
+
+
+def test_unknown_sessions_are_rejected(make_store):
+    store = make_store()
+    assert not store.exists('forged')
+    assert not store.put('forged', 'text', {})
+    assert store.get('forged') is None
+
+
+def test_sessions_expire_after_ttl(make_store):
+    store = make_store(ttl_seconds=0.05)
+    session_id = store.create_session()
+    time.sleep(0.1)
+
+    assert store.get(session_id) is None
+    assert not store.put(session_id, 'text', {})
+
+
+def test_memory_store_is_bounded():
+    store = SessionStore(max_sessions=3)
+    ids = [store.create_session() for _ in range(5)]
+    assert [store.exists(s) for s in ids] == [False, False, True, True, True]
+
+
+def test_memory_store_evicts_least_recently_updated():
+    store = SessionStore(max_sessions=3)
+    first, second, third = (store.create_session() for _ in range(3))
+    # Writing to the oldest session makes the second one least recently updated
+    store.put(first, 'text', {})
+    fourth = store.create_session()
+    assert [store.exists(s) for s in (first, second, third, fourth)] == [True, False, True, True]
+
+
+def test_answers_are_stored_per_question(make_store):
+    store = make_store()
+    session_id = store.create_session()
+
+    assert store.get_answers(session_id, 'voice') == {}
+    assert store.put_answer(session_id, 'voice', '0', {'primary_emotion': 'calm'})
+    assert store.put_answer(session_id, 'voice', '1', {'primary_emotion': 'tense'})
+    assert store.put_answer(session_id, 'voice', '0', {'primary_emotion': 'happy'})
+    assert store.put_answer(session_id, 'facial', '0', {'primary_emotion': 'neutral'})
+
+    answers = store.get_answers(session_id, 'voice')
+    assert answers == {'0': {'primary_emotion': 'happy'}, '1': {'primary_emotion': 'tense'}}
+    assert store.get_answers(session_id, 'facial') == {'0': {'primary_emotion': 'neutral'}}
+    # Per-question answers are kept apart from the aggregated modality results
+    assert store.get(session_id) == {}
+
+
+def test_answers_need_a_live_session(make_store):
+    store = make_store()
+    assert not store.put_answer('forged', 'voice', '0', {})
+    assert store.get_answers('forged', 'voice') is None
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for NDJSON parsing and the streaming bulk text endpoint
+"""
+
+import io
+import json
+
+import pytest
+
+import app as app_module
+from utils.streaming import iter_ndjson, MAX_NDJSON_LINE_BYTES
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+def stream_lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_iter_ndjson_reports_bad_lines_and_continues():
+    """Malformed or oversized records are reported without stopping the stream"""
+    body = b'{"id": 1, "text": "fine"}\n\nnot json\n' + b'{"text": "' + b'x' * 200 + b'"}\n{"id": 4}\n'
+    items = list(iter_ndjson(io.BytesIO(body), max_line_bytes=100))
+
+    assert items[0] == {'line': 1, 'record': {'id': 1, 'text': 'fine'}}
+    assert 'Invalid JSON' in items[1]['error']
+    assert 'exceeds' in items[2]['error']
+    assert items[3] == {'line': 5, 'record': {'id': 4}}
+
+
+def test_stream_endpoint_analyzes_each_record_and_reports_bad_ones(client):
+    oversized = json.dumps({'id': 'big', 'text': 'x' * MAX_NDJSON_LINE_BYTES})
+    body = '\n'.join([
+        json.dumps({'id': 'a', 'text': 'I had a wonderful day'}),
+        'not json',
+        oversized,
+        json.dumps(['not', 'an', 'object']),
+        json.dumps({'id': 'empty'}),
+        json.dumps({'id': 'b', 'responses': ['Tired', 'Worried about work']}),
+    ]) + '\n'
+    response = client.post('/analyze_text_stream?outputs=sentiment', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+
+    results = stream_lines(response)
+    assert [r.get('id') for r in results] == ['a', None, None, 4, 'empty', 'b']
+    assert results[0]['success'] and 'overall_sentiment_score' in results[0]['analysis']
+    assert 'Invalid JSON' in results[1]['error'] and results[1]['line'] == 2
+    assert 'exceeds' in results[2]['error'] and results[2]['line'] == 3
+    assert results[3]['error'] == 'Record must be a JSON object'
+    assert results[4]['error'] == 'No text responses provided'
+    assert results[5]['success'] and results[5]['analysis']['response_count'] == 2
+
+
+def test_stream_endpoint_rejects_unknown_outputs(client):
+    response = client.post('/analyze_text_stream?outputs=sentiment,sarcasm', data='{"text": "hi"}\n')
+    assert response.status_code == 400
+    assert 'sarcasm' in response.get_json()['error']
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the text analysis pipeline
+"""
+
+import pytest
+
+from analysis.text_analysis import TextAnalyzer
+
+
+@pytest.fixture(scope='module')
+def analyzer():
+    return TextAnalyzer()
+
+
+def test_detect_emotions_respects_word_boundaries(analyzer):
+    """Keywords must not match inside longer words"""
+    assert analyzer.detect_emotions("I made a download of the report") == {}
+    assert analyzer.detect_emotions("I am mad and feeling down") == {'angry': 1, 'sad': 1}
+
+
+def test_detect_emotions_matches_phrases(analyzer):
+    """Multi-word keywords match across any whitespace"""
+    assert analyzer.detect_emotions("I feel at   ease today") == {'calm': 1}
+    assert analyzer.detect_emotions("I feel at home") == {}
+
+
+def test_detect_emotions_counts_distinct_keywords(analyzer):
+    """Repeated keywords count once, distinct keywords add up"""
+    emotions = analyzer.detect_emotions("Tired, so tired and exhausted. Happy though!")
+    assert emotions == {'tired': 2, 'happy': 1}
+
+
+def test_emotion_matcher_scales_to_large_lexicons():
+    """A lexicon with thousands of terms still compiles and matches"""
+    analyzer = TextAnalyzer()
+    analyzer.emotion_keywords = {
+        'calm': [f"term{i}" for i in range(5000)] + ['at ease'],
+        'sad': ['term12', 'down'],
+    }
+    analyzer.compile_emotion_matcher()
+
+    emotions = analyzer.detect_emotions("term12 term4999 term50000 at ease, down")
+    assert emotions == {'calm': 3, 'sad': 2}
+
+
+def test_analyze_responses_computes_only_requested_outputs(analyzer):
+    """Skipping TextBlob leaves the other outputs unchanged"""
+    responses = ["I feel happy and calm today", "Work was fine"]
+    full = analyzer.analyze_responses(responses)
+    lean = analyzer.analyze_responses(responses, outputs=('mood', 'sentiment', 'emotions'))
+
+    assert 'subjectivity' in full
+    assert 'subjectivity' not in lean
+    assert {k: v for k, v in full.items() if k != 'subjectivity'} == lean
+
+
+def test_analyze_responses_rejects_unknown_outputs(analyzer):
+    with pytest.raises(ValueError):
+        analyzer.analyze_responses(["fine"], outputs=('sentiment', 'sarcasm'))
+
+
+@pytest.mark.parametrize('outputs', [3, 'mood', ['mood', 1], {'mood': True}])
+def test_analyze_text_endpoint_requires_a_list_of_output_names(outputs):
+    import app as app_module
+
+    client = app_module.app.test_client()
+    response = client.post('/analyze_text', json={'responses': ['fine'], 'outputs': outputs})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'outputs must be a list of output names'
+    assert client.post('/analyze_text', json={'responses': ['fine'], 'outputs': ['mood']}).status_code == 200
+
+
+def test_sentiment_scores_are_memoized(analyzer):
+    """Repeated normalized text is scored once"""
+    analyzer.score_cache.clear()
+    first = analyzer.analyze_responses(["Not great"])
+    second = analyzer.analyze_responses(["not   GREAT"])
+
+    assert first == second
+    stats = analyzer.score_cache.stats()
+    assert stats['misses'] == 2  # one VADER, one TextBlob
+    assert stats['hits'] == 2
+
+
+def test_score_cache_keys_do_not_hold_the_text(analyzer):
+    """Memo keys stay small however long the scored text is"""
+    analyzer.score_cache.clear()
+    analyzer.analyze_sentiment_vader('fine ' * 100000)
+    (scorer, digest), = analyzer.score_cache._entries
+    assert scorer == 'vader' and len(digest) == 16
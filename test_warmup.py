@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Tests for the boot-time warm-up pass
+"""
+
+from analysis.warmup import warm_up
+
+
+class FailingVoiceAnalyzer:
+    """Mirrors VoiceAnalyzer.extract_features, which reports failures by returning None"""
+    sample_rate = 8000
+
+    def extract_features(self, audio, quality_level='full'):
+        return None
+
+
+class RecordingVoiceAnalyzer:
+    sample_rate = 8000
+
+    def __init__(self):
+        self.quality_levels = []
+
+    def extract_features(self, audio, quality_level='full'):
+        self.quality_levels.append(quality_level)
+        return {'tempo': 120.0}
+
+
+def test_voice_warm_up_returning_no_features_is_reported_as_failed():
+    report = warm_up(voice_analyzer=FailingVoiceAnalyzer())
+    assert 'no features' in report['stages']['voice.extract_features']['error']
+
+
+def test_voice_warm_up_also_runs_the_lowest_quality_level():
+    analyzer = RecordingVoiceAnalyzer()
+    report = warm_up(voice_analyzer=analyzer)
+    # Degraded quality estimates tempo without beat tracking, which compiles its own kernels
+    assert analyzer.quality_levels == ['full', 'minimal']
+    assert 'error' not in report['stages']['voice.extract_features.minimal']
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Train the voice emotion model offline from labelled recordings
+
+Features come from a feature store filled by batch_analyze.py, so the
+audio is decoded once and training runs in seconds. Labels are the first
+directory of each item id (a data/<label>/<clip>.wav layout) or come from a
+JSONL file of {"id": ..., "label": ...} lines.
+
+Run from the project root:
+    python batch_analyze.py data/ --modality voice --feature-store instance/train-features --output instance/train.jsonl
+    python train_emotion_model.py --feature-store instance/train-features
+    python train_emotion_model.py --feature-store instance/train-features --labels labels.jsonl --output models/voice_emotion.pkl
+
+A stratified holdout (--test-size) is scored against both the model and
+the rule-based classifier; the saved model is then refit on every row.
+The file is replaced atomically, so running servers pick it up on their
+next check (VOICE_EMOTION_MODEL).
+"""
+
+import argparse
+import json
+import sys
+from collections import Counter
+
+import numpy as np
+
+from analysis.emotion_model import DEFAULT_MODEL_PATH, train_model, save_model
+from analysis.batch_classifiers import classify_voice
+from utils.feature_store import FeatureStore
+
+
+def read_labels(path):
+    labels = {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                record = json.loads(line)
+                labels[str(record['id'])] = str(record['label'])
+    return labels
+
+
+def directory_label(item_id):
+    parts = item_id.replace('\\', '/').split('/')
+    return parts[0] if len(parts) > 1 else None
+
+
+def load_training_set(table, labels=None):
+    """Latest feature row and label of every labelled id, as (ids, matrix, labels)"""
+    index = table.index
+    ids, rows, targets = [], [], []
+    for item_id, row in index.items():
+        label = labels.get(item_id) if labels is not None else directory_label(item_id)
+        if label:
+            ids.append(item_id)
+            rows.append(row)
+            targets.append(label)
+    matrix = table.matrix()[np.array(rows, dtype=np.int64)] if rows else np.empty((0, len(table.columns)))
+    return ids, matrix, np.array(targets, dtype=object)
+
+
+def evaluate(train_matrix, train_labels, test_matrix, test_labels, columns, C):
+    """Holdout report for the model trained on the training split and for the rules"""
+    from sklearn.metrics import accuracy_score, classification_report, f1_score
+    from analysis.emotion_model import EmotionModel
+
+    model = EmotionModel(train_model(train_matrix, train_labels, columns, C))
+    predicted = model.classify_batch(test_matrix)['emotion']
+    rules = classify_voice(test_matrix, columns)['emotion']
+
+    print(f"{'classifier':<12}{'accuracy':>10}{'macro F1':>10}")
+    for name, guesses in (('model', predicted), ('rules', rules)):
+        print(f"{name:<12}{accuracy_score(test_labels, guesses):>10.3f}"
+              f"{f1_score(test_labels, guesses, average='macro', zero_division=0):>10.3f}")
+    print()
+    print(classification_report(test_labels, predicted, zero_division=0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the voice emotion model from a labelled feature store")
+    parser.add_argument('--feature-store', required=True, metavar='DIR', help="Feature store with a voice table (batch_analyze.py --feature-store)")
+    parser.add_argument('--labels', help="JSONL of {\"id\", \"label\"}; default: each id's first directory")
+    parser.add_argument('--output', default=DEFAULT_MODEL_PATH, help=f"Model file to write (default {DEFAULT_MODEL_PATH})")
+    parser.add_argument('--C', type=float, default=1.0, help="Inverse regularization strength (default 1.0)")
+    parser.add_argument('--test-size', type=float, default=0.2, help="Holdout fraction for the report; 0 skips it (default 0.2)")
+    parser.add_argument('--seed', type=int, default=0, help="Holdout split seed")
+    args = parser.parse_args(argv)
+
+    try:
+        table = FeatureStore(args.feature_store).table('voice')
+    except KeyError as e:
+        parser.error(str(e))
+    labels = read_labels(args.labels) if args.labels else None
+    ids, matrix, targets = load_training_set(table, labels)
+
+    counts = Counter(targets.tolist())
+    print(f"{len(ids)} labelled recordings: " + ", ".join(f"{label} {count}" for label, count in sorted(counts.items())))
+    if len(counts) < 2:
+        print("Need recordings of at least two labels to train")
+        return 1
+
+    if args.test_size > 0:
+        from sklearn.model_selection import train_test_split
+
+        if min(counts.values()) < 2:
+            print("Every label needs at least two recordings for a stratified holdout; use --test-size 0")
+            return 1
+        train_x, test_x, train_y, test_y = train_test_split(
+            matrix, targets, test_size=args.test_size, random_state=args.seed, stratify=targets
+        )
+        evaluate(train_x, train_y, test_x, test_y, table.columns, args.C)
+
+    save_model(train_model(matrix, targets, table.columns, args.C), args.output)
+    print(f"Model written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+class AdmissionRejected(Exception):
+    """Raised when an endpoint class has no free slot and its wait queue is full or timed out"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """Caps concurrent requests of one endpoint class behind a bounded wait queue.
+
+    Up to max_concurrent requests run at once; up to max_waiting more wait
+    at most wait_timeout seconds for a slot. Anything beyond that is
+    rejected straight away so a burst cannot oversubscribe every core.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_waiting: int = 0,
+                 wait_timeout: float = 30.0, retry_after: int = 5):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_waiting = max(0, max_waiting)
+        self.wait_timeout = wait_timeout
+        self.retry_after = retry_after
+        self._condition = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        # Caller holds the condition
+        self.rejected += 1
+        return AdmissionRejected(f"Server busy: {self.name} {reason}", self.retry_after)
+
+    def acquire(self) -> None:
+        """Take a slot, waiting in the queue if needed; raises AdmissionRejected"""
+        with self._condition:
+            if self._active < self.max_concurrent and self._waiting == 0:
+                self._active += 1
+                self.admitted += 1
+                return
+            if self._waiting >= self.max_waiting:
+                raise self._reject("queue is full")
+
+            self._waiting += 1
+            deadline = time.monotonic() + self.wait_timeout
+            try:
+                while self._active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        raise self._reject("queue wait timed out")
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._active += 1
+            self.admitted += 1
+
+    def release(self) -> None:
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_waiting': self.max_waiting,
+                'active': self._active,
+                'waiting': self._waiting,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out
+            }
@@ -0,0 +1,205 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+def to_float(value: Any) -> float:
+    """One feature value as a float: librosa's one-element arrays are unwrapped, missing values become NaN"""
+    if value is None:
+        return float('nan')
+    return float(np.asarray(value, dtype=np.float64).reshape(-1)[0])
+
+class FeatureTable:
+    """Read side of one table: memory-mapped columns across segments plus an id index.
+
+    Columns are float64 so stored rows classify exactly like the live
+    features they came from; absent features are NaN. A table written as
+    one segment (see FeatureStore.compact) is read without copying.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, 'schema.json')) as f:
+            self.columns = json.load(f)['columns']
+        self.segments = sorted(name for name in os.listdir(path) if name.startswith('segment-'))
+        self._index = None
+
+    def _load(self, segment: str, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, segment, name + '.npy'), mmap_mode='r')
+
+    def _concat(self, name: str) -> np.ndarray:
+        parts = [self._load(segment, name) for segment in self.segments]
+        if not parts:
+            return np.empty(0, dtype=np.float64 if name != 'ids' else str)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def _segment_lengths(self) -> List[int]:
+        return [len(self._load(segment, 'ids')) for segment in self.segments]
+
+    def __len__(self) -> int:
+        return sum(self._segment_lengths())
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._concat('ids')
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self.columns:
+            raise KeyError(f"Unknown feature column: {name}")
+        return self._concat(name)
+
+    def matrix(self, columns: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Rows x columns float64 array (every column by default)"""
+        columns = list(columns or self.columns)
+        if not columns:
+            return np.empty((len(self), 0))
+        return np.column_stack([self.column(name) for name in columns])
+
+    @property
+    def index(self) -> Dict[str, int]:
+        """id -> row; an id written more than once maps to its latest row"""
+        if self._index is None:
+            self._index = {item_id: row for row, item_id in enumerate(self.ids.tolist())}
+        return self._index
+
+    def _segment_matrix(self, segment: str) -> np.ndarray:
+        return np.column_stack([self._load(segment, name) for name in self.columns])
+
+    def row(self, item_id: str) -> Optional[Dict[str, float]]:
+        """Features of one id as a dict without the absent (NaN) entries"""
+        row = self.index.get(item_id)
+        if row is None:
+            return None
+        for segment, length in zip(self.segments, self._segment_lengths()):
+            if row < length:
+                values = [float(self._load(segment, name)[row]) for name in self.columns]
+                return {name: value for name, value in zip(self.columns, values) if value == value}
+            row -= length
+        return None
+
+    def records(self) -> Iterator[Tuple[str, Dict[str, float]]]:
+        """Yield (id, features) for the latest row of every id, in dict form for the scalar analyzers"""
+        latest = set(self.index.values())
+        offset = 0
+        # One segment in memory at a time
+        for segment in self.segments:
+            ids = self._load(segment, 'ids')
+            for local, values in enumerate(self._segment_matrix(segment).tolist()):
+                if offset + local in latest:
+                    yield str(ids[local]), {name: value for name, value in zip(self.columns, values) if value == value}
+            offset += len(ids)
+
+class FeatureWriter:
+    """Buffers rows and writes them as immutable column segments.
+
+    Each flush writes a new segment-<time>-<suffix> directory holding
+    ids.npy and one <column>.npy per feature, built under a temporary name
+    and renamed into place, so a crash never leaves a half-written segment.
+    Use one writer per table at a time.
+    """
+
+    def __init__(self, path: str, columns: Sequence[str], segment_rows: int = 10000):
+        self.path = path
+        self.columns = list(columns)
+        self.segment_rows = segment_rows
+        self._positions = {name: i for i, name in enumerate(self.columns)}
+        self._ids = []
+        self._rows = []
+
+    def add(self, item_id: str, features: Dict[str, Any]) -> None:
+        row = [float('nan')] * len(self.columns)
+        for name, value in features.items():
+            position = self._positions.get(name)
+            if position is not None:
+                row[position] = to_float(value)
+        self._ids.append(str(item_id))
+        self._rows.append(row)
+        if len(self._rows) >= self.segment_rows:
+            self.flush()
+
+    def flush(self) -> Optional[str]:
+        if not self._rows:
+            return None
+        name = self.write_segment(self._ids, np.asarray(self._rows, dtype=np.float64))
+        self._ids, self._rows = [], []
+        return name
+
+    def write_segment(self, ids: Sequence[str], values: np.ndarray) -> str:
+        """Write ids and a rows x columns array as one new segment"""
+        name = f"segment-{time.time_ns():020d}-{uuid.uuid4().hex[:6]}"
+        staging = os.path.join(self.path, '.tmp-' + name)
+        os.makedirs(staging)
+        np.save(os.path.join(staging, 'ids.npy'), np.asarray(ids, dtype=str))
+        for i, column in enumerate(self.columns):
+            np.save(os.path.join(staging, column + '.npy'), np.ascontiguousarray(values[:, i], dtype=np.float64))
+        os.rename(staging, os.path.join(self.path, name))
+        return name
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> 'FeatureWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+class FeatureStore:
+    """Directory of feature tables (one per modality) for re-scoring without re-decoding media.
+
+    Layout: <root>/<table>/schema.json plus segment directories of
+    memory-mappable .npy columns and an ids.npy index column.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _table_path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def tables(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.exists(os.path.join(self.root, name, 'schema.json')))
+
+    def writer(self, name: str, columns: Sequence[str], segment_rows: int = 10000) -> FeatureWriter:
+        """Open a writer, creating the table or checking its columns match"""
+        path = self._table_path(name)
+        schema_path = os.path.join(path, 'schema.json')
+        if os.path.exists(schema_path):
+            with open(schema_path) as f:
+                existing = json.load(f)['columns']
+            if existing != list(columns):
+                raise ValueError(f"Table '{name}' was created with different columns")
+        else:
+            os.makedirs(path, exist_ok=True)
+            with open(schema_path, 'w') as f:
+                json.dump({'columns': list(columns)}, f)
+        return FeatureWriter(path, columns, segment_rows)
+
+    def table(self, name: str) -> FeatureTable:
+        path = self._table_path(name)
+        if not os.path.exists(os.path.join(path, 'schema.json')):
+            raise KeyError(f"No feature table '{name}' in {self.root}")
+        return FeatureTable(path)
+
+    def compact(self, name: str) -> int:
+        """Rewrite a table as one segment holding the latest row per id; returns the row count"""
+        table = self.table(name)
+        old_segments = table.segments
+        rows = sorted(table.index.values())
+        ids = table.ids[rows]
+        values = table.matrix()[rows]
+
+        # The new segment sorts after the old ones, so a crash before the
+        # deletes below only leaves duplicates that the index resolves
+        if rows:
+            FeatureWriter(table.path, table.columns).write_segment(ids.tolist(), values)
+        for segment in old_segments:
+            shutil.rmtree(os.path.join(table.path, segment))
+        return len(rows)
@@ -0,0 +1,63 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+class FileWatcher:
+    """A value loaded from a file and loaded again only when the file is replaced on disk"""
+
+    def __init__(self, path: str, load: Callable[[str, os.stat_result], Any], check_interval: float = 2.0,
+                 keep_when_missing: bool = False, name: Optional[str] = None):
+        """load(path, stat) builds the value from the file.
+
+        get() re-stats the file at most every check_interval seconds. A file
+        that fails to load keeps the previous value until it changes again.
+        A missing file yields None, or keeps the last value when
+        keep_when_missing is set. name describes the file in log messages.
+        """
+        self.path = path
+        self.load = load
+        self.check_interval = check_interval
+        self.keep_when_missing = keep_when_missing
+        self.name = f"{name} {path}" if name else path
+        self.reloads = 0
+        self.last_error = None
+        self._value = None
+        self._stamp = None
+        self._checked = None
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> Any:
+        """The last loaded value, without checking the file"""
+        return self._value
+
+    def _due(self) -> bool:
+        return self._checked is None or time.monotonic() - self._checked >= self.check_interval
+
+    def get(self) -> Any:
+        """The value for the file's current contents"""
+        if not self._due():
+            return self._value
+        with self._lock:
+            if not self._due():
+                return self._value
+            self._checked = time.monotonic()
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                if not self.keep_when_missing:
+                    self._value, self._stamp = None, None
+                return self._value
+            # Editors and deploys that save by rename change the inode even within one mtime tick
+            stamp = (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+            if stamp != self._stamp:
+                self._stamp = stamp
+                try:
+                    self._value = self.load(self.path, stat)
+                    self.reloads += 1
+                    self.last_error = None
+                except Exception as e:
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    print(f"Warning: could not load {self.name}: {self.last_error}")
+            return self._value
@@ -0,0 +1,402 @@
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from utils.streaming import json_default
+
+HISTORY_MODALITIES = ('text', 'voice', 'facial', 'combined')
+
+# Ids are issued by HistoryTokens; anything else is not recorded
+USER_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.-]{1,128}$')
+
+def valid_user_id(user_id: Any) -> bool:
+    return isinstance(user_id, str) and USER_ID_PATTERN.match(user_id) is not None
+
+def utc_day(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).date().isoformat()
+
+class HistoryTokens:
+    """Issues unguessable history ids and verifies the signed tokens that carry them.
+
+    A caller only ever reads or writes the history of the id inside a token
+    signed with this secret, so ids cannot be chosen or guessed. Workers
+    need the same secret to accept each other's tokens.
+    """
+
+    def __init__(self, secret: str):
+        self._serializer = URLSafeSerializer(secret, salt='history')
+
+    def issue(self) -> Tuple[str, str]:
+        """A new (user_id, token) pair"""
+        user_id = uuid.uuid4().hex
+        return user_id, self._serializer.dumps(user_id)
+
+    def user_id(self, token: Optional[str]) -> Optional[str]:
+        """The id a token was issued for, or None when it is missing, forged or malformed"""
+        if not token:
+            return None
+        try:
+            user_id = self._serializer.loads(token)
+        except BadSignature:
+            return None
+        return user_id if valid_user_id(user_id) else None
+
+def _mean(values: Iterable[Any]) -> Optional[float]:
+    numbers = [float(v) for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+    return sum(numbers) / len(numbers) if numbers else None
+
+def summarize(modality: str, payload: Dict[str, Any]) -> Tuple[Optional[str], Optional[float], Optional[float]]:
+    """(emotion, emotion_score, sentiment_score) of one endpoint payload, None where it has none"""
+    if modality == 'text':
+        return payload.get('primary_emotion') or payload.get('overall_mood'), None, _mean([payload.get('overall_sentiment_score')])
+    if modality == 'voice':
+        overall = payload.get('overall_analysis') or {}
+        answers = (payload.get('question_analyses') or {}).values()
+        return overall.get('dominant_emotion'), _mean(a.get('emotion_score') for a in answers if isinstance(a, dict)), None
+    if modality == 'facial':
+        overall = payload.get('overall_analysis') or {}
+        return overall.get('overall_emotion'), _mean([overall.get('emotion_score')]), None
+    # Combined: the same per-modality scores combine_results averages into overall_mood
+    individual = payload.get('individual_analyses') or {}
+    text, voice, facial = individual.get('text'), individual.get('voice'), individual.get('facial')
+    sentiment = _mean([text.get('overall_sentiment_score')]) if text else None
+    scores = [sentiment,
+              _mean([voice.get('emotion_score', 0)]) if voice else None,
+              _mean([(facial.get('overall_analysis') or {}).get('emotion_score', 0)]) if facial else None]
+    return payload.get('overall_mood'), _mean(scores), sentiment
+
+def _day_range(end: date, days: int) -> List[str]:
+    return [(end - timedelta(days=offset)).isoformat() for offset in range(days - 1, -1, -1)]
+
+class HistoryStore:
+    """Per-user analysis history in SQLite with incrementally maintained daily aggregates.
+
+    Raw results keep the latest payload per (user, session, modality);
+    daily_scores and daily_emotions are updated in the same transaction as
+    each batch of results, so trend queries read a few rows per day instead
+    of scanning results. Days are UTC dates.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                'id INTEGER PRIMARY KEY, user_id TEXT NOT NULL, session_id TEXT, modality TEXT NOT NULL, '
+                'recorded_at REAL NOT NULL, day TEXT NOT NULL, emotion TEXT, emotion_score REAL, '
+                'sentiment_score REAL, result TEXT)'
+            )
+            # One row per session and modality; a re-analysis replaces it
+            conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_results_session ON results (user_id, session_id, modality)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_results_user_time ON results (user_id, recorded_at)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS daily_scores ('
+                'user_id TEXT, day TEXT, modality TEXT, results INTEGER, '
+                'emotion_score_sum REAL, emotion_score_count INTEGER, '
+                'sentiment_score_sum REAL, sentiment_score_count INTEGER, '
+                'PRIMARY KEY (user_id, day, modality)) WITHOUT ROWID'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS daily_emotions ('
+                'user_id TEXT, day TEXT, modality TEXT, emotion TEXT, results INTEGER, '
+                'PRIMARY KEY (user_id, day, modality, emotion)) WITHOUT ROWID'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def write(self, records: List[Dict[str, Any]], conn: Optional[sqlite3.Connection] = None) -> None:
+        """Store a batch of records and fold them into the daily aggregates in one transaction"""
+        scores = defaultdict(lambda: [0, 0.0, 0, 0.0, 0])
+        emotions = defaultdict(int)
+
+        def fold(sign, user_id, day, modality, emotion, emotion_score, sentiment_score):
+            row = scores[(user_id, day, modality)]
+            row[0] += sign
+            if emotion_score is not None:
+                row[1] += sign * emotion_score
+                row[2] += sign
+            if sentiment_score is not None:
+                row[3] += sign * sentiment_score
+                row[4] += sign
+            if emotion:
+                emotions[(user_id, day, modality, emotion)] += sign
+
+        own = conn is None
+        conn = conn or self._connect()
+        try:
+            with conn:
+                # Take the write lock before reading the rows being replaced
+                conn.execute('BEGIN IMMEDIATE')
+                for record in records:
+                    key = (record['user_id'], record['session_id'], record['modality'])
+                    values = (record['recorded_at'], record['day'], record['emotion'], record['emotion_score'],
+                              record['sentiment_score'], record['result'])
+                    old = None
+                    if record['session_id'] is not None:
+                        old = conn.execute(
+                            'SELECT day, emotion, emotion_score, sentiment_score FROM results '
+                            'WHERE user_id = ? AND session_id = ? AND modality = ?', key
+                        ).fetchone()
+                    if old is None:
+                        conn.execute('INSERT INTO results (user_id, session_id, modality, recorded_at, day, emotion, '
+                                     'emotion_score, sentiment_score, result) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', key + values)
+                    else:
+                        fold(-1, record['user_id'], old[0], record['modality'], old[1], old[2], old[3])
+                        conn.execute('UPDATE results SET recorded_at = ?, day = ?, emotion = ?, emotion_score = ?, '
+                                     'sentiment_score = ?, result = ? WHERE user_id = ? AND session_id = ? AND modality = ?',
+                                     values + key)
+                    fold(1, record['user_id'], record['day'], record['modality'], record['emotion'],
+                         record['emotion_score'], record['sentiment_score'])
+
+                conn.executemany(
+                    'INSERT INTO daily_scores VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (user_id, day, modality) DO UPDATE SET '
+                    'results = results + excluded.results, '
+                    'emotion_score_sum = emotion_score_sum + excluded.emotion_score_sum, '
+                    'emotion_score_count = emotion_score_count + excluded.emotion_score_count, '
+                    'sentiment_score_sum = sentiment_score_sum + excluded.sentiment_score_sum, '
+                    'sentiment_score_count = sentiment_score_count + excluded.sentiment_score_count',
+                    [key + tuple(row) for key, row in scores.items()]
+                )
+                conn.executemany(
+                    'INSERT INTO daily_emotions VALUES (?, ?, ?, ?, ?) '
+                    'ON CONFLICT (user_id, day, modality, emotion) DO UPDATE SET results = results + excluded.results',
+                    [key + (count,) for key, count in emotions.items() if count]
+                )
+                # Replaced results can empty a bucket
+                conn.executemany('DELETE FROM daily_scores WHERE user_id = ? AND day = ? AND modality = ? AND results <= 0',
+                                 [key for key, row in scores.items() if row[0] < 0])
+                conn.executemany('DELETE FROM daily_emotions WHERE user_id = ? AND day = ? AND modality = ? '
+                                 'AND emotion = ? AND results <= 0',
+                                 [key for key, count in emotions.items() if count < 0])
+        finally:
+            if own:
+                conn.close()
+
+    def recent(self, user_id: str, limit: int = 20, modality: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Latest results of a user, newest first"""
+        query = 'SELECT session_id, modality, recorded_at, emotion, emotion_score, sentiment_score, result FROM results WHERE user_id = ?'
+        params = [user_id]
+        if modality:
+            query += ' AND modality = ?'
+            params.append(modality)
+        query += ' ORDER BY recorded_at DESC LIMIT ?'
+        params.append(limit)
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = [dict(row) for row in conn.execute(query, params)]
+        for row in rows:
+            row['result'] = json.loads(row['result']) if row['result'] else None
+        return rows
+
+    def _aggregate_rows(self, table: str, user_id: str, first_day: str, last_day: str,
+                        modality: Optional[str]) -> List[sqlite3.Row]:
+        query = f'SELECT * FROM {table} WHERE user_id = ? AND day BETWEEN ? AND ?'
+        params = [user_id, first_day, last_day]
+        if modality:
+            query += ' AND modality = ?'
+            params.append(modality)
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            return conn.execute(query, params).fetchall()
+
+    def trends(self, user_id: str, days: int = 30, window: int = 7, modality: Optional[str] = None,
+               today: Optional[date] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Daily means and trailing window-day rolling means of emotion_score and sentiment_score per modality"""
+        today = today or datetime.now(timezone.utc).date()
+        span = _day_range(today, days + window - 1)
+        totals = defaultdict(dict)
+        for row in self._aggregate_rows('daily_scores', user_id, span[0], span[-1], modality):
+            totals[row['modality']][row['day']] = (row['results'], row['emotion_score_sum'], row['emotion_score_count'],
+                                                   row['sentiment_score_sum'], row['sentiment_score_count'])
+
+        series = {}
+        for name, by_day in sorted(totals.items()):
+            points = []
+            empty = (0, 0.0, 0, 0.0, 0)
+            for position in range(window - 1, len(span)):
+                day = span[position]
+                results, emotion_sum, emotion_n, sentiment_sum, sentiment_n = by_day.get(day, empty)
+                # Rolling means weight each day by its number of results
+                trailing = [by_day.get(d, empty) for d in span[position - window + 1:position + 1]]
+                rolling_emotion_n = sum(t[2] for t in trailing)
+                rolling_sentiment_n = sum(t[4] for t in trailing)
+                points.append({
+                    'day': day,
+                    'results': results,
+                    'emotion_score': emotion_sum / emotion_n if emotion_n else None,
+                    'sentiment_score': sentiment_sum / sentiment_n if sentiment_n else None,
+                    'rolling_emotion_score': sum(t[1] for t in trailing) / rolling_emotion_n if rolling_emotion_n else None,
+                    'rolling_sentiment_score': sum(t[3] for t in trailing) / rolling_sentiment_n if rolling_sentiment_n else None
+                })
+            series[name] = points
+        return series
+
+    def emotion_distribution(self, user_id: str, days: int = 28, window: int = 7, modality: Optional[str] = None,
+                             today: Optional[date] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Emotion counts and shares per consecutive window-day period (oldest first) and modality"""
+        today = today or datetime.now(timezone.utc).date()
+        span = _day_range(today, days)
+        periods = [span[max(0, end - window):end] for end in range(len(span), 0, -window)][::-1]
+        period_of = {day: index for index, period in enumerate(periods) for day in period}
+
+        counts = defaultdict(lambda: [defaultdict(int) for _ in periods])
+        for row in self._aggregate_rows('daily_emotions', user_id, span[0], span[-1], modality):
+            counts[row['modality']][period_of[row['day']]][row['emotion']] += row['results']
+
+        distribution = {}
+        for name, by_period in sorted(counts.items()):
+            distribution[name] = []
+            for period, emotion_counts in zip(periods, by_period):
+                total = sum(emotion_counts.values())
+                distribution[name].append({
+                    'start': period[0],
+                    'end': period[-1],
+                    'results': total,
+                    'counts': dict(emotion_counts),
+                    'shares': {emotion: count / total for emotion, count in emotion_counts.items()} if total else {}
+                })
+        return distribution
+
+_STOP = object()
+
+class HistoryWriter:
+    """Write-behind queue in front of a HistoryStore.
+
+    record() only summarizes and enqueues, so requests never wait on disk;
+    a background thread writes whatever has queued up as one transaction,
+    so batches grow with load. When the queue is full, records are dropped
+    and counted rather than blocking. The thread starts on first use in
+    each process, so a writer built before a fork works in every worker.
+    """
+
+    def __init__(self, store: HistoryStore, max_pending: int = 1000, batch_size: int = 200):
+        self.store = store
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+
+    def _ensure_started(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(self.max_pending)
+                self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def record(self, user_id: str, session_id: Optional[str], modality: str, payload: Dict[str, Any]) -> bool:
+        """Queue one endpoint payload; False when it was not accepted"""
+        if not valid_user_id(user_id) or modality not in HISTORY_MODALITIES or not isinstance(payload, dict):
+            return False
+        emotion, emotion_score, sentiment_score = summarize(modality, payload)
+        if modality == 'combined':
+            # The per-modality payloads are recorded on their own
+            payload = {key: value for key, value in payload.items() if key != 'individual_analyses'}
+        recorded_at = time.time()
+        self._ensure_started()
+        try:
+            self._queue.put_nowait({
+                'user_id': user_id,
+                'session_id': session_id,
+                'modality': modality,
+                'recorded_at': recorded_at,
+                'day': utc_day(recorded_at),
+                'emotion': emotion,
+                'emotion_score': emotion_score,
+                'sentiment_score': sentiment_score,
+                'payload': payload
+            })
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def _run(self) -> None:
+        conn = self.store._connect()
+        while True:
+            batch = [self._queue.get()]
+            # Take whatever else is already waiting
+            while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is _STOP
+            records = [item for item in batch if item is not _STOP]
+            try:
+                for record in records:
+                    # Serialized here rather than on the request thread
+                    record['result'] = json.dumps(record.pop('payload'), default=json_default)
+                if records:
+                    self.store.write(records, conn)
+                with self._lock:
+                    self.written += len(records)
+                    self.batches += 1 if records else 0
+            except Exception as e:
+                with self._lock:
+                    self.failed += len(records)
+                print(f"Warning: history write of {len(records)} records failed: {e}")
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                conn.close()
+                return
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything queued so far is written; False on timeout"""
+        if self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write what is queued and stop the thread"""
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def pending(self) -> int:
+        return self._queue.qsize() if self._pid == os.getpid() else 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'pending': self.pending(),
+                'written': self.written,
+                'batches': self.batches,
+                'dropped': self.dropped,
+                'failed': self.failed
+            }
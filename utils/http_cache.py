@@ -0,0 +1,115 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from utils.file_watch import FileWatcher
+
+try:
+    import brotli
+except ImportError:  # optional; gzip alone is understood by every browser
+    brotli = None
+
+# Bodies smaller than this gain less from compression than the header costs
+MIN_COMPRESS_BYTES = 512
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+# Tried in order; the first one the client accepts is served
+ENCODING_PREFERENCE = ('br', 'gzip')
+
+def compressible(mimetype: str) -> bool:
+    return mimetype.startswith(COMPRESSIBLE_TYPES)
+
+def compress_variants(data: bytes) -> Dict[str, bytes]:
+    """Maximum-effort gzip (and brotli when installed) encodings that are smaller than data"""
+    variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=11)
+    return {encoding: body for encoding, body in variants.items() if len(body) < len(data)}
+
+def read_bytes(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+class CachedBody:
+    """One version of a response body with its validators and precompressed variants"""
+
+    def __init__(self, data: bytes, mimetype: str, last_modified: Optional[float] = None):
+        self.mimetype = mimetype
+        self.last_modified = last_modified
+        self.digest = hashlib.sha256(data).hexdigest()[:20]
+        self.variants = {'identity': data}
+        if len(data) >= MIN_COMPRESS_BYTES and compressible(mimetype):
+            self.variants.update(compress_variants(data))
+
+    @property
+    def fingerprint(self) -> str:
+        """Short content hash used as the ?v= of long-lived URLs"""
+        return self.digest[:12]
+
+    def negotiate(self, quality: Callable[[str], float]) -> Tuple[str, bytes, str]:
+        """(encoding, body, etag) for a client whose Accept-Encoding gives quality(encoding)"""
+        for encoding in ENCODING_PREFERENCE:
+            if encoding in self.variants and quality(encoding) > 0:
+                # Each encoding is a different representation and needs its own strong ETag
+                return encoding, self.variants[encoding], f'{self.digest}-{encoding}'
+        return 'identity', self.variants['identity'], self.digest
+
+    def size(self) -> int:
+        return sum(len(body) for body in self.variants.values())
+
+class WatchedFile(FileWatcher):
+    """A file's loaded form, rebuilt from its bytes only when the file changes on disk"""
+
+    def __init__(self, path: str, load: Callable[[bytes, float], Any], check_interval: float = 2.0):
+        """load(data, mtime) builds the cached value from the file's bytes; a missing file yields None"""
+        super().__init__(path, lambda path, stat: load(read_bytes(path), stat.st_mtime), check_interval)
+
+class StaticAssets:
+    """Files of a static folder held in memory with validators, compressed variants and fingerprints"""
+
+    def __init__(self, folder: str, check_interval: float = 2.0, max_file_bytes: int = 1024 * 1024):
+        self.folder = os.path.abspath(folder)
+        self.check_interval = check_interval
+        self.max_file_bytes = max_file_bytes
+        self._files: Dict[str, WatchedFile] = {}
+        self._lock = threading.Lock()
+
+    def _resolve(self, filename: str) -> Optional[str]:
+        path = os.path.abspath(os.path.join(self.folder, filename))
+        if os.path.commonpath([self.folder, path]) != self.folder:
+            return None
+        return path
+
+    def get(self, filename: str) -> Optional[CachedBody]:
+        """The cached body of a static file, or None when it is missing or too large to hold"""
+        watched = self._files.get(filename)
+        if watched is None:
+            path = self._resolve(filename)
+            # Only real files get an entry, so probing random paths cannot grow the cache
+            if path is None or not os.path.isfile(path) or os.path.getsize(path) > self.max_file_bytes:
+                return None
+            mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            with self._lock:
+                watched = self._files.setdefault(filename, WatchedFile(
+                    path, lambda data, mtime: CachedBody(data, mimetype, mtime), self.check_interval
+                ))
+        return watched.get()
+
+    def url(self, filename: str, prefix: str = '/static') -> str:
+        """URL of a static file carrying its content fingerprint, so it can be cached for a year"""
+        body = self.get(filename)
+        url = f"{prefix}/{filename}"
+        return f"{url}?v={body.fingerprint}" if body is not None else url
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            bodies = [watched.value for watched in self._files.values() if watched.value is not None]
+        return {
+            'files': len(bodies),
+            'bytes': sum(body.size() for body in bodies),
+            'encodings': ['gzip', 'br'] if brotli is not None else ['gzip']
+        }
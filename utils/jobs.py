@@ -0,0 +1,175 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from utils.streaming import json_default
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+FINISHED_STATUSES = (JOB_DONE, JOB_FAILED)
+
+class QueueFullError(Exception):
+    """Raised when the job queue has no room for another job"""
+
+class InMemoryJobStore:
+    """Job records held in this process, bounded by evicting old finished jobs"""
+
+    def __init__(self, max_jobs: int = 1000):
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+            if len(self._jobs) > self.max_jobs:
+                for job_id in [j for j, rec in self._jobs.items() if rec['status'] in FINISHED_STATUSES]:
+                    del self._jobs[job_id]
+                    if len(self._jobs) <= self.max_jobs:
+                        break
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+class SQLiteJobStore:
+    """Job records in a local SQLite file so several worker processes share them.
+
+    Each process runs its own worker pool; any process can answer status
+    polls for a job submitted to another one.
+    """
+
+    def __init__(self, path: str, max_age_seconds: float = 24 * 3600):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, kind TEXT, status TEXT, created_at REAL, '
+                'started_at REAL, finished_at REAL, result TEXT, error TEXT)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_at)')
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def create(self, job: Dict[str, Any]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, kind, status, created_at) VALUES (?, ?, ?, ?)',
+                (job['id'], job['kind'], job['status'], job['created_at'])
+            )
+            # Drop finished jobs past their retention window
+            conn.execute(
+                'DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?',
+                (time.time() - self.max_age_seconds,)
+            )
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'], default=json_default)
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        with self._connect() as conn:
+            conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+class JobQueue:
+    """Bounded worker pool that runs analyses in the background and records their status"""
+
+    def __init__(self, store=None, max_workers: int = 2, max_pending: int = 32):
+        self.store = store if store is not None else InMemoryJobStore()
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis-job')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.rejected = 0
+
+    def submit(self, kind: str, func: Callable[..., Any], *args: Any,
+               on_finish: Optional[Callable[[], None]] = None) -> str:
+        """Queue func(*args) and return its job id; raises QueueFullError when saturated"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise QueueFullError(f"Job queue is full ({self.max_pending} jobs pending)")
+
+        job_id = uuid.uuid4().hex
+        try:
+            self.store.create({
+                'id': job_id,
+                'kind': kind,
+                'status': JOB_QUEUED,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'result': None,
+                'error': None
+            })
+            with self._lock:
+                self._pending += 1
+            self._executor.submit(self._run, job_id, func, args, on_finish)
+        except Exception:
+            self._slots.release()
+            raise
+        return job_id
+
+    def _run(self, job_id, func, args, on_finish):
+        try:
+            self.store.update(job_id, status=JOB_RUNNING, started_at=time.time())
+            try:
+                result = func(*args)
+            except Exception as e:
+                self.store.update(job_id, status=JOB_FAILED, error=str(e), finished_at=time.time())
+            else:
+                self.store.update(job_id, status=JOB_DONE, result=result, finished_at=time.time())
+        finally:
+            if on_finish is not None:
+                try:
+                    on_finish()
+                except Exception as e:
+                    print(f"Error cleaning up job {job_id}: {e}")
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'capacity': self.max_pending,
+                'pending': self._pending,
+                'rejected': self.rejected
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,32 @@
+import threading
+from typing import Any, Callable
+
+class LazyAnalyzer:
+    """Proxy that builds an analyzer on first attribute access.
+
+    Constructing analyzers pulls in heavy libraries (librosa/numba, OpenCV,
+    lexicons), so each modality only pays for them when it is first used.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> Any:
+        """Return the analyzer, constructing it exactly once"""
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+                instance = self._instance
+        return instance
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not defined on the proxy itself
+        return getattr(self.get(), name)
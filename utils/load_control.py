@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+# Analysis quality levels, most to least expensive
+QUALITY_LEVELS = ('full', 'reduced', 'minimal')
+
+class LoadController:
+    """Picks the analysis quality level from queue pressure and recent latency.
+
+    Load is the larger of the pressure signal (0 = idle, 1 = every slot and
+    queue place taken) and the recent p90 latency as a fraction of the
+    latency budget. Above reduce_at the level drops to 'reduced', above
+    minimal_at to 'minimal'. Degrading is immediate; recovering goes one
+    level at a time, only after load has stayed below the threshold (less
+    a hysteresis margin) for hold_seconds, so the level does not flap.
+    """
+
+    def __init__(self, pressure: Optional[Callable[[], float]] = None,
+                 latency_budget: float = 10.0, window: int = 50,
+                 reduce_at: float = 0.6, minimal_at: float = 0.9,
+                 hysteresis: float = 0.2, hold_seconds: float = 15.0,
+                 forced_level: Optional[str] = None):
+        if forced_level is not None and forced_level not in QUALITY_LEVELS:
+            raise ValueError(f"Unknown quality level: {forced_level}")
+        self.pressure = pressure
+        self.latency_budget = latency_budget
+        self.reduce_at = reduce_at
+        self.minimal_at = minimal_at
+        self.hysteresis = hysteresis
+        self.hold_seconds = hold_seconds
+        self.forced_level = forced_level
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._level = forced_level or QUALITY_LEVELS[0]
+        self._changed_at = time.monotonic()
+        self.changes = 0
+
+    def observe(self, seconds: float) -> None:
+        """Record how long one analysis took"""
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def _latency_p90(self) -> float:
+        # Caller holds the lock
+        if not self._latencies:
+            return 0.0
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(0.9 * len(ordered)))]
+
+    def load(self) -> float:
+        pressure = 0.0
+        if self.pressure is not None:
+            try:
+                pressure = self.pressure()
+            except Exception as e:
+                print(f"Warning: load pressure signal failed: {e}")
+        with self._lock:
+            latency_load = self._latency_p90() / self.latency_budget if self.latency_budget > 0 else 0.0
+        return max(pressure, latency_load)
+
+    def _target(self, load: float, margin: float) -> int:
+        if load >= self.minimal_at - margin:
+            return 2
+        if load >= self.reduce_at - margin:
+            return 1
+        return 0
+
+    def level(self) -> str:
+        """Return the quality level the next analysis should run at"""
+        if self.forced_level is not None:
+            return self.forced_level
+
+        load = self.load()
+        now = time.monotonic()
+        with self._lock:
+            current = QUALITY_LEVELS.index(self._level)
+            if self._target(load, 0.0) > current:
+                current = self._target(load, 0.0)
+            elif self._target(load, self.hysteresis) < current and now - self._changed_at >= self.hold_seconds:
+                current -= 1
+            else:
+                return self._level
+
+            self._level = QUALITY_LEVELS[current]
+            self._changed_at = now
+            self.changes += 1
+            return self._level
+
+    def stats(self) -> Dict[str, Any]:
+        load = self.load()
+        with self._lock:
+            return {
+                'level': self._level,
+                'forced': self.forced_level is not None,
+                'load': load,
+                'latency_p90': self._latency_p90(),
+                'latency_budget': self.latency_budget,
+                'changes': self.changes
+            }
@@ -0,0 +1,134 @@
+import contextvars
+import os
+import threading
+import tracemalloc
+from typing import Any, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Per-request collector that stage peaks are also reported into, if one is set
+_collector = contextvars.ContextVar('memory_collector', default=None)
+
+# Open stages on this thread, innermost last
+_local = threading.local()
+
+def start_tracking(frames: int = 1) -> None:
+    """Start tracemalloc so stages record their allocation peaks"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+def is_tracking() -> bool:
+    return tracemalloc.is_tracing()
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size of this process, or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+def peak_rss_bytes() -> Optional[int]:
+    """Highest resident set size this process has reached"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+def smaps_rollup(pid: Any = 'self') -> Optional[Dict[str, int]]:
+    """Resident memory of a process split into shared and private pages (Linux 4.14+).
+
+    pss charges each shared page to the processes sharing it, and private
+    is what the process alone holds (USS): the memory an extra preforked
+    worker actually costs.
+    """
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            fields = {}
+            for line in f:
+                name, _, rest = line.partition(':')
+                parts = rest.split()
+                if len(parts) == 2 and parts[1] == 'kB':
+                    fields[name] = int(parts[0]) * 1024
+    except (OSError, ValueError):
+        return None
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'shared': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+        'private': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+        'swap': fields.get('Swap', 0)
+    }
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+def begin_stage() -> Dict[str, int]:
+    """Mark the start of a stage; pair with end_stage.
+
+    tracemalloc keeps one process-wide peak, so each stage resets it and
+    hands the peak seen so far up to the enclosing stage. Any stage running
+    at the same time on another thread resets the same peak. That includes
+    overlapping requests and the modality threads of a single
+    /analyze_session. Peaks are only exact when stages run one at a time;
+    under concurrency they are approximate and usually too low.
+    """
+    stack = _stack()
+    current, peak = tracemalloc.get_traced_memory()
+    if stack:
+        stack[-1]['child_peak'] = max(stack[-1]['child_peak'], peak)
+    tracemalloc.reset_peak()
+    frame = {'start': current, 'child_peak': current}
+    stack.append(frame)
+    return frame
+
+def end_stage(frame: Dict[str, int]) -> int:
+    """Close a stage and return its peak bytes above what was allocated when it began"""
+    stack = _stack()
+    if frame in stack:
+        del stack[stack.index(frame):]
+    _, peak = tracemalloc.get_traced_memory()
+    peak = max(peak, frame['child_peak'])
+    if stack:
+        stack[-1]['child_peak'] = max(stack[-1]['child_peak'], peak)
+    return max(0, peak - frame['start'])
+
+class MemoryCollector:
+    """Largest allocation peak per stage seen while serving one request"""
+
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, peak_bytes: int) -> None:
+        with self._lock:
+            self.stages[stage] = max(peak_bytes, self.stages.get(stage, 0))
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = dict(self.stages)
+        return {
+            'tracemalloc': is_tracking(),
+            'stage_peak_bytes': stages,
+            'rss_bytes': rss_bytes(),
+            'peak_rss_bytes': peak_rss_bytes()
+        }
+
+def collect(collector: Optional[MemoryCollector]) -> contextvars.Token:
+    """Route stage peaks in this context (and contexts copied from it) to collector"""
+    return _collector.set(collector)
+
+def stop_collecting(token: contextvars.Token) -> None:
+    _collector.reset(token)
+
+def record_stage(stage: str, peak_bytes: int) -> None:
+    collector = _collector.get()
+    if collector is not None:
+        collector.record(stage, peak_bytes)
@@ -0,0 +1,212 @@
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+# Profilers a request may ask for with ?profile=<mode> or X-Profile: <mode>
+PROFILE_MODES = ('sample', 'cprofile')
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    """Samples the Python stacks of selected threads from a background thread.
+
+    Watches the thread that started it plus any thread whose name starts
+    with one of thread_prefixes (e.g. the pipeline's 'modality' workers),
+    so work fanned out by /analyze_session is included. Samples are
+    aggregated into collapsed stacks ('outer;inner count') for flamegraph
+    tools and a flat top-N table.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_prefixes: Tuple[str, ...] = ()):
+        self.interval = interval
+        self.thread_prefixes = thread_prefixes
+        self.stacks = Counter()
+        self.samples = 0
+        self._target = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _watched_threads(self) -> List[int]:
+        idents = [self._target]
+        if self.thread_prefixes:
+            idents.extend(
+                thread.ident for thread in threading.enumerate()
+                if thread.name.startswith(self.thread_prefixes) and thread.ident is not None
+            )
+        return idents
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in self._watched_threads():
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                # Idle pool workers only count while running a submitted task
+                if ident != self._target and not any(label.startswith('run (thread.py') for label in stack):
+                    continue
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def start(self) -> None:
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, limit: int = 30) -> str:
+        """Functions ranked by self samples, with inclusive samples alongside.
+
+        Ranking by inclusive samples would fill the table with the WSGI and
+        Flask frames that enclose every sample; self time puts the code that
+        was actually running first.
+        """
+        inclusive = Counter()
+        own = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for label in set(frames):
+                inclusive[label] += count
+
+        total = max(1, self.samples)
+        ranked = sorted(own, key=lambda label: (own[label], inclusive[label]), reverse=True)
+        lines = [f"{self.samples} samples every {self.interval * 1000:.1f} ms",
+                 f"{'self':>10} {'inclusive':>10}  function"]
+        for label in ranked[:limit]:
+            lines.append(f"{100 * own[label] / total:9.1f}% {100 * inclusive[label] / total:9.1f}%  {label}")
+        return '\n'.join(lines) + '\n'
+
+class ProfilingMiddleware:
+    """WSGI middleware that profiles requests carrying the admin profiling flag.
+
+    A request opts in with ?profile=<mode> or an X-Profile: <mode> header
+    (mode 'sample' or 'cprofile'; '1' means 'sample') and proves access with
+    an X-Profile-Token header. The token is never read from the query string,
+    which ends up in access logs and browser history. Artifacts are written
+    to output_dir and named in the X-Profile-Id response header:
+
+    - sample:   <id>.folded (collapsed stacks) and <id>.txt (top functions)
+    - cprofile: <id>.prof (pstats dump) and <id>.txt (top functions)
+
+    cProfile only traces the request thread. Work handed to other threads,
+    such as /analyze_session's modality pool, shows up as time waiting in
+    future.result(); use 'sample' mode, which follows thread_prefixes, there.
+
+    Only installed when a token is configured, so without one requests
+    never pass through it.
+    """
+
+    def __init__(self, app: Callable, token: str, output_dir: str, top_n: int = 30,
+                 thread_prefixes: Tuple[str, ...] = ()):
+        self.app = app
+        self.token = token
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.thread_prefixes = thread_prefixes
+
+    def _requested(self, environ: Dict[str, Any]) -> Tuple[Optional[str], str]:
+        query = parse_qs(environ.get('QUERY_STRING', ''))
+        mode = environ.get('HTTP_X_PROFILE') or (query.get('profile') or [None])[0]
+        token = environ.get('HTTP_X_PROFILE_TOKEN', '')
+        return mode, token
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+        mode, token = self._requested(environ)
+        if not mode:
+            return self.app(environ, start_response)
+
+        mode = 'sample' if mode in ('1', 'true') else mode
+        if not hmac.compare_digest(token.encode(), self.token.encode()):
+            start_response('403 FORBIDDEN', [('Content-Type', 'application/json')])
+            return [b'{"error": "Invalid profiling token"}']
+        if mode not in PROFILE_MODES:
+            start_response('400 BAD REQUEST', [('Content-Type', 'application/json')])
+            return [json.dumps({"error": f"Unknown profile mode: {mode}"}).encode()]
+
+        profile_id = self._profile_id(environ)
+        captured = {}
+
+        def capture_start_response(status, headers, exc_info=None):
+            captured['status'] = status
+            captured['headers'] = list(headers) + [('X-Profile-Id', profile_id)]
+            captured['exc_info'] = exc_info
+            return lambda data: None
+
+        started = time.perf_counter()
+        if mode == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                body = self._consume(environ, capture_start_response)
+            finally:
+                profiler.disable()
+            self._write_cprofile(profile_id, profiler, time.perf_counter() - started)
+        else:
+            sampler = StackSampler(thread_prefixes=self.thread_prefixes)
+            sampler.start()
+            try:
+                body = self._consume(environ, capture_start_response)
+            finally:
+                sampler.stop()
+            self._write_samples(profile_id, sampler, time.perf_counter() - started)
+
+        start_response(captured['status'], captured['headers'], captured['exc_info'])
+        return [body]
+
+    def _consume(self, environ, start_response) -> bytes:
+        # Buffer the body so streamed responses are profiled to the end
+        result = self.app(environ, start_response)
+        try:
+            return b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+    def _profile_id(self, environ: Dict[str, Any]) -> str:
+        path = re.sub(r'[^A-Za-z0-9]+', '_', environ.get('PATH_INFO', '')).strip('_') or 'root'
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{path}-{uuid.uuid4().hex[:8]}"
+
+    def _path(self, profile_id: str, extension: str) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        return os.path.join(self.output_dir, profile_id + extension)
+
+    def _write_samples(self, profile_id: str, sampler: StackSampler, seconds: float) -> None:
+        with open(self._path(profile_id, '.folded'), 'w') as f:
+            f.write(sampler.collapsed())
+        with open(self._path(profile_id, '.txt'), 'w') as f:
+            f.write(f"Request took {seconds:.3f}s\n")
+            f.write(sampler.top(self.top_n))
+
+    def _write_cprofile(self, profile_id: str, profiler: cProfile.Profile, seconds: float) -> None:
+        profiler.dump_stats(self._path(profile_id, '.prof'))
+        table = io.StringIO()
+        # Own time first for the same reason as StackSampler.top; the .prof keeps the full call graph
+        pstats.Stats(profiler, stream=table).sort_stats('tottime', 'cumulative').print_stats(self.top_n)
+        with open(self._path(profile_id, '.txt'), 'w') as f:
+            f.write(f"Request took {seconds:.3f}s\n")
+            f.write(table.getvalue())
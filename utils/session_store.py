@@ -0,0 +1,204 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from utils.streaming import json_default
+
+class SessionStore:
+    """In-memory per-session analysis results with TTL eviction.
+
+    Each modality endpoint writes its result under the session id so that
+    /combined_analysis can combine them without re-analysis or trusting
+    results echoed back by the client.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, max_sessions: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        # Least recently updated first; every write moves its session to the end
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, session: Dict[str, Any], now: float) -> bool:
+        return now - session['updated_at'] > self.ttl_seconds
+
+    def _evict(self, now: float) -> None:
+        # Expired sessions and, when full, the least recently updated are all at the front
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if not self._expired(oldest, now) and len(self._sessions) < self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+
+    def create_session(self) -> str:
+        """Start a new session and return its unguessable id"""
+        session_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            self._sessions[session_id] = {'created_at': now, 'updated_at': now, 'results': {}, 'answers': {}}
+        return session_id
+
+    def exists(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def put(self, session_id: str, modality: str, result: Any) -> bool:
+        """Store a modality result; returns False if the session is unknown or expired"""
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or self._expired(session, now):
+                self._sessions.pop(session_id, None)
+                return False
+            session['results'][modality] = result
+            session['updated_at'] = now
+            self._sessions.move_to_end(session_id)
+            return True
+
+    def put_answer(self, session_id: str, modality: str, question_index: str, result: Any) -> bool:
+        """Store one question's result for a modality; returns False if the session is unknown or expired"""
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or self._expired(session, now):
+                self._sessions.pop(session_id, None)
+                return False
+            session['answers'].setdefault(modality, {})[question_index] = result
+            session['updated_at'] = now
+            self._sessions.move_to_end(session_id)
+            return True
+
+    def _live(self, session_id: str) -> Optional[Dict[str, Any]]:
+        # Caller holds the lock
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if self._expired(session, time.time()):
+            del self._sessions[session_id]
+            return None
+        return session
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return {modality: result} for a live session, or None"""
+        with self._lock:
+            session = self._live(session_id)
+            return dict(session['results']) if session is not None else None
+
+    def get_answers(self, session_id: str, modality: str) -> Optional[Dict[str, Any]]:
+        """Return {question_index: result} stored for a modality, or None for an unknown session"""
+        with self._lock:
+            session = self._live(session_id)
+            return dict(session['answers'].get(modality, {})) if session is not None else None
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+class SQLiteSessionStore:
+    """Per-session analysis results in a local SQLite file, shared across worker processes"""
+
+    def __init__(self, path: str, ttl_seconds: float = 3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS sessions ('
+                'id TEXT PRIMARY KEY, created_at REAL, updated_at REAL)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS session_results ('
+                'session_id TEXT, modality TEXT, result TEXT, '
+                'PRIMARY KEY (session_id, modality))'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS session_answers ('
+                'session_id TEXT, modality TEXT, question_index TEXT, result TEXT, '
+                'PRIMARY KEY (session_id, modality, question_index))'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions (updated_at)')
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def create_session(self) -> str:
+        session_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            # Sweep expired sessions on every create to keep the file bounded
+            cutoff = now - self.ttl_seconds
+            for table in ('session_results', 'session_answers'):
+                conn.execute(
+                    f'DELETE FROM {table} WHERE session_id IN '
+                    '(SELECT id FROM sessions WHERE updated_at < ?)', (cutoff,)
+                )
+            conn.execute('DELETE FROM sessions WHERE updated_at < ?', (cutoff,))
+            conn.execute('INSERT INTO sessions VALUES (?, ?, ?)', (session_id, now, now))
+        return session_id
+
+    def exists(self, session_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT 1 FROM sessions WHERE id = ? AND updated_at >= ?',
+                (session_id, time.time() - self.ttl_seconds)
+            ).fetchone()
+        return row is not None
+
+    def _touch(self, conn: sqlite3.Connection, session_id: str) -> bool:
+        now = time.time()
+        return conn.execute(
+            'UPDATE sessions SET updated_at = ? WHERE id = ? AND updated_at >= ?',
+            (now, session_id, now - self.ttl_seconds)
+        ).rowcount > 0
+
+    def put(self, session_id: str, modality: str, result: Any) -> bool:
+        with self._connect() as conn:
+            if not self._touch(conn, session_id):
+                return False
+            conn.execute(
+                'INSERT OR REPLACE INTO session_results VALUES (?, ?, ?)',
+                (session_id, modality, json.dumps(result, default=json_default))
+            )
+        return True
+
+    def put_answer(self, session_id: str, modality: str, question_index: str, result: Any) -> bool:
+        with self._connect() as conn:
+            if not self._touch(conn, session_id):
+                return False
+            conn.execute(
+                'INSERT OR REPLACE INTO session_answers VALUES (?, ?, ?, ?)',
+                (session_id, modality, question_index, json.dumps(result, default=json_default))
+            )
+        return True
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        if not self.exists(session_id):
+            return None
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT modality, result FROM session_results WHERE session_id = ?', (session_id,)
+            ).fetchall()
+        return {modality: json.loads(result) for modality, result in rows}
+
+    def get_answers(self, session_id: str, modality: str) -> Optional[Dict[str, Any]]:
+        if not self.exists(session_id):
+            return None
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT question_index, result FROM session_answers '
+                'WHERE session_id = ? AND modality = ? ORDER BY rowid',
+                (session_id, modality)
+            ).fetchall()
+        return {question_index: json.loads(result) for question_index, result in rows}
+
+    def delete(self, session_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute('DELETE FROM session_results WHERE session_id = ?', (session_id,))
+            conn.execute('DELETE FROM session_answers WHERE session_id = ?', (session_id,))
+            conn.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
@@ -0,0 +1,56 @@
+import json
+from typing import Any, BinaryIO, Dict, Iterable, Iterator
+
+# Longest single NDJSON record accepted from a stream
+MAX_NDJSON_LINE_BYTES = 1024 * 1024
+
+def iter_ndjson(stream: BinaryIO, max_line_bytes: int = MAX_NDJSON_LINE_BYTES) -> Iterator[Dict[str, Any]]:
+    """Lazily parse newline-delimited JSON from a binary stream.
+
+    Yields one dict per non-blank line: {'line': n, 'record': obj} on success
+    or {'line': n, 'error': message} for a malformed or oversized line, so a
+    bad record never aborts the rest of the stream.
+    """
+    line_number = 0
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            break
+        line_number += 1
+
+        if len(line) > max_line_bytes and not line.endswith(b'\n'):
+            # Drain the rest of the oversized line without buffering it
+            while True:
+                rest = stream.readline(max_line_bytes)
+                if not rest or rest.endswith(b'\n'):
+                    break
+            yield {'line': line_number, 'error': f"Record exceeds {max_line_bytes} bytes"}
+            continue
+
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            yield {'line': line_number, 'record': json.loads(line)}
+        except ValueError as e:
+            yield {'line': line_number, 'error': f"Invalid JSON: {e}"}
+
+def json_default(value: Any) -> Any:
+    """json.dumps fallback for NumPy scalars and arrays in analysis results"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def encode_ndjson(items: Iterable[Any]) -> Iterator[str]:
+    """Serialize items one per line as they are produced"""
+    for item in items:
+        yield json.dumps(item, default=json_default) + '\n'
+
+def format_sse(data: Any, event: str = None, event_id: str = None) -> str:
+    """Format one Server-Sent Events message with a JSON payload; event_id comes back as Last-Event-ID"""
+    message = f"id: {event_id}\n" if event_id else ""
+    message += f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data, default=json_default)}\n\n"